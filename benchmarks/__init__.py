@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+
+"""Throughput and latency benchmarks of the catalog and user APIs.
+
+Run with ``python -m benchmarks --help``. Every catalog size gets its own
+SQLite database under ``.benchmarks/``, seeded once with synthetic books
+through `books.importer` and reused by later runs.
+"""
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+
+"""Command line entry point: ``python -m benchmarks``.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+
+
+def _commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            stderr=subprocess.DEVNULL).decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _arguments(argv):
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks',
+        description='Benchmark the catalog and user APIs.')
+    parser.add_argument(
+        '--sizes', default='1k',
+        help='Comma separated catalog sizes, e.g. 1k,100k,1M (default: 1k).')
+    parser.add_argument(
+        '--scenarios',
+        help='Comma separated scenarios to run (default: all).')
+    parser.add_argument(
+        '--mode', choices=('client', 'server', 'both'), default='both',
+        help='Test client, local WSGI server, or both (default: both).')
+    parser.add_argument(
+        '--requests', type=int, default=200,
+        help='Requests per scenario and mode (default: 200).')
+    parser.add_argument(
+        '--concurrency', type=int, default=8,
+        help='Client threads against the WSGI server (default: 8).')
+    parser.add_argument(
+        '--output',
+        help='JSON results file (default: .benchmarks/results-<commit>-'
+             '<time>.json).')
+    parser.add_argument(
+        '--baseline',
+        help='Earlier JSON results to compare against.')
+    return parser.parse_args(argv)
+
+
+def _report(result, baseline):
+    latency = result['latency_ms']
+    line = '%-8s %-18s %-7s %8s req/s  p50 %8s ms  p99 %8s ms  %6s q/req' % (
+        result['size'], result['scenario'], result['mode'],
+        result['requests_per_second'], latency.get('p50'),
+        latency.get('p99'), result['queries_per_request'])
+    if result['errors']:
+        line += '  %d errors' % result['errors']
+    previous = baseline.get(
+        (result['size'], result['scenario'], result['mode']))
+    if previous and previous['requests_per_second']:
+        change = (result['requests_per_second'] /
+                  previous['requests_per_second'] - 1) * 100
+        line += '  (%+.1f%% req/s)' % change
+    print(line)
+
+
+def main(argv=None):
+    args = _arguments(argv)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+
+    import django
+    django.setup()
+
+    from django.conf import settings
+
+    from benchmarks import runner, seed
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as stream:
+            for result in json.load(stream)['results']:
+                baseline[(result['size'], result['scenario'],
+                          result['mode'])] = result
+
+    scenarios = runner.SCENARIOS
+    if args.scenarios:
+        wanted = args.scenarios.split(',')
+        scenarios = [s for s in scenarios if s.name in wanted]
+    modes = ('client', 'server') if args.mode == 'both' else (args.mode,)
+
+    results = []
+    for size in (seed.parse_size(value) for value in args.sizes.split(',')):
+        seed.use_database(size)
+        inserted = seed.seed(size, progress=lambda importer: print(
+            '  seeded %d books' % importer.imported, file=sys.stderr))
+        if inserted:
+            print('Seeded %d books.' % inserted, file=sys.stderr)
+
+        for scenario_class in scenarios:
+            for mode in modes:
+                scenario = scenario_class()
+                if mode == 'client':
+                    summary = runner.run_client(scenario, args.requests)
+                else:
+                    summary = runner.run_server(
+                        scenario, args.requests, args.concurrency)
+                summary.update({
+                    'size': size, 'scenario': scenario.name, 'mode': mode,
+                    'concurrency': 1 if mode == 'client'
+                    else args.concurrency,
+                })
+                results.append(summary)
+                _report(summary, baseline)
+
+    commit = _commit()
+    output = args.output or os.path.join(
+        settings.BENCHMARK_DIR, 'results-%s-%s.json' % (
+            commit or 'unknown',
+            datetime.datetime.utcnow().strftime('%Y%m%dT%H%M%S')))
+    with open(output, 'w') as stream:
+        json.dump({
+            'commit': commit,
+            'created': datetime.datetime.utcnow().isoformat() + 'Z',
+            'python': platform.python_version(),
+            'results': results,
+        }, stream, indent=2)
+    print('Results written to %s' % output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+
+"""Drive API scenarios and measure them.
+
+A scenario builds one request at a time. The same scenario runs through
+Django's test client (in process, one request at a time) or against a
+threaded local WSGI server with several concurrent HTTP clients.
+
+Query counts come from `school_library.metrics`, which observes every
+request in either mode.
+"""
+
+import itertools
+import json
+import math
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from socketserver import ThreadingMixIn
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.test import Client
+from django.urls import reverse
+
+from benchmarks.seed import BENCHMARK_PASSWORD, BENCHMARK_USERNAME
+from school_library import metrics
+
+
+class Scenario(object):
+    """
+    One kind of API request.
+
+    `view` is the URL name the request resolves to, used to read its
+    query count from the metrics registry.
+    """
+    name = None
+    view = None
+    method = 'GET'
+
+    def setup(self, client):
+        """Prepare with a test `client`, e.g. to obtain a token."""
+
+    def request(self, number):
+        """Return ``(path, body, headers)`` for request `number`."""
+        raise NotImplementedError
+
+
+def _login(client):
+    response = client.post(
+        reverse('users-api:login'),
+        {'username': BENCHMARK_USERNAME, 'password': BENCHMARK_PASSWORD})
+    return {'HTTP_AUTHORIZATION': 'JWT %s' % response.json()['token']}
+
+
+class BookListScenario(Scenario):
+    name = 'book-list'
+    view = 'books-api:book-list'
+    query = '?page_size=50'
+
+    def setup(self, client):
+        self.headers = _login(client)
+
+    def request(self, number):
+        return (reverse(self.view) + self.query, None, self.headers)
+
+
+class CompactBookListScenario(BookListScenario):
+    name = 'book-list-compact'
+    query = '?page_size=50&compact=1'
+
+
+class UserRegistrationScenario(Scenario):
+    name = 'user-register'
+    view = 'users-api:user-list'
+    method = 'POST'
+
+    def request(self, number):
+        username = 'bench-%s' % uuid.uuid4().hex[:12]
+        return (reverse(self.view), {
+            'username': username,
+            'email': '%s@example.com' % username,
+            'password': 'bench-%d-password' % number,
+            'first_name': 'Bench',
+            'last_name': 'User',
+            'city': 'Kathmandu',
+        }, {})
+
+
+class LoginScenario(Scenario):
+    name = 'jwt-login'
+    view = 'users-api:login'
+    method = 'POST'
+
+    def request(self, number):
+        return (reverse(self.view), {
+            'username': BENCHMARK_USERNAME, 'password': BENCHMARK_PASSWORD,
+        }, {})
+
+
+SCENARIOS = [
+    BookListScenario, CompactBookListScenario, UserRegistrationScenario,
+    LoginScenario,
+]
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an ascending list."""
+    if not ordered:
+        return None
+    index = max(0, int(math.ceil(fraction * len(ordered))) - 1)
+    return ordered[index]
+
+
+def summarize(latencies, elapsed, errors, queries):
+    ordered = sorted(latencies)
+    return {
+        'requests': len(ordered),
+        'errors': errors,
+        'requests_per_second': round(len(ordered) / elapsed, 2)
+        if elapsed else None,
+        'latency_ms': {
+            name: round(percentile(ordered, fraction) * 1000, 3)
+            for name, fraction in (
+                ('p50', 0.5), ('p90', 0.9), ('p99', 0.99), ('max', 1.0))
+        } if ordered else {},
+        'queries_per_request': queries,
+    }
+
+
+def _queries(view, before):
+    requests, queries = metrics.registry.totals(view)
+    requests -= before[0]
+    if not requests:
+        return None
+    return round((queries - before[1]) / requests, 2)
+
+
+def run_client(scenario, requests):
+    """
+    Run `requests` requests of `scenario` through Django's test client.
+    """
+    client = Client()
+    scenario.setup(client)
+    send = client.post if scenario.method == 'POST' else client.get
+
+    before = metrics.registry.totals(scenario.view)
+    latencies, errors = [], 0
+    started = time.perf_counter()
+    for number in range(requests):
+        path, body, headers = scenario.request(number)
+        start = time.perf_counter()
+        response = send(path, body, **headers) if body is not None \
+            else send(path, **headers)
+        latencies.append(time.perf_counter() - start)
+        errors += response.status_code >= 400
+    elapsed = time.perf_counter() - started
+    return summarize(
+        latencies, elapsed, errors, _queries(scenario.view, before))
+
+
+class _ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class LocalServer(object):
+    """
+    A threaded WSGI server for the project on a free local port.
+    """
+
+    def __enter__(self):
+        self.server = make_server(
+            '127.0.0.1', 0, WSGIHandler(),
+            server_class=_ThreadingWSGIServer, handler_class=_QuietHandler)
+        self.url = 'http://127.0.0.1:%d' % self.server.server_port
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _http_headers(headers):
+    return {'Authorization': headers['HTTP_AUTHORIZATION']} \
+        if 'HTTP_AUTHORIZATION' in headers else {}
+
+
+def run_server(scenario, requests, concurrency):
+    """
+    Run `requests` requests of `scenario` against a local WSGI server from
+    `concurrency` client threads.
+    """
+    scenario.setup(Client())
+    numbers = itertools.count()
+
+    with LocalServer() as server:
+        def send(_):
+            path, body, headers = scenario.request(next(numbers))
+            data = None
+            headers = _http_headers(headers)
+            if body is not None:
+                data = json.dumps(body).encode('utf-8')
+                headers['Content-Type'] = 'application/json'
+            start = time.perf_counter()
+            try:
+                with urlopen(Request(
+                        server.url + path, data=data, headers=headers,
+                        method=scenario.method)) as response:
+                    response.read()
+                failed = False
+            except HTTPError as error:
+                error.read()
+                failed = True
+            return time.perf_counter() - start, failed
+
+        before = metrics.registry.totals(scenario.view)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(send, range(requests)))
+        elapsed = time.perf_counter() - started
+
+    return summarize(
+        [latency for latency, _ in results], elapsed,
+        sum(failed for _, failed in results),
+        _queries(scenario.view, before))
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+"""Synthetic catalogs for the benchmarks.
+"""
+
+import os
+import random
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connections
+
+BENCHMARK_USERNAME = 'benchmark'
+BENCHMARK_PASSWORD = 'benchmark-password'
+
+SUBJECTS = ('Science', 'History', 'Economics', 'Poetry', 'Fiction', 'Math',
+            'Art', 'Computing')
+LANGUAGES = ('English', 'Nepali', 'Hindi')
+BOOK_TYPES = (('Lending', 14), ('Reference', 0), ('Short loan', 3))
+WORDS = ('river', 'mountain', 'market', 'history', 'garden', 'city',
+         'night', 'money', 'light', 'road', 'school', 'song', 'war',
+         'valley', 'kingdom', 'letter', 'machine', 'number', 'sea', 'tiger')
+
+
+def parse_size(value):
+    """
+    Parse a catalog size such as ``1000``, ``100k`` or ``1M``.
+    """
+    value = value.strip()
+    multiplier = {'k': 1000, 'm': 1000000}.get(value[-1:].lower(), 1)
+    if multiplier > 1:
+        value = value[:-1]
+    return int(float(value) * multiplier)
+
+
+def use_database(size):
+    """
+    Point the default connection at the database of catalog `size`,
+    creating its schema if needed.
+    """
+    os.makedirs(settings.BENCHMARK_DIR, exist_ok=True)
+    connection = connections['default']
+    connection.close()
+    connection.settings_dict['NAME'] = os.path.join(
+        settings.BENCHMARK_DIR, 'catalog-%d.sqlite3' % size)
+    call_command('migrate', verbosity=0, interactive=False)
+
+
+def records(start, stop, seed=0):
+    """
+    Yield synthetic import records for books `start` to `stop`.
+
+    Authors, tags and publishers are drawn from pools that grow with the
+    catalog, so lookups are shared between books as in a real library.
+    """
+    rng = random.Random(seed + start)
+    authors = max(50, stop // 5)
+    publishers = max(20, stop // 200)
+    for number in range(start, stop):
+        book_type, days = rng.choice(BOOK_TYPES)
+        publisher = rng.randrange(publishers)
+        yield {
+            'title': ' '.join(rng.sample(WORDS, 3)).title(),
+            'subject': rng.choice(SUBJECTS),
+            'summary': ' '.join(rng.choice(WORDS) for _ in range(30)),
+            'isbn': '%013d' % number,
+            'language': rng.choice(LANGUAGES),
+            'number_of_copies': rng.randint(1, 5),
+            'barcode': 'BENCH-%08d' % number,
+            'publisher': 'Publisher %d' % publisher,
+            'publication_year': 1950 + publisher % 70,
+            'publication_place': 'Kathmandu',
+            'book_type': book_type,
+            'days_amount': days,
+            'authors': ['Author%d Writer%d' % (a, a) for a in rng.sample(
+                range(authors), rng.randint(1, 3))],
+            'keywords': ['tag-%d' % t for t in rng.sample(
+                range(200), rng.randint(1, 4))],
+        }
+
+
+def seed(size, progress=None):
+    """
+    Fill the current database up to `size` books and make sure the
+    benchmark user exists. Returns the number of books inserted.
+    """
+    from books.importer import BookImporter
+    from books.models import Book
+    from users.models import User
+
+    if not User.objects.filter(username=BENCHMARK_USERNAME).exists():
+        User.objects.create_user(
+            username=BENCHMARK_USERNAME, password=BENCHMARK_PASSWORD,
+            email='benchmark@example.com', city='Kathmandu')
+
+    existing = Book.objects.count()
+    if existing >= size:
+        return 0
+    importer = BookImporter(batch_size=5000, progress=progress)
+    return importer.run(records(existing, size))
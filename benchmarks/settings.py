@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+
+"""Settings of the benchmark runs: the project settings, minus debugging.
+
+The database is chosen per catalog size by `benchmarks.seed`.
+"""
+
+import os
+
+from school_library.settings import *  # noqa: F401,F403
+from school_library.database import sqlite_database
+from school_library.settings import BASE_DIR, MIDDLEWARE
+
+DEBUG = False
+
+ALLOWED_HOSTS = ['*']
+
+# The runner reads query counts from the metrics registry, whatever
+# SCHOOL_LIBRARY_METRICS says.
+METRICS_MIDDLEWARE = 'school_library.metrics.MetricsMiddleware'
+MIDDLEWARE = [METRICS_MIDDLEWARE] + [
+    name for name in MIDDLEWARE if name != METRICS_MIDDLEWARE]
+
+BENCHMARK_DIR = os.environ.get(
+    'SCHOOL_LIBRARY_BENCHMARK_DIR', os.path.join(BASE_DIR, '.benchmarks'))
+
+DATABASES = {
+    'default': sqlite_database(
+        os.path.join(BENCHMARK_DIR, 'catalog.sqlite3')),
+}
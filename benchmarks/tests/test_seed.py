@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from benchmarks import runner, seed
+from benchmarks import settings as benchmark_settings
+from books.importer import BookImporter
+from books.models import Book
+
+
+@pytest.mark.parametrize('value, size', [
+    ('1000', 1000), ('1k', 1000), ('100k', 100000), ('1M', 1000000),
+    ('2.5k', 2500),
+])
+def test_parse_size(value, size):
+    assert seed.parse_size(value) == size
+
+
+@pytest.mark.django_db
+def test_synthetic_records_import_cleanly():
+    importer = BookImporter()
+    importer.run(seed.records(0, 20))
+
+    assert importer.errors == []
+    assert Book.objects.count() == 20
+    assert all(book.author_list for book in Book.objects.all())
+
+
+@pytest.mark.django_db
+def test_client_runs_report_queries_per_request(settings, django_user_model):
+    settings.MIDDLEWARE = benchmark_settings.MIDDLEWARE
+    django_user_model.objects.create_user(
+        username=seed.BENCHMARK_USERNAME, password=seed.BENCHMARK_PASSWORD,
+        city='Kathmandu')
+
+    result = runner.run_client(runner.LoginScenario(), 2)
+
+    assert result['errors'] == 0
+    assert isinstance(result['queries_per_request'], float)
+
+
+def test_percentile_is_nearest_rank():
+    ordered = list(range(1, 101))
+
+    assert runner.percentile(ordered, 0.5) == 50
+    assert runner.percentile(ordered, 0.99) == 99
+    assert runner.percentile(ordered, 1.0) == 100
+    assert runner.percentile([], 0.5) is None
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+
+"""In-process bloom filter over the barcodes in the catalog.
+
+A bloom filter never forgets a barcode it was told about, so a negative
+answer proves the barcode is unknown and the database does not need to be
+asked. Positive answers may be false and are always confirmed by a query.
+
+The filter is opt-in through ``settings.BOOKS_BARCODE_BLOOM_FILTER``::
+
+    BOOKS_BARCODE_BLOOM_FILTER = {
+        'CAPACITY': 1000000,      # expected number of barcodes
+        'ERROR_RATE': 0.001,      # false positive rate at capacity
+        'REFRESH_SECONDS': 300,   # reload from the database this often
+    }
+
+Barcodes saved by this process are added immediately. Barcodes saved by
+other processes are only seen after the next refresh, so keep the refresh
+interval short when several processes write to the catalog. Refreshes run
+in a background thread while the previous filter keeps answering.
+"""
+
+import hashlib
+import logging
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter(object):
+    """
+    Fixed-size bloom filter over strings.
+    """
+
+    def __init__(self, capacity, error_rate):
+        capacity = max(int(capacity), 1)
+        self.size = int(math.ceil(
+            -capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(
+            1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.hash_count):
+            yield (first + i * second) % self.size
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7))
+                   for position in self._positions(item))
+
+
+_filter = None
+_loaded_at = 0.0
+# Codes remembered while a reload runs, added to the new filter before it
+# replaces the old one; None when no reload runs.
+_pending = None
+# Bumped by `reset`, so a reload started before it is thrown away.
+_generation = 0
+_lock = threading.Lock()
+
+
+def _options():
+    return getattr(settings, 'BOOKS_BARCODE_BLOOM_FILTER', None)
+
+
+def _load(options):
+    from books.models import Book
+
+    bloom = BloomFilter(options.get('CAPACITY', 1000000),
+                        options.get('ERROR_RATE', 0.001))
+    barcodes = Book.objects.exclude(barcode=None).values_list(
+        'barcode', flat=True)
+    for barcode in barcodes.iterator():
+        bloom.add(barcode)
+    return bloom
+
+
+def _reload(options, generation):
+    """
+    Build a new filter in a background thread and swap it in.
+    """
+    global _filter, _loaded_at, _pending
+    try:
+        bloom = _load(options)
+    except Exception:
+        logger.exception('Cannot reload the barcode filter.')
+        bloom = None
+    finally:
+        connection.close()
+    with _lock:
+        if generation != _generation:
+            return
+        if bloom is not None:
+            for code in _pending:
+                bloom.add(code)
+            _filter = bloom
+        # After a failure too: the next attempt waits a full interval.
+        _loaded_at = time.time()
+        _pending = None
+
+
+def get_filter():
+    """
+    Return the current bloom filter, or None when it is disabled.
+
+    The first call of a process loads the filter. Later ones keep
+    answering from it while a background thread reloads it, every
+    ``REFRESH_SECONDS``.
+    """
+    global _filter, _loaded_at, _pending
+    options = _options()
+    if not options:
+        return None
+    if _filter is None:
+        with _lock:
+            if _filter is None:
+                _filter = _load(options)
+                _loaded_at = time.time()
+        return _filter
+
+    refresh = options.get('REFRESH_SECONDS', 300)
+    if refresh and _pending is None and time.time() - _loaded_at > refresh:
+        with _lock:
+            if _pending is None and time.time() - _loaded_at > refresh:
+                _pending = []
+                thread = threading.Thread(
+                    target=_reload, args=(options, _generation),
+                    name='barcode-filter-reload')
+                thread.daemon = True
+                thread.start()
+    return _filter
+
+
+def might_exist(code):
+    """
+    False only when `code` is certainly not a known barcode.
+    """
+    bloom = get_filter()
+    return bloom is None or code in bloom
+
+
+def remember(codes):
+    """
+    Add newly saved barcodes to an already loaded filter, and to the one
+    being reloaded.
+    """
+    if not _options() or _filter is None:
+        return
+    codes = [code for code in codes if code]
+    with _lock:
+        if _filter is not None:
+            for code in codes:
+                _filter.add(code)
+        if _pending is not None:
+            _pending.extend(codes)
+
+
+def reset():
+    """
+    Drop the filter so the next lookup reloads it.
+    """
+    global _filter, _pending, _generation
+    with _lock:
+        _filter = _pending = None
+        _generation += 1
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+"""Read-through cache of serialized book payloads.
+
+`BookDetailSerializer` output is stored per book in the cache named by
+``settings.BOOKS_CACHE_ALIAS``. Receivers in `books.signals` delete the
+entries of the books affected by a change to a book or to one of its
+publisher, book type, authors or tags, leaving every other entry warm.
+"""
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+# Part of every key; bump it whenever the cached payload's shape changes so
+# entries written by older code are never served.
+PAYLOAD_VERSION = 3
+
+
+def get_cache():
+    return caches[settings.BOOKS_CACHE_ALIAS]
+
+
+def cache_key(pk):
+    return 'book-payload:%s' % pk
+
+
+def get_payloads(pks):
+    """
+    Return ``{pk: payload}`` for the books found in the cache.
+    """
+    keys = {cache_key(pk): pk for pk in pks}
+    if not keys:
+        return {}
+    found = get_cache().get_many(list(keys), version=PAYLOAD_VERSION)
+    return {keys[key]: payload for key, payload in found.items()}
+
+
+def set_payloads(payloads):
+    """
+    Store ``{pk: payload}`` in the cache.
+    """
+    if payloads:
+        get_cache().set_many(
+            {cache_key(pk): payload for pk, payload in payloads.items()},
+            version=PAYLOAD_VERSION)
+
+
+def _delete(keys):
+    get_cache().delete_many(keys, version=PAYLOAD_VERSION)
+
+
+def invalidate(pks):
+    """
+    Drop the cached payloads of the given books.
+
+    Within a transaction they are dropped again once it commits: until
+    then other connections still read the old rows, and a concurrent
+    request may cache the old payload meanwhile.
+    """
+    keys = [cache_key(pk) for pk in pks]
+    if keys:
+        _delete(keys)
+        if transaction.get_connection().in_atomic_block:
+            transaction.on_commit(lambda: _delete(keys))
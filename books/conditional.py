@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+"""Validators for conditional GETs of the book endpoints.
+
+Used with `django.views.decorators.http.condition`, so a request whose
+``If-None-Match`` or ``If-Modified-Since`` still matches is answered with
+304 after a single aggregate query, before any book is serialized.
+
+A book's `modified` timestamp moves on every save, and receivers in
+`books.signals` also move it when its authors, tags, publisher or book type
+change. The list ETag adds the row count, which catches deletions. Note
+that ``Last-Modified`` on the list cannot reflect a deletion; clients
+should revalidate with the ETag, which takes precedence when both are sent.
+"""
+
+import hashlib
+
+from django.db.models import Count, Max
+
+from books import cache
+from books.models import Book
+
+
+def _catalog_state(request):
+    # condition() asks for the ETag and Last-Modified separately; run the
+    # aggregate once per request.
+    if not hasattr(request, '_book_catalog_state'):
+        request._book_catalog_state = Book.objects.aggregate(
+            last_modified=Max('modified'), count=Count('pk'))
+    return request._book_catalog_state
+
+
+def _book_modified(request, pk):
+    if not hasattr(request, '_book_modified'):
+        request._book_modified = Book.objects.filter(pk=pk).values_list(
+            'modified', flat=True).first()
+    return request._book_modified
+
+
+def _etag(*parts):
+    return hashlib.sha1(
+        '|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+
+def list_etag(request, *args, **kwargs):
+    """
+    ETag of a page of the book list.
+
+    The page depends on the query string (cursor, page size) and the
+    rendering on the Accept header, so both are part of the tag.
+    """
+    state = _catalog_state(request)
+    if state['last_modified'] is None:
+        return None
+    return _etag(
+        cache.PAYLOAD_VERSION, state['last_modified'].isoformat(),
+        state['count'], request.get_full_path(),
+        request.META.get('HTTP_ACCEPT', ''))
+
+
+def list_last_modified(request, *args, **kwargs):
+    return _catalog_state(request)['last_modified']
+
+
+def detail_etag(request, pk, *args, **kwargs):
+    modified = _book_modified(request, pk)
+    if modified is None:
+        return None
+    return _etag(
+        cache.PAYLOAD_VERSION, modified.isoformat(), request.get_full_path(),
+        request.META.get('HTTP_ACCEPT', ''))
+
+
+def detail_last_modified(request, pk, *args, **kwargs):
+    return _book_modified(request, pk)
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+"""Maintenance of the denormalized `Book.author_names` and
+`Book.published_year` columns.
+
+`books.signals` calls these helpers whenever authors, publishers or the
+links between them and books change; the ``denormalize_books`` command uses
+them to backfill existing rows.
+"""
+
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+
+from school_library.utils import chunks
+
+# Author names are single-line, so a newline cannot clash with them.
+AUTHOR_SEPARATOR = '\n'
+
+
+def join_author_names(names):
+    return AUTHOR_SEPARATOR.join(names)
+
+
+def split_author_names(value):
+    return value.split(AUTHOR_SEPARATOR) if value else []
+
+
+def author_names_for(book_pks):
+    """
+    Map each of the given book ids to its joined author names.
+
+    Authors keep the order in which they were linked to the book.
+    """
+    from books.models import Book
+
+    names = defaultdict(list)
+    rows = Book.authors.through.objects.filter(
+        book_id__in=book_pks).order_by('pk').values_list(
+        'book_id', 'author__first_name', 'author__last_name')
+    for book_id, first_name, last_name in rows:
+        names[book_id].append('%s %s' % (first_name, last_name))
+    return {pk: join_author_names(names[pk]) for pk in book_pks}
+
+
+def refresh_author_names(book_pks, chunk_size=500):
+    """
+    Recompute `author_names` for the given books.
+
+    Rows whose value did not change are left alone, and books sharing a
+    value are updated together.
+
+    Returns:
+        int: number of books updated.
+    """
+    from books.models import Book
+
+    updated = 0
+    for chunk in chunks(book_pks, chunk_size):
+        wanted = author_names_for(chunk)
+        current = Book.objects.filter(pk__in=chunk).values_list(
+            'pk', 'author_names')
+        changed = defaultdict(list)
+        for pk, value in current:
+            if wanted[pk] != value:
+                changed[wanted[pk]].append(pk)
+        with transaction.atomic():
+            for value, pks in changed.items():
+                updated += Book.objects.filter(pk__in=pks).update(
+                    author_names=value)
+    return updated
+
+
+def refresh_published_year(books):
+    """
+    Copy the publisher's `publication_year` onto every book in `books`
+    with a single UPDATE.
+
+    Returns:
+        int: number of books updated.
+    """
+    from books.models import Publisher
+
+    return books.update(published_year=Subquery(
+        Publisher.objects.filter(pk=OuterRef('publisher_id')).values(
+            'publication_year')[:1]))
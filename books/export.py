@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+"""Streaming export of the whole catalog.
+
+Books are read in primary-key ordered chunks, so memory use is bounded by
+the chunk size rather than the catalog size and the response starts before
+the last chunk is read.
+"""
+
+from rest_framework.utils.encoders import JSONEncoder
+
+from books.models import Book
+
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'json': 'application/json',
+}
+
+
+def iter_chunks(queryset, chunk_size=500):
+    """
+    Yield lists of at most `chunk_size` rows from `queryset`.
+
+    Each chunk is a separate keyset query on the primary key. Django's
+    `QuerySet.iterator()` would skip `prefetch_related`; here the caller's
+    serializer can prefetch relations one chunk at a time.
+    """
+    last_pk = None
+    queryset = queryset.order_by('pk')
+    while True:
+        chunk = queryset if last_pk is None \
+            else queryset.filter(pk__gt=last_pk)
+        chunk = list(chunk[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_pk = chunk[-1].pk
+
+
+def iter_payloads(serializer_class, queryset=None, chunk_size=500):
+    """
+    Yield one list of serialized books per chunk.
+    """
+    if queryset is None:
+        queryset = Book.objects.select_related('book_type', 'publisher')
+    for chunk in iter_chunks(queryset, chunk_size):
+        yield serializer_class(chunk, many=True).data
+
+
+def stream(export_format, serializer_class, queryset=None, chunk_size=500):
+    """
+    Yield the export as text fragments, one per chunk.
+
+    ``'ndjson'`` writes one JSON document per line; ``'json'`` writes a
+    single JSON array.
+    """
+    encoder = JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    chunks = iter_payloads(serializer_class, queryset, chunk_size)
+
+    if export_format == 'ndjson':
+        for payloads in chunks:
+            yield ''.join(encoder.encode(p) + '\n' for p in payloads)
+        return
+
+    # Send the opening bracket before the first query runs.
+    yield '['
+    separator = ''
+    for payloads in chunks:
+        yield separator + ','.join(encoder.encode(p) for p in payloads)
+        separator = ','
+    yield ']'
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+
+"""Book counts per tag, book type, publisher and language.
+
+Counting books per tag on every page view is a GROUP BY over
+``books_book_keywords``. Instead `FacetCount` keeps one row per facet
+value with its number of books and its label, adjusted by the receivers in
+`books.signals` as books, their keywords and the labelled objects change.
+Listing a facet is then one range scan of ``books_facet_count_idx``,
+whatever the size of the catalog. ``manage.py rebuild_facets`` recounts
+everything.
+
+Books without a book type, publisher or language are not counted.
+"""
+
+from collections import Counter, defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from rest_framework.exceptions import ValidationError
+
+from books.models import Book, BookType, FacetCount, Publisher, Tag
+
+FACETS = [facet for facet, _ in FacetCount.FACETS]
+
+# Book columns of the single-valued facets.
+COLUMNS = {
+    FacetCount.BOOK_TYPE: 'book_type_id',
+    FacetCount.PUBLISHER: 'publisher_id',
+    FacetCount.LANGUAGE: 'language',
+}
+
+LABELLED = {
+    FacetCount.TAG: Tag,
+    FacetCount.BOOK_TYPE: BookType,
+    FacetCount.PUBLISHER: Publisher,
+}
+
+_through = Book.keywords.through
+
+
+def book_values(values):
+    """
+    ``{facet: value}`` of the single-valued facets of a book, given its
+    `COLUMNS` as a mapping.
+    """
+    return {facet: str(values[column]) for facet, column in COLUMNS.items()
+            if values[column] not in (None, '')}
+
+
+def values_of(book):
+    return book_values({column: getattr(book, column)
+                        for column in COLUMNS.values()})
+
+
+def _label(facet, value):
+    if facet == FacetCount.LANGUAGE:
+        return value
+    name = LABELLED[facet].objects.filter(pk=value).values_list(
+        'name', flat=True).first()
+    return name or ''
+
+
+def adjust(facet, deltas):
+    """
+    Add ``{value: delta}`` to the book counts of the values of `facet`.
+    """
+    for value, delta in deltas.items():
+        if not delta:
+            continue
+        value = str(value)
+        counts = FacetCount.objects.filter(facet=facet, value=value)
+        if counts.update(count=F('count') + delta) or delta < 0:
+            continue
+        # The first book with this value.
+        try:
+            with transaction.atomic():
+                FacetCount.objects.create(
+                    facet=facet, value=value, label=_label(facet, value),
+                    count=delta)
+        except IntegrityError:
+            counts.update(count=F('count') + delta)
+
+
+def book_changed(before, after):
+    """
+    Move a book's counts from the facet values `before` to those `after`.
+    """
+    for facet in COLUMNS:
+        old, new = before.get(facet), after.get(facet)
+        if old != new:
+            adjust(facet, {value: delta for value, delta in (
+                (old, -1), (new, 1)) if value is not None})
+
+
+def relabel(facet, value, label):
+    FacetCount.objects.filter(facet=facet, value=str(value)).exclude(
+        label=label).update(label=label)
+
+
+def remove(facet, value):
+    FacetCount.objects.filter(facet=facet, value=str(value)).delete()
+
+
+def count_books(pks, chunk_size=500):
+    """
+    Return ``{facet: Counter({value: books})}`` over the given books.
+    """
+    pks = list(pks)
+    counts = defaultdict(Counter)
+    for start in range(0, len(pks), chunk_size):
+        chunk = pks[start:start + chunk_size]
+        _count(counts, Book.objects.filter(pk__in=chunk),
+               _through.objects.filter(book_id__in=chunk))
+    return counts
+
+
+def _count(counts, books, links):
+    for facet, column in COLUMNS.items():
+        rows = books.exclude(**{column: None})
+        if facet == FacetCount.LANGUAGE:
+            rows = rows.exclude(language='')
+        for row in rows.order_by().values(column).annotate(n=Count('pk')):
+            counts[facet][str(row[column])] += row['n']
+    for row in links.order_by().values('tag_id').annotate(n=Count('pk')):
+        counts[FacetCount.TAG][str(row['tag_id'])] += row['n']
+
+
+def books_added(pks):
+    """
+    Count books inserted without per-book signals, e.g. by books.importer.
+    """
+    for facet, counts in count_books(pks).items():
+        adjust(facet, counts)
+
+
+@transaction.atomic
+def rebuild():
+    """
+    Recount every facet from scratch. Return the number of facet values.
+    """
+    counts = defaultdict(Counter)
+    _count(counts, Book.objects.all(), _through.objects.all())
+    labels = {
+        facet: {str(pk): name for pk, name in model.objects.filter(
+            pk__in=list(counts[facet])).values_list('pk', 'name')}
+        for facet, model in LABELLED.items()}
+    FacetCount.objects.all().delete()
+    FacetCount.objects.bulk_create(
+        FacetCount(facet=facet, value=value, count=count,
+                   label=labels.get(facet, {}).get(value, value))
+        for facet, values in counts.items()
+        for value, count in values.items())
+    return sum(len(values) for values in counts.values())
+
+
+def facet_counts(facet, limit=20):
+    """
+    The `limit` values of `facet` with the most books, as ``value``,
+    ``label``, ``count`` dicts.
+    """
+    return list(FacetCount.objects.filter(facet=facet, count__gt=0).order_by(
+        '-count', 'value').values('value', 'label', 'count')[:limit])
+
+
+def filter_books(queryset, params):
+    """
+    Narrow `queryset` to the books having, for every facet in `params`,
+    one of its comma separated values.
+    """
+    for facet in FACETS:
+        values = [value for value in params.get(facet, '').split(',')
+                  if value]
+        if not values:
+            continue
+        if facet == FacetCount.LANGUAGE:
+            queryset = queryset.filter(language__in=values)
+            continue
+        try:
+            ids = [int(value) for value in values]
+        except ValueError:
+            raise ValidationError({facet: ['Expected comma separated ids.']})
+        if facet == FacetCount.TAG:
+            # A subquery, so books with several of the tags appear once.
+            queryset = queryset.filter(pk__in=_through.objects.filter(
+                tag_id__in=ids).values('book_id'))
+        else:
+            queryset = queryset.filter(**{COLUMNS[facet] + '__in': ids})
+    return queryset
@@ -0,0 +1,365 @@
+# -*- coding: utf-8 -*-
+
+"""Bulk loading of catalog records.
+
+`BookImporter` turns flat records (from CSV or NDJSON, see
+`school_library.utils.read_records`) into books with a handful of queries
+per batch instead of several queries per book:
+
+* authors, publishers, tags and book types are deduplicated in memory and
+  only the missing ones are inserted, with `bulk_create`;
+* books are inserted in one statement batch, their denormalized columns
+  already filled in;
+* `Book.authors` and `Book.keywords` links are inserted straight into the
+  through tables, with one `executemany` each.
+
+Bulk inserts send no `post_save` or `m2m_changed` signals, so after each
+batch `books.signals.books_imported` is sent with the new primary keys for
+the derived data (search index, barcode filter, ...) to catch up.
+"""
+
+import time
+
+from autoslug import utils as autoslug_utils
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from books import denormalize
+from books.models import Author, Book, BookType, Publisher, Tag
+from books.signals import books_imported
+from school_library.utils import RecordError, chunks
+
+# Separator of the multi-valued `authors` and `keywords` CSV columns.
+LIST_SEPARATOR = ';'
+
+
+def _text(value):
+    return '' if value is None else str(value).strip()
+
+
+def _int(value):
+    value = _text(value)
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise RecordError('%r is not a whole number.' % value)
+
+
+def _list(value):
+    if isinstance(value, (list, tuple)):
+        # NDJSON authors may also be {"first_name", "last_name"} objects.
+        return [v if isinstance(v, dict) else _text(v)
+                for v in value if v and (isinstance(v, dict) or _text(v))]
+    return [v.strip() for v in _text(value).split(LIST_SEPARATOR)
+            if v.strip()]
+
+
+def _author_key(value):
+    if isinstance(value, dict):
+        return (_text(value.get('first_name')), _text(value.get('last_name')))
+    first_name, _, last_name = value.rpartition(' ')
+    return (first_name, last_name)
+
+
+class BookImporter(object):
+    """
+    Imports catalog records in batches of `batch_size`.
+
+    Args:
+        batch_size (int): records inserted per transaction.
+        progress (callable): called after every batch with the importer.
+    """
+
+    def __init__(self, batch_size=2000, progress=None):
+        self.batch_size = batch_size
+        self.progress = progress
+        self.imported = 0
+        self.errors = []
+        self.started = None
+
+    @property
+    def rate(self):
+        """Books imported per second so far."""
+        elapsed = time.time() - self.started if self.started else 0
+        return self.imported / elapsed if elapsed else 0.0
+
+    def run(self, records):
+        """
+        Import every record; returns the number of books imported.
+
+        Invalid records are skipped and reported in `errors` as
+        ``(record number, message)`` pairs.
+        """
+        self.started = time.time()
+        self._load_lookups()
+        numbered = enumerate(records, 1)
+        for batch in chunks(numbered, self.batch_size):
+            with transaction.atomic():
+                pks = self._import_batch(batch)
+            if pks:
+                books_imported.send(sender=Book, pks=pks)
+            if self.progress:
+                self.progress(self)
+        return self.imported
+
+    def _load_lookups(self):
+        self._authors = {
+            (first, last): pk for pk, first, last in
+            Author.objects.values_list('pk', 'first_name', 'last_name')}
+        self._publishers = {
+            (name, year, place or ''): pk for pk, name, year, place in
+            Publisher.objects.values_list(
+                'pk', 'name', 'publication_year', 'publication_place')}
+        self._publisher_years = {
+            pk: key[1] for key, pk in self._publishers.items()}
+        self._tags = dict(
+            (name, pk) for pk, name in Tag.objects.values_list('pk', 'name'))
+        self._book_types = dict(
+            (name, pk) for pk, name in
+            BookType.objects.values_list('pk', 'name'))
+
+    def _import_batch(self, batch):
+        rows = []
+        for number, record in batch:
+            try:
+                rows.append((number, self._parse(record)))
+            except RecordError as error:
+                self.errors.append((number, str(error)))
+        rows = self._drop_duplicate_barcodes(rows)
+        if not rows:
+            return []
+
+        self._create_missing(rows)
+
+        books = [self._build_book(row) for _, row in rows]
+        pks = _insert_books(books)
+
+        _insert_links(Book.authors, [
+            (pk, self._authors[key])
+            for pk, (_, row) in zip(pks, rows) for key in row['authors']])
+        _insert_links(Book.keywords, [
+            (pk, self._tags[name])
+            for pk, (_, row) in zip(pks, rows) for name in row['keywords']])
+
+        self.imported += len(pks)
+        return pks
+
+    def _parse(self, record):
+        if isinstance(record, RecordError):
+            raise record
+        if not isinstance(record, dict):
+            raise RecordError('Expected an object, got %s.' % (
+                type(record).__name__))
+        title = _text(record.get('title'))
+        if not title:
+            raise RecordError('A title is required.')
+
+        authors = []
+        for value in _list(record.get('authors')):
+            key = _author_key(value)
+            if key not in authors:
+                authors.append(key)
+        keywords = []
+        for name in _list(record.get('keywords')):
+            if name not in keywords:
+                keywords.append(name)
+
+        publisher = _text(record.get('publisher'))
+        book_type = _text(record.get('book_type'))
+        return {
+            'title': title,
+            'subject': _text(record.get('subject')),
+            'summary': _text(record.get('summary')),
+            'isbn': _text(record.get('isbn')),
+            'language': _text(record.get('language')),
+            'status': _text(record.get('status')),
+            'number_of_copies': _int(record.get('number_of_copies')),
+            'barcode': _text(record.get('barcode')) or None,
+            'publisher': (
+                publisher, _int(record.get('publication_year')),
+                _text(record.get('publication_place')),
+            ) if publisher else None,
+            'book_type': (
+                book_type, _int(record.get('days_amount')),
+            ) if book_type else None,
+            'authors': authors,
+            'keywords': keywords,
+        }
+
+    def _drop_duplicate_barcodes(self, rows):
+        codes = [row['barcode'] for _, row in rows if row['barcode']]
+        taken = Book.check_barcodes(codes)
+        kept = []
+        for number, row in rows:
+            code = row['barcode']
+            if code and taken.get(code):
+                self.errors.append(
+                    (number, 'Barcode %s is already used.' % code))
+                continue
+            if code:
+                taken[code] = True
+            kept.append((number, row))
+        return kept
+
+    def _create_missing(self, rows):
+        authors, publishers, tags, book_types = {}, {}, {}, {}
+        for _, row in rows:
+            for key in row['authors']:
+                if key not in self._authors:
+                    authors[key] = Author(first_name=key[0], last_name=key[1])
+            if row['publisher'] and row['publisher'] not in self._publishers:
+                name, year, place = row['publisher']
+                publishers[row['publisher']] = Publisher(
+                    name=name, publication_year=year,
+                    publication_place=place or None)
+            for name in row['keywords']:
+                if name not in self._tags:
+                    tags[name] = Tag(name=name)
+            if row['book_type']:
+                name, days = row['book_type']
+                if name not in self._book_types:
+                    book_types[name] = BookType(name=name, days_amount=days)
+
+        for lookup, created in (
+                (self._authors, authors), (self._publishers, publishers),
+                (self._book_types, book_types)):
+            if created:
+                objs = list(created.values())
+                lookup.update(zip(created, _bulk_create(type(objs[0]), objs)))
+        if tags:
+            self._tags.update(_bulk_create_tags(list(tags.values())))
+        for key, pk in self._publishers.items():
+            self._publisher_years[pk] = key[1]
+
+    def _build_book(self, row):
+        publisher_id = self._publishers[row['publisher']] \
+            if row['publisher'] else None
+        book_type_id = self._book_types[row['book_type'][0]] \
+            if row['book_type'] else None
+        return Book(
+            title=row['title'],
+            subject=row['subject'],
+            summary=row['summary'],
+            isbn=row['isbn'],
+            language=row['language'],
+            availability=(row['number_of_copies'] or 0) > 0,
+            status=row['status'],
+            number_of_copies=row['number_of_copies'],
+            available_copies=row['number_of_copies'] or 0,
+            barcode=row['barcode'],
+            publisher_id=publisher_id,
+            book_type_id=book_type_id,
+            author_names=denormalize.join_author_names(
+                '%s %s' % key for key in row['authors']),
+            published_year=self._publisher_years.get(publisher_id),
+        )
+
+
+def _bulk_create(model, objs):
+    """
+    Insert `objs` and return their primary keys, in order.
+
+    Only some backends report the keys of bulk inserted rows. Elsewhere the
+    rows are read back as the keys above the previous maximum; callers hold
+    a transaction, which on SQLite excludes concurrent writers.
+    """
+    if connection.features.can_return_ids_from_bulk_insert:
+        return [obj.pk for obj in model.objects.bulk_create(objs)]
+
+    last_pk = model.objects.aggregate(last=Max('pk'))['last'] or 0
+    model.objects.bulk_create(objs)
+    return _read_back_pks(model, last_pk, len(objs))
+
+
+def _bulk_create_tags(tags):
+    """
+    Insert new tags and return ``{name: primary key}``.
+
+    Each tag still costs one slug uniqueness query, but only once per
+    distinct tag rather than once per book. The query only sees tags in the
+    database, so names slugifying alike ("Computer Science",
+    "computer-science") are inserted in successive rounds, each seeing
+    the slugs of the previous ones.
+    """
+    field = Tag._meta.get_field('slug')
+    pks = {}
+    while tags:
+        rounded, later, slugs = [], [], set()
+        for tag in tags:
+            slug = autoslug_utils.crop_slug(field, field.slugify(tag.name))
+            (later if slug in slugs else rounded).append(tag)
+            slugs.add(slug)
+        pks.update(zip((tag.name for tag in rounded),
+                       _bulk_create(Tag, rounded)))
+        tags = later
+    return pks
+
+
+def _read_back_pks(model, last_pk, count):
+    pks = list(model.objects.filter(pk__gt=last_pk).order_by('pk')
+               .values_list('pk', flat=True))
+    if len(pks) != count:
+        raise RuntimeError(
+            'Concurrent inserts into %s while importing.'
+            % model._meta.db_table)
+    return pks
+
+
+def _insert_books(books):
+    """
+    Insert `books` and return their primary keys, in order.
+
+    Where the backend cannot return the keys of a bulk insert, the rows are
+    sent with a single `executemany`, skipping the ORM's per-value SQL
+    compilation, which otherwise dominates the import. Apart from its
+    timestamps every `Book` column holds a plain str, int, bool or None,
+    which database drivers accept as is.
+    """
+    if connection.features.can_return_ids_from_bulk_insert:
+        return _bulk_create(Book, books)
+
+    now = timezone.now()
+    fields = [f for f in Book._meta.concrete_fields if not f.primary_key]
+    values = []
+    for field in fields:
+        if getattr(field, 'auto_now', False) or \
+                getattr(field, 'auto_now_add', False):
+            values.append(field.get_db_prep_save(now, connection))
+        else:
+            values.append(None)
+
+    sql = 'INSERT INTO %s (%s) VALUES (%s)' % (
+        connection.ops.quote_name(Book._meta.db_table),
+        ', '.join(connection.ops.quote_name(f.column) for f in fields),
+        ', '.join(['%s'] * len(fields)))
+    rows = [
+        tuple(getattr(book, field.attname) if value is None else value
+              for field, value in zip(fields, values))
+        for book in books]
+
+    last_pk = Book.objects.aggregate(last=Max('pk'))['last'] or 0
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+    return _read_back_pks(Book, last_pk, len(books))
+
+
+def _insert_links(descriptor, pairs):
+    """
+    Insert ``(book id, related id)`` rows into a many-to-many through table.
+
+    The rows are plain pairs of ids, so they skip model instantiation and
+    are sent with a single `executemany`.
+    """
+    if not pairs:
+        return
+    field = descriptor.field
+    through = field.remote_field.through
+    sql = 'INSERT INTO %s (%s, %s) VALUES (%%s, %%s)' % (
+        connection.ops.quote_name(through._meta.db_table),
+        connection.ops.quote_name(field.m2m_column_name()),
+        connection.ops.quote_name(field.m2m_reverse_name()))
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, pairs)
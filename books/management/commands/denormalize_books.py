@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+
+from django.core.management.base import BaseCommand
+
+from books import denormalize
+from books.models import Book
+
+
+class Command(BaseCommand):
+    help = ('Backfill the denormalized author names and publication year '
+            'of every book.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help='Number of books read per batch (default: 2000).')
+
+    def handle(self, *args, **options):
+        years = denormalize.refresh_published_year(Book.objects.all())
+        self.stdout.write('Copied the publication year onto %d books.' % years)
+
+        names = denormalize.refresh_author_names(
+            self.book_pks(options['chunk_size']),
+            chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            'Updated the author names of %d books.' % names))
+
+    def book_pks(self, chunk_size):
+        """
+        Yield every book id, reading them in pk-ordered batches so no
+        cursor stays open across the updates.
+        """
+        last_pk = 0
+        while True:
+            pks = list(Book.objects.filter(pk__gt=last_pk).order_by(
+                'pk').values_list('pk', flat=True)[:chunk_size])
+            if not pks:
+                return
+            for pk in pks:
+                yield pk
+            last_pk = pks[-1]
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+
+from django.core.management.base import BaseCommand, CommandError
+
+from books.importer import BookImporter
+from school_library.utils import guess_format, open_records
+
+
+class Command(BaseCommand):
+    help = ('Import books from a CSV or NDJSON file. Multi-valued CSV '
+            'columns (authors, keywords) are separated by ";".')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import.')
+        parser.add_argument(
+            '--format', choices=('csv', 'ndjson'),
+            help='Input format (default: guessed from the file extension).')
+        parser.add_argument(
+            '--batch-size', type=int, default=2000,
+            help='Books inserted per transaction (default: 2000).')
+
+    def handle(self, *args, **options):
+        importer = BookImporter(
+            batch_size=options['batch_size'], progress=self.report)
+        try:
+            importer.run(open_records(
+                options['path'],
+                options['format'] or guess_format(options['path'], 'ndjson')))
+        except (IOError, ValueError) as error:
+            raise CommandError(str(error))
+
+        for number, message in importer.errors:
+            self.stderr.write('Record %d skipped: %s' % (number, message))
+        self.stdout.write(self.style.SUCCESS(
+            'Imported %d books (%.0f rows/s), skipped %d records.' % (
+                importer.imported, importer.rate, len(importer.errors))))
+
+    def report(self, importer):
+        self.stdout.write('%d books imported (%.0f rows/s)' % (
+            importer.imported, importer.rate))
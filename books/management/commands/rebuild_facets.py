@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+
+from django.core.management.base import BaseCommand
+
+from books import facets
+
+
+class Command(BaseCommand):
+    help = ('Recount the books of every tag, book type, publisher and '
+            'language.')
+
+    def handle(self, *args, **options):
+        values = facets.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            'Counted the books of %d facet values.' % values))
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+
+from django.core.management.base import BaseCommand
+
+from books import search
+
+
+class Command(BaseCommand):
+    help = 'Re-index every book for full-text search.'
+
+    def handle(self, *args, **options):
+        backend = search.get_backend()
+        if isinstance(backend, search.MemoryBackend):
+            # Only this command's process would see the rebuilt index.
+            self.stdout.write(
+                'Rebuilding has no effect on the in-process search index: '
+                'every process rebuilds its own every '
+                'BOOKS_SEARCH_REFRESH_SECONDS.')
+            return
+        backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            'Rebuilt the %s search index.' % type(backend).__name__))
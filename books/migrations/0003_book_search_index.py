@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+CREATE_INDEX = """
+CREATE VIRTUAL TABLE books_book_fts USING fts5(
+    title, subject, summary, keywords, authors,
+    tokenize = 'unicode61 remove_diacritics 1'
+)
+"""
+
+POPULATE_INDEX = """
+INSERT INTO books_book_fts (rowid, title, subject, summary, keywords, authors)
+SELECT b.id, b.title, b.subject, b.summary,
+    (SELECT group_concat(t.name, ' ')
+     FROM books_book_keywords bk JOIN books_tag t ON t.id = bk.tag_id
+     WHERE bk.book_id = b.id),
+    (SELECT group_concat(a.first_name || ' ' || a.last_name, ' ')
+     FROM books_book_authors ba JOIN books_author a ON a.id = ba.author_id
+     WHERE ba.book_id = b.id)
+FROM books_book b
+"""
+
+
+def has_fts5(schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return False
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return ('ENABLE_FTS5',) in cursor.fetchall()
+
+
+def create_search_index(apps, schema_editor):
+    # Other backends fall back to books.search.MemoryBackend.
+    if has_fts5(schema_editor):
+        schema_editor.execute(CREATE_INDEX)
+        schema_editor.execute(POPULATE_INDEX)
+
+
+def drop_search_index(apps, schema_editor):
+    if has_fts5(schema_editor):
+        schema_editor.execute('DROP TABLE IF EXISTS books_book_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0002_book_created_id_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.3 on 2026-10-18 18:16
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def shelve_copies(apps, schema_editor):
+    Book = apps.get_model('books', 'Book')
+    Book.objects.using(schema_editor.connection.alias).update(
+        available_copies=Coalesce('number_of_copies', 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0004_book_denormalized_authors_year'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='available_copies',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(shelve_copies, migrations.RunPython.noop),
+    ]
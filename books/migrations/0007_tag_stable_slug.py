@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.3 on 2026-10-18 18:26
+from __future__ import unicode_literals
+
+from django.db import migrations
+import school_library.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0006_facet_counts'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='tag',
+            name='slug',
+            field=school_library.fields.StableAutoSlugField(always_update=True, editable=False, populate_from='name', skip_unchanged=True, unique=True),
+        ),
+    ]
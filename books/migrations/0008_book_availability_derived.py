@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.3 on 2026-10-18 18:51
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+from django.db.models import Case, Value, When
+
+
+def derive_availability(apps, schema_editor):
+    Book = apps.get_model('books', 'Book')
+    Book.objects.using(schema_editor.connection.alias).update(
+        availability=Case(
+            When(available_copies__gt=0, then=Value(True)),
+            default=Value(False), output_field=models.BooleanField()))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0007_tag_stable_slug'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='book',
+            name='availability',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(derive_availability, migrations.RunPython.noop),
+    ]
@@ -8,12 +8,14 @@
 # @Last Modified time: 2017-08-12 22:03:59
 
 
-from autoslug import AutoSlugField
-
 from django.db import models
 from django.utils.translation import ugettext_lazy as _
 from django_extensions.db.models import TimeStampedModel
 
+from books import barcodes
+from books.denormalize import split_author_names
+from school_library.fields import StableAutoSlugField
+
 
 class Tag(models.Model):
     """
@@ -23,8 +25,11 @@ class Tag(models.Model):
 
     # Attributes:
     name = models.CharField(unique=True, max_length=60)
-    slug = AutoSlugField(
-        populate_from='name', always_update=True, unique=True)
+    # Follows renames; saving an unrenamed tag keeps the slug without a
+    # uniqueness query.
+    slug = StableAutoSlugField(
+        populate_from='name', always_update=True, unique=True,
+        skip_unchanged=True)
 
     # Meta and Strings:
     class Meta:
@@ -90,7 +95,7 @@ class Author(models.Model):
         """
         String for representing the Author object.
         """
-        return self.name
+        return self.full_name
 
     @property
     def full_name(self):
@@ -164,9 +169,14 @@ class Book(TimeStampedModel):
         max_length=1000, help_text="Enter a brief description of the book")
     isbn = models.CharField('ISBN', max_length=13, blank=True)
     language = models.CharField(max_length=100, blank=True)
-    availability = models.BooleanField(default=False)
+    # Whether a copy is on the shelf, derived from `available_copies`.
+    availability = models.BooleanField(default=False, editable=False)
     status = models.TextField(blank=True)
     number_of_copies = models.IntegerField(blank=True, null=True)
+    # Copies on the shelf, starting from `number_of_copies` and moved by
+    # the difference when it changes (see books.signals). Otherwise changed
+    # only by conditional updates in circulation.models.
+    available_copies = models.IntegerField(default=0, editable=False)
     barcode = models.CharField(
         max_length=50,
         verbose_name=('Barcode'),
@@ -174,40 +184,144 @@ class Book(TimeStampedModel):
         blank=True, null=True
     )
 
+    # Denormalized copies of `authors` and `publisher.publication_year`,
+    # kept in sync by books.signals so reading them needs no query.
+    author_names = models.TextField(blank=True, editable=False)
+    published_year = models.IntegerField(
+        blank=True, null=True, editable=False)
+
     # Meta and Strings:
     class Meta:
 
         ordering = ['created']
+        # Backs keyset pagination over (created, id); see
+        # books.pagination.BookCursorPagination.
+        indexes = [
+            models.Index(
+                fields=['created', 'id'], name='books_book_created_id_idx'),
+        ]
         verbose_name = _("Book")
         verbose_name_plural = _("Books")
 
+    # Written only by conditional updates, never from a possibly stale
+    # instance.
+    SHELF_FIELDS = ('available_copies', 'availability')
+    # Written only by books.denormalize.refresh_author_names, as an
+    # instance that did not see an author link change holds a stale copy.
+    AUTHOR_FIELDS = ('author_names',)
+
     def __str__(self):
         return '%s, %s' % (self.title, self.subject)
 
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None \
+                and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and
+                field.name not in self.SHELF_FIELDS + self.AUTHOR_FIELDS]
+        super().save(*args, **kwargs)
+
     @property
     def author_list(self):
         """
         A list of authors for a book object.
 
+        Read from the denormalized `author_names` column.
         """
-        return [a.full_name for a in self.authors.all()]
+        return split_author_names(self.author_names)
 
     @property
     def year_published(self):
         """
         Book published year.
 
+        Read from the denormalized `published_year` column.
         """
-        return self.publisher.publication_year
+        return self.published_year
 
     def check_barcode(self, code):
         """
         Checks if a barcode already used or not.
 
+        A lookup on the unique `barcode` index; when the barcode bloom
+        filter is enabled, unknown codes are answered without a query.
+
         Args:
             code (string): barcode to be checked.
 
         Returns:
             bool: returns true if barcode already exists else false.
         """
-        pass
+        if not code or not barcodes.might_exist(code):
+            return False
+        books = Book.objects.filter(barcode=code)
+        if self.pk is not None:
+            # A book does not conflict with its own barcode.
+            books = books.exclude(pk=self.pk)
+        return books.exists()
+
+    @classmethod
+    def check_barcodes(cls, codes):
+        """
+        Checks a batch of barcodes at once.
+
+        Issues one `IN` query per 500 candidate codes instead of a query
+        per code.
+
+        Args:
+            codes (iterable): barcodes to be checked.
+
+        Returns:
+            dict: maps each code to true if it already exists else false.
+        """
+        results = dict.fromkeys(codes, False)
+        candidates = [
+            code for code in results if code and barcodes.might_exist(code)]
+        for start in range(0, len(candidates), 500):
+            found = cls.objects.filter(
+                barcode__in=candidates[start:start + 500]).values_list(
+                'barcode', flat=True)
+            results.update(dict.fromkeys(found, True))
+        return results
+
+
+class FacetCount(models.Model):
+    """
+    The number of books with one value of a facet, e.g. a tag, with the
+    label to show for it. Kept current by books.signals; see books.facets.
+    """
+
+    TAG = 'tag'
+    BOOK_TYPE = 'book_type'
+    PUBLISHER = 'publisher'
+    LANGUAGE = 'language'
+    FACETS = (
+        (TAG, _('Tag')),
+        (BOOK_TYPE, _('Book Type')),
+        (PUBLISHER, _('Publisher')),
+        (LANGUAGE, _('Language')),
+    )
+
+    # Attributes:
+    facet = models.CharField(max_length=20, choices=FACETS)
+    # The related object's primary key, or the language itself.
+    value = models.CharField(max_length=100)
+    label = models.CharField(max_length=100, blank=True)
+    count = models.IntegerField(default=0)
+
+    # Meta and Strings:
+    class Meta:
+        unique_together = ('facet', 'value')
+        # Backs the largest values first of a facet; see
+        # books.facets.facet_counts.
+        indexes = [
+            models.Index(
+                fields=['facet', '-count', 'value'],
+                name='books_facet_count_idx'),
+        ]
+        verbose_name = _('Facet Count')
+        verbose_name_plural = _('Facet Counts')
+
+    def __str__(self):
+        return '%s: %s (%d)' % (self.facet, self.label, self.count)
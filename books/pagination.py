@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+
+"""Pagination styles for the books API.
+"""
+
+from school_library.pagination import KeysetPagination
+
+
+class BookCursorPagination(KeysetPagination):
+    """
+    Pages through the catalog in `Book.Meta.ordering` order.
+
+    Backed by the ``books_book_created_id_idx`` index, so the cost of a page
+    does not depend on how deep the client has scrolled.
+    """
+
+    ordering = ('created', 'id')
@@ -0,0 +1,439 @@
+# -*- coding: utf-8 -*-
+
+"""Full-text search over the book catalog.
+
+Each book is indexed as one document made of its title, subject, summary,
+tag names and author names. Two interchangeable backends keep the inverted
+index:
+
+* `FTS5Backend` stores it in an SQLite FTS5 virtual table created by the
+  ``0003_book_search_index`` migration, so it is shared by every process.
+* `MemoryBackend` is a pure-Python BM25 index held by every process. It
+  is built from the database in the background, and rebuilt periodically
+  to pick up the writes of other processes; it suits backends without
+  FTS5.
+
+Both are kept current with the writes of this process by the receivers
+in `books.signals`.
+"""
+
+import heapq
+import logging
+import math
+import operator
+import re
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+from functools import reduce
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+
+from school_library.utils import chunks
+
+logger = logging.getLogger(__name__)
+
+# Searchable columns and their relative weights in the ranking.
+SEARCH_FIELDS = ('title', 'subject', 'summary', 'keywords', 'authors')
+FIELD_WEIGHTS = (3.0, 2.0, 1.0, 2.0, 2.0)
+
+STOP_WORDS = frozenset([
+    'a', 'about', 'an', 'and', 'are', 'as', 'at', 'be', 'book', 'books',
+    'by', 'for', 'from', 'in', 'into', 'is', 'it', 'of', 'on', 'or',
+    'the', 'to', 'with', 'written',
+])
+
+FTS_TABLE = 'books_book_fts'
+
+# Books (re-)indexed per batch of queries.
+CHUNK_SIZE = 500
+
+_token_re = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text):
+    """
+    Split text into lower-cased, accent-free terms.
+
+    Mirrors the FTS5 ``unicode61 remove_diacritics`` tokenizer closely
+    enough that both backends match the same documents.
+    """
+    if not text:
+        return []
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return _token_re.findall(text.lower())
+
+
+def parse_query(query):
+    """
+    Return the distinct, meaningful terms of a search query.
+    """
+    terms = []
+    for term in tokenize(query):
+        if term not in STOP_WORDS and term not in terms:
+            terms.append(term)
+    return terms
+
+
+def book_documents(pks=None):
+    """
+    Yield ``(pk, texts)`` for the given books (all books if `pks` is None).
+
+    `texts` is a tuple of strings in `SEARCH_FIELDS` order. Three queries
+    are issued however many books are requested.
+    """
+    from books.models import Book
+
+    books = Book.objects.order_by()
+    if pks is not None:
+        books = books.filter(pk__in=pks)
+    rows = list(books.values_list('pk', 'title', 'subject', 'summary'))
+    if not rows:
+        return
+
+    keywords = defaultdict(list)
+    through = Book.keywords.through.objects.order_by()
+    if pks is not None:
+        through = through.filter(book_id__in=pks)
+    for book_id, name in through.values_list('book_id', 'tag__name'):
+        keywords[book_id].append(name)
+
+    authors = defaultdict(list)
+    through = Book.authors.through.objects.order_by()
+    if pks is not None:
+        through = through.filter(book_id__in=pks)
+    for book_id, first, last in through.values_list(
+            'book_id', 'author__first_name', 'author__last_name'):
+        authors[book_id].append('%s %s' % (first, last))
+
+    for pk, title, subject, summary in rows:
+        yield pk, (title, subject, summary,
+                   ' '.join(keywords[pk]), ' '.join(authors[pk]))
+
+
+class SearchBackend(object):
+    """
+    Interface shared by the search backends.
+    """
+
+    def index(self, pks):
+        """Add or refresh the given books."""
+        raise NotImplementedError
+
+    def remove(self, pks):
+        """Drop the given books from the index."""
+        raise NotImplementedError
+
+    def rebuild(self):
+        """Re-index the whole catalog."""
+        raise NotImplementedError
+
+    def search(self, query, limit=20):
+        """Return up to `limit` ``(pk, score)`` pairs, best first."""
+        raise NotImplementedError
+
+
+class FTS5Backend(SearchBackend):
+    """
+    Index kept in the SQLite FTS5 table `FTS_TABLE`, keyed by book id.
+    """
+
+    def index(self, pks):
+        for chunk in chunks(pks, CHUNK_SIZE):
+            # One transaction per chunk; in autocommit mode SQLite would
+            # sync every inserted row to disk.
+            with transaction.atomic(), connection.cursor() as cursor:
+                self._delete(cursor, chunk)
+                cursor.executemany(
+                    'INSERT INTO %s (rowid, %s) VALUES (%%s, %s)' % (
+                        FTS_TABLE, ', '.join(SEARCH_FIELDS),
+                        ', '.join(['%s'] * len(SEARCH_FIELDS))),
+                    [(pk,) + texts for pk, texts in book_documents(chunk)])
+
+    def remove(self, pks):
+        for chunk in chunks(pks, CHUNK_SIZE):
+            with connection.cursor() as cursor:
+                self._delete(cursor, chunk)
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM %s' % FTS_TABLE)
+        from books.models import Book
+        pks = Book.objects.order_by('pk').values_list('pk', flat=True)
+        self.index(pks)
+
+    def search(self, query, limit=20):
+        terms = parse_query(query)
+        if not terms:
+            return []
+        quoted = ['"%s"' % term for term in terms]
+        results = self._match(' AND '.join(quoted), limit)
+        if not results and len(quoted) > 1:
+            results = self._match(' OR '.join(quoted), limit)
+        return results
+
+    def _match(self, expression, limit):
+        rank = 'bm25(%s, %s)' % (
+            FTS_TABLE, ', '.join(str(w) for w in FIELD_WEIGHTS))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT rowid, %s AS score FROM %s WHERE %s MATCH %%s '
+                'ORDER BY score LIMIT %%s' % (rank, FTS_TABLE, FTS_TABLE),
+                [expression, limit])
+            # bm25() is lower-is-better; flip it so scores grow with
+            # relevance like the in-memory backend's.
+            return [(pk, -score) for pk, score in cursor.fetchall()]
+
+    def _delete(self, cursor, pks):
+        cursor.execute(
+            'DELETE FROM %s WHERE rowid IN (%s)' % (
+                FTS_TABLE, ', '.join(['%s'] * len(pks))),
+            list(pks))
+
+
+class _MemoryIndex(object):
+    """
+    Postings, document lengths and the BM25 ranking over them.
+    """
+
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self):
+        self.postings = defaultdict(dict)
+        self.terms = {}
+        self.lengths = {}
+        self.total_length = 0.0
+
+    def replace(self, documents):
+        """
+        Apply ``{pk: texts}``, texts being None for a removed book.
+        """
+        self.discard(documents)
+        for pk, texts in documents.items():
+            if texts is not None:
+                self.add(pk, texts)
+
+    def add(self, pk, texts):
+        frequencies = defaultdict(float)
+        for text, weight in zip(texts, FIELD_WEIGHTS):
+            for term in tokenize(text):
+                frequencies[term] += weight
+        for term, tf in frequencies.items():
+            self.postings[term][pk] = tf
+        self.terms[pk] = tuple(frequencies)
+        length = sum(frequencies.values())
+        self.lengths[pk] = length
+        self.total_length += length
+
+    def discard(self, pks):
+        for pk in pks:
+            for term in self.terms.pop(pk, ()):
+                posting = self.postings[term]
+                posting.pop(pk, None)
+                if not posting:
+                    del self.postings[term]
+            self.total_length -= self.lengths.pop(pk, 0.0)
+
+    def search(self, terms, limit):
+        postings = sorted(
+            (self.postings.get(term, {}) for term in terms), key=len)
+        if postings[0]:
+            candidates = set(postings[0])
+            for posting in postings[1:]:
+                candidates.intersection_update(posting)
+        else:
+            candidates = set()
+        if not candidates and len(postings) > 1:
+            candidates = set().union(*postings)
+        return heapq.nlargest(
+            limit, ((pk, self.score(pk, postings)) for pk in candidates),
+            key=lambda item: item[1])
+
+    def score(self, pk, postings):
+        count = len(self.lengths)
+        average = self.total_length / count
+        norm = self.k1 * (1 - self.b + self.b * self.lengths[pk] / average)
+        score = 0.0
+        for posting in postings:
+            tf = posting.get(pk)
+            if tf:
+                df = len(posting)
+                idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+                score += idf * tf * (self.k1 + 1) / (tf + norm)
+        return score
+
+
+class MemoryBackend(SearchBackend):
+    """
+    In-process inverted index ranked with BM25.
+
+    Postings map each term to ``{pk: weighted term frequency}``. A query
+    intersects the postings of its terms, starting from the rarest, so its
+    cost follows the size of the rarest term's postings rather than the
+    size of the catalog.
+
+    The index is built from the database by a background thread, started
+    by the first search and again every ``BOOKS_SEARCH_REFRESH_SECONDS``
+    so that writes made by other processes show up. Until the first build
+    is done, searches match the books in the database, unranked. Books
+    indexed or removed during a build are replayed into the new index
+    before it replaces the old one.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._index = None
+        self._loaded_at = 0.0
+        # ``{pk: texts}`` written while a build runs; None when none runs.
+        self._pending = None
+
+    def index(self, pks):
+        with self._lock:
+            # Neither loaded nor loading: the first build reads the rows.
+            if self._index is None and self._pending is None:
+                return
+        for chunk in chunks(pks, CHUNK_SIZE):
+            documents = dict.fromkeys(chunk)
+            documents.update(book_documents(chunk))
+            self._apply(documents)
+
+    def remove(self, pks):
+        self._apply(dict.fromkeys(pks))
+
+    def rebuild(self):
+        """
+        Build the index in this thread, replacing the current one.
+        """
+        index = self._build()
+        with self._lock:
+            self._index = index
+            self._loaded_at = time.time()
+
+    def search(self, query, limit=20):
+        terms = parse_query(query)
+        if not terms:
+            return []
+        with self._lock:
+            index = self._index
+            refresh = getattr(settings, 'BOOKS_SEARCH_REFRESH_SECONDS', 300)
+            if self._pending is None and (index is None or refresh and (
+                    time.time() - self._loaded_at > refresh)):
+                self._pending = {}
+                thread = threading.Thread(
+                    target=self._reload, name='search-index-reload')
+                thread.daemon = True
+                thread.start()
+            if index is not None:
+                return index.search(terms, limit)
+        return self._scan(terms, limit)
+
+    def _apply(self, documents):
+        with self._lock:
+            if self._index is not None:
+                self._index.replace(documents)
+            if self._pending is not None:
+                self._pending.update(documents)
+
+    def _build(self):
+        index = _MemoryIndex()
+        for pk, texts in book_documents():
+            index.add(pk, texts)
+        return index
+
+    def _reload(self):
+        try:
+            index = self._build()
+        except Exception:
+            logger.exception('Cannot build the search index.')
+            index = None
+        finally:
+            connection.close()
+        with self._lock:
+            if index is not None:
+                index.replace(self._pending)
+                self._index = index
+            # After a failure too: the next attempt waits a full interval.
+            self._loaded_at = time.time()
+            self._pending = None
+
+    def _scan(self, terms, limit):
+        """
+        Match the books in the database while the index is being built.
+        """
+        from books.models import Book
+
+        def matching(term):
+            return (Q(title__icontains=term) | Q(subject__icontains=term) |
+                    Q(summary__icontains=term) |
+                    Q(author_names__icontains=term) |
+                    Q(keywords__name__icontains=term))
+
+        everything = Book.objects.order_by('pk')
+        books = everything
+        for term in terms:
+            books = books.filter(matching(term))
+        pks = list(books.values_list('pk', flat=True).distinct()[:limit])
+        if not pks and len(terms) > 1:
+            books = everything.filter(
+                reduce(operator.or_, map(matching, terms)))
+            pks = list(books.values_list('pk', flat=True).distinct()[:limit])
+        return [(pk, 0.0) for pk in pks]
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def fts5_available():
+    """
+    Whether the default database has the FTS5 search table.
+    """
+    if connection.vendor != 'sqlite':
+        return False
+    return FTS_TABLE in connection.introspection.table_names()
+
+
+def get_backend():
+    """
+    Return the process-wide search backend.
+
+    ``settings.BOOKS_SEARCH_BACKEND`` forces ``'fts5'`` or ``'memory'``;
+    by default FTS5 is used whenever its table exists.
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                name = getattr(settings, 'BOOKS_SEARCH_BACKEND', None)
+                if name is None:
+                    name = 'fts5' if fts5_available() else 'memory'
+                _backend = FTS5Backend() if name == 'fts5' \
+                    else MemoryBackend()
+    return _backend
+
+
+def search_books(query, limit=20):
+    """
+    Return the books best matching `query`, best first.
+
+    Each book carries its relevance as ``search_score``.
+    """
+    from books.models import Book
+
+    ranked = get_backend().search(query, limit=limit)
+    books = Book.objects.select_related(
+        'book_type', 'publisher').prefetch_related(
+        'authors', 'keywords').in_bulk([pk for pk, _ in ranked])
+    results = []
+    for pk, score in ranked:
+        # Entries for deleted or rolled-back rows are simply skipped.
+        if pk in books:
+            book = books[pk]
+            book.search_score = score
+            results.append(book)
+    return results
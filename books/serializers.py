@@ -5,16 +5,25 @@
 # @Last Modified time: 2017-08-12 17:31:14
 
 
+from django.db import models
+from django.db.models import prefetch_related_objects
+
 from rest_framework import serializers
 
-from library.models import (
+from books.models import (
     Book, Tag, Publisher, Author, BookType)
 
+from school_library.serializers import SparseFieldsMixin
+
+from . import cache as payload_cache
+from .denormalize import split_author_names
+
 
 class BookTypeSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = BookType
+        fields = ('id', 'name', 'days_amount')
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -32,28 +41,133 @@ class PublisherSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Publisher
+        fields = ('id', 'name', 'publication_year', 'publication_place')
 
 
 class AuthorSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Author
-
-
-class BookDetailSerializer(serializers.ModelSerializer):
-    keywords = TagSerializer(many=True)
+        fields = ('id', 'first_name', 'last_name', 'full_name')
+
+
+class CachedBookListSerializer(serializers.ListSerializer):
+    """
+    Serializes a list of books through the payload cache.
+
+    Only the books missing from the cache are rendered, and their
+    relations are prefetched here, so a fully cached page costs no
+    relation queries. Sparse (``?fields=``) output bypasses the cache and
+    prefetches only the relations it shows.
+    """
+    prefetch = ('authors', 'keywords')
+
+    def to_representation(self, data):
+        books = list(data.all() if isinstance(data, models.Manager) else data)
+        prefetch = [
+            name for name in self.prefetch if name in self.child.fields]
+        if not self.child.cache_payloads or self.child.sparse:
+            prefetch_related_objects(books, *prefetch)
+            return [self.child.to_representation(book) for book in books]
+
+        payloads = payload_cache.get_payloads([book.pk for book in books])
+        missing = [book for book in books if book.pk not in payloads]
+        if missing:
+            prefetch_related_objects(missing, *prefetch)
+            rendered = {
+                book.pk: self.child.to_representation(book)
+                for book in missing}
+            payload_cache.set_payloads(rendered)
+            payloads.update(rendered)
+        return [payloads[book.pk] for book in books]
+
+
+class BookDetailSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    keywords = TagSerializer(many=True, read_only=True)
     publisher = PublisherSerializer(read_only=True)
     book_type = BookTypeSerializer(read_only=True)
-    authors = PublisherSerializer(many=True)
+    authors = AuthorSerializer(many=True, read_only=True)
     # student = serializers.SerializerMethodField('get_book_issue')
 
     class Meta:
         model = Book
         fields = (
             'id', 'title', 'subject',
-            'ISBN', 'publisher', 'authors',
-            'edition', 'availability', 'keywords',
-            'number_of_copies',
+            'isbn', 'publisher', 'authors',
+            'availability', 'keywords',
+            'number_of_copies', 'available_copies',
             'barcode', 'book_type',
             'language',)
-        read_only_fields = ('date_created', 'date_modified')
+        list_serializer_class = CachedBookListSerializer
+
+    # Whether output is served from and stored in books.cache.
+    cache_payloads = True
+
+    def to_representation(self, instance):
+        if not self.cache_payloads or self.sparse or isinstance(
+                self.parent, CachedBookListSerializer):
+            return super().to_representation(instance)
+
+        payload = payload_cache.get_payloads([instance.pk]).get(instance.pk)
+        if payload is None:
+            payload = super().to_representation(instance)
+            payload_cache.set_payloads({instance.pk: payload})
+        return payload
+
+
+class BookSearchResultSerializer(BookDetailSerializer):
+    score = serializers.FloatField(source='search_score', read_only=True)
+
+    # The score depends on the query, so these payloads are not cached.
+    cache_payloads = False
+
+    class Meta(BookDetailSerializer.Meta):
+        fields = BookDetailSerializer.Meta.fields + ('score',)
+
+
+class BookExportSerializer(BookDetailSerializer):
+    # A full export would cycle the whole catalog through the LRU payload
+    # cache and evict the entries BookList actually reuses.
+    cache_payloads = False
+
+
+class AuthorNamesField(serializers.Field):
+    """
+    Reads the denormalized `Book.author_names` column as a list.
+    """
+
+    def to_representation(self, value):
+        return split_author_names(value)
+
+
+class BookCompactSerializer(serializers.Serializer):
+    """
+    A flat, join-free book representation for lists, read from
+    ``Book.objects.values(*BookCompactSerializer.columns)`` rows.
+    """
+    id = serializers.IntegerField(read_only=True)
+    title = serializers.CharField(read_only=True)
+    subject = serializers.CharField(read_only=True)
+    availability = serializers.BooleanField(read_only=True)
+    authors = AuthorNamesField(source='author_names', read_only=True)
+    year = serializers.IntegerField(source='published_year', read_only=True)
+
+    columns = (
+        'id', 'title', 'subject', 'availability', 'author_names',
+        'published_year')
+
+
+class BarcodeBatchSerializer(serializers.Serializer):
+    barcodes = serializers.ListField(
+        child=serializers.CharField(max_length=50))
+
+    max_batch_size = 1000
+
+    def validate_barcodes(self, value):
+        if not value:
+            raise serializers.ValidationError('No barcodes given.')
+        if len(value) > self.max_batch_size:
+            raise serializers.ValidationError(
+                'At most %d barcodes can be checked at once.'
+                % self.max_batch_size)
+        return value
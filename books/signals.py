@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+
+"""Signal receivers keeping derived book data in step with the models.
+"""
+
+from django.db.models import BooleanField, Case, F, Value, When
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete, pre_save)
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from books import barcodes, cache, denormalize, facets, search, tags
+from books.models import Author, Book, BookType, FacetCount, Publisher, Tag
+
+# Sent with the primary keys of books inserted in bulk (see books.importer),
+# which bypasses the per-row signals handled below.
+books_imported = Signal(providing_args=['pks'])
+
+_FACET_OF = {
+    Tag: FacetCount.TAG,
+    Publisher: FacetCount.PUBLISHER,
+    BookType: FacetCount.BOOK_TYPE,
+}
+
+
+def _related_book_pks(instance):
+    """
+    Ids of the books linked to an `Author` or `Tag`.
+    """
+    if isinstance(instance, Author):
+        books = instance.book_author
+    else:
+        books = instance.book_tag
+    return list(books.values_list('pk', flat=True))
+
+
+def _books_changed(pks):
+    """
+    Drop the cached payloads of books whose related data changed, and move
+    their `modified` forward so conditional GETs see the change.
+    """
+    pks = list(pks)
+    cache.invalidate(pks)
+    now = timezone.now()
+    for start in range(0, len(pks), 500):
+        Book.objects.filter(pk__in=pks[start:start + 500]).update(
+            modified=now)
+    return now
+
+
+@receiver(pre_save, sender=Book)
+def copy_published_year(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    if instance.publisher_id is None:
+        instance.published_year = None
+    elif Book.publisher.is_cached(instance):
+        instance.published_year = instance.publisher.publication_year
+    else:
+        instance.published_year = Publisher.objects.filter(
+            pk=instance.publisher_id).values_list(
+            'publication_year', flat=True).first()
+
+
+@receiver(pre_save, sender=Book)
+def shelve_new_copies(sender, instance, raw=False, **kwargs):
+    if instance._state.adding and not raw:
+        if not instance.available_copies:
+            instance.available_copies = instance.number_of_copies or 0
+        instance.availability = instance.available_copies > 0
+
+
+@receiver(pre_save, sender=Book)
+def remember_stored_values(sender, instance, raw=False, **kwargs):
+    """
+    Read the facet values and number of copies the book is saved over, in
+    one query.
+    """
+    if raw or instance._state.adding:
+        instance._facet_values = {}
+        instance._stored_copies = None
+        return
+    row = Book.objects.filter(pk=instance.pk).values(
+        'number_of_copies', *facets.COLUMNS.values()).first()
+    instance._facet_values = facets.book_values(row) if row else {}
+    instance._stored_copies = row['number_of_copies'] if row else None
+
+
+@receiver(post_save, sender=Book)
+def shelve_added_copies(sender, instance, created, raw=False, **kwargs):
+    """
+    Move the shelf count by the change of `number_of_copies`. Copies on
+    loan keep counting, so removing them can leave the count below zero
+    until they are returned.
+    """
+    if created or raw:
+        return
+    delta = (instance.number_of_copies or 0) - \
+        (getattr(instance, '_stored_copies', None) or 0)
+    if not delta:
+        return
+    books = Book.objects.filter(pk=instance.pk)
+    books.update(
+        available_copies=F('available_copies') + delta,
+        # Evaluated against the count before the update.
+        availability=Case(
+            When(available_copies__gt=-delta, then=Value(True)),
+            default=Value(False), output_field=BooleanField()))
+    instance._stored_copies = instance.number_of_copies
+    instance.available_copies, instance.availability = books.values_list(
+        'available_copies', 'availability').get()
+
+
+@receiver(post_save, sender=Book)
+def count_saved_book(sender, instance, raw=False, **kwargs):
+    if not raw:
+        before = getattr(instance, '_facet_values', {})
+        facets.book_changed(before, facets.values_of(instance))
+
+
+@receiver(post_save, sender=Book)
+def index_saved_book(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.get_backend().index([instance.pk])
+
+
+@receiver(post_save, sender=Book)
+def remember_saved_barcode(sender, instance, **kwargs):
+    barcodes.remember([instance.barcode])
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def invalidate_book_payload(sender, instance, **kwargs):
+    cache.invalidate([instance.pk])
+
+
+@receiver(pre_delete, sender=Book)
+def remember_tags_of_deleted_book(sender, instance, **kwargs):
+    # The keyword links are cascaded away without an m2m_changed signal.
+    instance._facet_tag_pks = list(
+        instance.keywords.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Book)
+def uncount_deleted_book(sender, instance, **kwargs):
+    facets.book_changed(facets.values_of(instance), {})
+    facets.adjust(FacetCount.TAG, {
+        pk: -1 for pk in getattr(instance, '_facet_tag_pks', [])})
+
+
+@receiver(m2m_changed, sender=Book.keywords.through)
+def count_tagged_books(sender, instance, action, reverse, pk_set,
+                       **kwargs):
+    if action == 'pre_remove':
+        # `pk_set` also holds ids that were not linked.
+        links = sender.objects.filter(tag_id__in=pk_set, book=instance) \
+            if not reverse else \
+            sender.objects.filter(book_id__in=pk_set, tag=instance)
+        instance._facet_unlinked = list(links.values_list(
+            'book_id' if reverse else 'tag_id', flat=True))
+        return
+    if action == 'pre_clear':
+        related = instance.book_tag if reverse else instance.keywords
+        instance._facet_unlinked = list(related.values_list('pk', flat=True))
+        return
+
+    if action == 'post_add':
+        pks, delta = pk_set, 1
+    elif action in ('post_remove', 'post_clear'):
+        pks, delta = getattr(instance, '_facet_unlinked', []), -1
+    else:
+        return
+    if reverse:
+        facets.adjust(FacetCount.TAG, {instance.pk: delta * len(pks)})
+    else:
+        facets.adjust(FacetCount.TAG, {pk: delta for pk in pks})
+
+
+@receiver(post_delete, sender=Book)
+def unindex_deleted_book(sender, instance, **kwargs):
+    search.get_backend().remove([instance.pk])
+
+
+@receiver(m2m_changed, sender=Book.authors.through)
+@receiver(m2m_changed, sender=Book.keywords.through)
+def refresh_relinked_books(sender, instance, action, reverse, pk_set,
+                           **kwargs):
+    if action == 'pre_clear' and reverse:
+        # The reverse side clears without telling which books it touched.
+        instance._cleared_book_pks = _related_book_pks(instance)
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        pks = [instance.pk]
+    elif action == 'post_clear':
+        pks = getattr(instance, '_cleared_book_pks', [])
+    else:
+        pks = list(pk_set)
+    if not pks:
+        return
+
+    modified = _books_changed(pks)
+    if not reverse:
+        instance.modified = modified
+    search.get_backend().index(pks)
+    if sender is Book.authors.through:
+        denormalize.refresh_author_names(pks)
+        if not reverse:
+            instance.author_names = denormalize.author_names_for(
+                [instance.pk])[instance.pk]
+
+
+@receiver(post_save, sender=Author)
+@receiver(post_save, sender=Tag)
+def refresh_books_of_renamed(sender, instance, created, raw=False,
+                             **kwargs):
+    if created or raw:
+        return
+    pks = _related_book_pks(instance)
+    if pks:
+        _books_changed(pks)
+        search.get_backend().index(pks)
+        if sender is Author:
+            denormalize.refresh_author_names(pks)
+
+
+@receiver(post_save, sender=Publisher)
+def copy_changed_publication_year(sender, instance, created, raw=False,
+                                  **kwargs):
+    if not created and not raw:
+        Book.objects.filter(publisher=instance).exclude(
+            published_year=instance.publication_year).update(
+            published_year=instance.publication_year)
+
+
+@receiver(pre_delete, sender=Publisher)
+def clear_publication_year(sender, instance, **kwargs):
+    # `Book.publisher` is SET_NULL without a per-book save.
+    Book.objects.filter(publisher=instance).update(published_year=None)
+
+
+@receiver(post_save, sender=Publisher)
+@receiver(post_save, sender=BookType)
+@receiver(pre_delete, sender=Publisher)
+@receiver(pre_delete, sender=BookType)
+def invalidate_payloads_of_books(sender, instance, created=False,
+                                 raw=False, **kwargs):
+    if created or raw:
+        return
+    if sender is Publisher:
+        books = instance.book_publisher
+    else:
+        books = instance.book_lend_type
+    _books_changed(books.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def forget_tag_slug(sender, instance, **kwargs):
+    tags.tag_ids.discard_tag(instance.pk)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Publisher)
+@receiver(post_save, sender=BookType)
+def relabel_facet(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        facets.relabel(_FACET_OF[sender], instance.pk, instance.name)
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Publisher)
+@receiver(post_delete, sender=BookType)
+def remove_facet(sender, instance, **kwargs):
+    # Their books lose the value without a per-book signal.
+    facets.remove(_FACET_OF[sender], instance.pk)
+
+
+@receiver(pre_delete, sender=Author)
+@receiver(pre_delete, sender=Tag)
+def remember_books_of_deleted(sender, instance, **kwargs):
+    # The through rows are cascaded away without an m2m_changed signal.
+    instance._deleted_book_pks = _related_book_pks(instance)
+
+
+@receiver(post_delete, sender=Author)
+@receiver(post_delete, sender=Tag)
+def refresh_books_of_deleted(sender, instance, **kwargs):
+    pks = getattr(instance, '_deleted_book_pks', [])
+    if pks:
+        _books_changed(pks)
+        search.get_backend().index(pks)
+        if sender is Author:
+            denormalize.refresh_author_names(pks)
+
+
+@receiver(books_imported)
+def refresh_imported_books(sender, pks, **kwargs):
+    search.get_backend().index(pks)
+    facets.books_added(pks)
+    for start in range(0, len(pks), 500):
+        # Only read when the barcode filter is loaded.
+        barcodes.remember(Book.objects.filter(
+            pk__in=pks[start:start + 500]).exclude(
+            barcode=None).values_list('barcode', flat=True))
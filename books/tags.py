@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+"""In-process resolution of tag slugs to tag ids.
+
+Browsing by tag (``/api/books/tags/<slug>/books/``) starts from a slug.
+`tag_ids` remembers the id of every slug resolved by this process for
+``settings.BOOKS_TAG_SLUG_TIMEOUT`` seconds. Receivers in `books.signals`
+drop a tag's slug when the tag is saved or deleted; other processes serve
+a renamed tag's old slug at most that long. Unknown slugs are not
+remembered.
+"""
+
+import threading
+import time
+
+from django.conf import settings
+
+from books.models import Tag
+
+
+class TagIdCache(object):
+    """
+    Thread-safe map of tag slugs to ids, indexed by id for invalidation.
+    """
+
+    def __init__(self):
+        self._ids = {}
+        self._slugs = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._ids)
+
+    def resolve(self, slug):
+        """
+        Return the id of the tag with `slug`, or None if there is none.
+        """
+        with self._lock:
+            entry = self._ids.get(slug)
+        if entry is not None and entry[1] > time.time():
+            return entry[0]
+
+        pk = Tag.objects.filter(slug=slug).values_list(
+            'pk', flat=True).first()
+        if pk is not None:
+            with self._lock:
+                self._ids[slug] = (
+                    pk, time.time() + settings.BOOKS_TAG_SLUG_TIMEOUT)
+                self._slugs[pk] = slug
+        return pk
+
+    def discard_tag(self, pk):
+        """
+        Forget the slug of the tag with primary key `pk`.
+        """
+        with self._lock:
+            slug = self._slugs.pop(pk, None)
+            if slug is not None:
+                self._ids.pop(slug, None)
+
+    def clear(self):
+        with self._lock:
+            self._ids.clear()
+            self._slugs.clear()
+
+
+tag_ids = TagIdCache()
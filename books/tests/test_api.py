@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from books import cache
+from books.models import Author, Book, BookType, Publisher, Tag
+
+
+def make_books(count):
+    publisher = Publisher.objects.create(name='Sajha', publication_year=1973)
+    book_type = BookType.objects.create(name='Lending', days_amount=7)
+    for i in range(count):
+        book = Book.objects.create(
+            title='Book %d' % i, subject='Nepali', barcode='B-%d' % i,
+            publisher=publisher, book_type=book_type)
+        book.authors.add(Author.objects.create(
+            first_name='Author', last_name='%d' % i))
+        book.keywords.add(Tag.objects.create(name='tag-%d' % i))
+
+
+def count_queries(client, url, **params):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url, params)
+    assert response.status_code == 200
+    return len(queries)
+
+
+@pytest.mark.django_db
+def test_book_list_and_detail(admin_client):
+    make_books(1)
+    book = Book.objects.get()
+
+    listed = admin_client.get(reverse('books-api:book-list')).json()
+    detail = admin_client.get(
+        reverse('books-api:book-detail', kwargs={'pk': book.pk})).json()
+
+    assert listed['results'] == [detail]
+    assert detail['title'] == 'Book 0'
+    assert detail['isbn'] == ''
+    assert detail['authors'] == [{
+        'id': book.authors.get().pk, 'first_name': 'Author',
+        'last_name': '0', 'full_name': 'Author 0'}]
+    assert detail['keywords'] == [{'text': 'tag-0'}]
+    assert detail['publisher']['publication_year'] == 1973
+    assert detail['book_type']['days_amount'] == 7
+
+
+@pytest.mark.django_db
+def test_book_list_requires_authentication(client):
+    response = client.get(reverse('books-api:book-list'))
+
+    assert response.status_code in (401, 403)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('warm', [False, True])
+def test_book_list_query_count_does_not_grow_with_page_size(
+        admin_client, warm):
+    make_books(30)
+    url = reverse('books-api:book-list')
+    if warm:
+        admin_client.get(url, {'page_size': 30})
+
+    counts = set()
+    for page_size in (1, 10, 30):
+        if not warm:
+            cache.get_cache().clear()
+        counts.add(count_queries(admin_client, url, page_size=page_size))
+
+    assert len(counts) == 1
+
+
+@pytest.mark.django_db
+def test_book_detail_query_count_is_constant(admin_client):
+    make_books(2)
+    few, many = Book.objects.all()
+    many.authors.add(*Author.objects.all())
+    many.keywords.add(*Tag.objects.all())
+
+    counts = {count_queries(
+        admin_client, reverse('books-api:book-detail', kwargs={'pk': pk}))
+        for pk in (few.pk, many.pk)}
+
+    assert len(counts) == 1
+
+
+def list_queries(client, **params):
+    cache.get_cache().clear()
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(reverse('books-api:book-list'), params)
+    assert response.status_code == 200
+    return response.json()['results'], [
+        q['sql'] for q in queries if q['sql'].startswith('SELECT') and
+        '"books_' in q['sql'] and '"last_modified"' not in q['sql']]
+
+
+@pytest.mark.django_db
+def test_sparse_fields_narrow_output_and_sql(admin_client):
+    make_books(3)
+
+    results, queries = list_queries(
+        admin_client, fields='title,availability')
+
+    assert results[0] == {'title': 'Book 0', 'availability': False}
+    assert len(queries) == 1
+    assert 'JOIN' not in queries[0]
+    assert '"summary"' not in queries[0]
+
+
+@pytest.mark.django_db
+def test_sparse_fields_prefetch_only_requested_relations(admin_client):
+    make_books(3)
+
+    results, queries = list_queries(admin_client, fields='id,authors')
+
+    assert results[0]['authors'][0]['full_name'] == 'Author 0'
+    assert len(queries) == 2
+    assert not any('books_tag' in sql for sql in queries)
+
+
+@pytest.mark.django_db
+def test_sparse_fields_do_not_fill_the_payload_cache(admin_client):
+    make_books(1)
+
+    list_queries(admin_client, fields='title')
+
+    assert cache.get_payloads([Book.objects.get().pk]) == {}
+
+
+@pytest.mark.django_db
+def test_unknown_sparse_field_is_bad_request(admin_client):
+    response = admin_client.get(
+        reverse('books-api:book-list'), {'fields': 'title,edition'})
+
+    assert response.status_code == 400
+    assert 'edition' in response.json()['fields'][0]
+
+
+@pytest.mark.django_db
+def test_sparse_detail(admin_client):
+    make_books(1)
+    book = Book.objects.get()
+
+    response = admin_client.get(
+        reverse('books-api:book-detail', kwargs={'pk': book.pk}),
+        {'fields': 'id,publisher'})
+
+    assert response.json() == {'id': book.pk, 'publisher': {
+        'id': book.publisher_id, 'name': 'Sajha',
+        'publication_year': 1973, 'publication_place': None}}
+
+
+@pytest.mark.django_db
+def test_compact_list_reads_one_table(admin_client):
+    make_books(3)
+
+    results, queries = list_queries(admin_client, compact='1', page_size=2)
+
+    assert results[0] == {
+        'id': Book.objects.get(title='Book 0').pk, 'title': 'Book 0',
+        'subject': 'Nepali', 'availability': False,
+        'authors': ['Author 0'], 'year': 1973}
+    assert len(queries) == 1
+    assert 'JOIN' not in queries[0]
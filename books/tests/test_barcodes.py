@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+
+import pytest
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from books import barcodes
+from books.models import Book
+
+
+@pytest.fixture
+def book():
+    return Book.objects.create(
+        title='Seto Bagh', subject='Nepali', barcode='978-0001')
+
+
+@pytest.fixture
+def bloom_filter(settings):
+    settings.BOOKS_BARCODE_BLOOM_FILTER = {
+        'CAPACITY': 1000, 'ERROR_RATE': 0.001, 'REFRESH_SECONDS': 0}
+    barcodes.reset()
+    yield
+    barcodes.reset()
+
+
+@pytest.mark.django_db
+def test_check_barcode(book):
+    other = Book(title='Muna Madan', subject='Nepali')
+
+    assert other.check_barcode('978-0001')
+    assert not other.check_barcode('978-9999')
+    # A book's own barcode is not a conflict.
+    assert not book.check_barcode('978-0001')
+
+
+@pytest.mark.django_db
+def test_check_barcodes_uses_one_query(book):
+    with CaptureQueriesContext(connection) as queries:
+        results = Book.check_barcodes(['978-0001', '978-0002', '978-0003'])
+
+    assert results == {
+        '978-0001': True, '978-0002': False, '978-0003': False}
+    assert len(queries) == 1
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = barcodes.BloomFilter(capacity=100, error_rate=0.01)
+    codes = ['978-%04d' % i for i in range(100)]
+    for code in codes:
+        bloom.add(code)
+
+    assert all(code in bloom for code in codes)
+
+
+@pytest.mark.django_db
+def test_bloom_filter_answers_unknown_codes_without_queries(
+        bloom_filter, book):
+    barcodes.get_filter()
+    new_book = Book.objects.create(
+        title='Muna Madan', subject='Nepali', barcode='978-0002')
+
+    with CaptureQueriesContext(connection) as queries:
+        assert not new_book.check_barcode('978-9999')
+    assert len(queries) == 0
+
+    assert Book.check_barcodes(['978-0001', '978-0002', '978-9999']) == {
+        '978-0001': True, '978-0002': True, '978-9999': False}
+
+
+def test_bloom_filter_reloads_in_the_background(settings, monkeypatch):
+    settings.BOOKS_BARCODE_BLOOM_FILTER = {'REFRESH_SECONDS': 60}
+    loading, release = threading.Event(), threading.Event()
+
+    def slow_load(options):
+        loading.set()
+        release.wait(5)
+        return barcodes.BloomFilter(capacity=100, error_rate=0.01)
+    monkeypatch.setattr(barcodes, '_load', slow_load)
+    old = barcodes.BloomFilter(capacity=100, error_rate=0.01)
+    monkeypatch.setattr(barcodes, '_filter', old)
+    monkeypatch.setattr(barcodes, '_loaded_at', time.time() - 120)
+    try:
+        # The stale filter answers while the new one is built.
+        assert barcodes.get_filter() is old
+        assert loading.wait(5)
+        barcodes.remember(['978-0009'])
+        release.set()
+        for _ in range(100):
+            if barcodes._filter is not old:
+                break
+            time.sleep(0.05)
+
+        assert barcodes._filter is not old
+        assert '978-0009' in barcodes._filter
+        assert barcodes._pending is None
+    finally:
+        release.set()
+        barcodes.reset()
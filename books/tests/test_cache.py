@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from django.db import transaction
+
+from books import cache
+from books.models import Author, Book, BookType, Publisher, Tag
+from school_library.cache import LRULocMemCache
+
+
+@pytest.fixture
+def books():
+    publisher = Publisher.objects.create(name='Sajha')
+    tag = Tag.objects.create(name='novel')
+    author = Author.objects.create(first_name='Daimond', last_name='Samsher')
+    first = Book.objects.create(
+        title='Seto Bagh', subject='Nepali', publisher=publisher)
+    first.keywords.add(tag)
+    first.authors.add(author)
+    second = Book.objects.create(title='Muna Madan', subject='Nepali')
+    second.book_type = BookType.objects.create(name='Lending', days_amount=7)
+    second.save()
+    return first, second
+
+
+def fill(books):
+    cache.set_payloads({book.pk: {'title': book.title} for book in books})
+
+
+def cached_pks(books):
+    return set(cache.get_payloads([book.pk for book in books]))
+
+
+def test_lru_cache_evicts_least_recently_used():
+    lru = LRULocMemCache('test-lru', {'OPTIONS': {'MAX_ENTRIES': 2}})
+    lru.set('a', 1)
+    lru.set('b', 2)
+    lru.get('a')
+    lru.set('c', 3)
+
+    assert lru.get('a') == 1
+    assert lru.get('b') is None
+    assert lru.get('c') == 3
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('change', [
+    lambda first: first.save(),
+    lambda first: first.publisher.save(),
+    lambda first: first.keywords.get().save(),
+    lambda first: first.authors.get().delete(),
+    lambda first: first.keywords.clear(),
+])
+def test_changes_invalidate_only_affected_books(books, change):
+    first, second = books
+    fill(books)
+
+    change(first)
+
+    assert cached_pks(books) == {second.pk}
+
+
+@pytest.mark.django_db
+def test_book_type_change_invalidates_its_books(books):
+    first, second = books
+    fill(books)
+
+    second.book_type.save()
+
+    assert cached_pks(books) == {first.pk}
+
+
+@pytest.mark.django_db
+def test_stale_payload_versions_are_ignored(books, monkeypatch):
+    fill(books)
+
+    monkeypatch.setattr(cache, 'PAYLOAD_VERSION', cache.PAYLOAD_VERSION + 1)
+
+    assert cached_pks(books) == set()
+
+
+def test_payloads_cached_during_a_change_are_dropped_on_commit(
+        transactional_db):
+    book = Book.objects.create(title='Seto Bagh', subject='Nepali')
+    try:
+        with transaction.atomic():
+            book.title = 'Muna Madan'
+            book.save()
+            # A concurrent reader still sees the committed row.
+            fill([Book(pk=book.pk, title='Seto Bagh')])
+
+        assert cached_pks([book]) == set()
+    finally:
+        # Also drops it from the search index, which is not flushed.
+        book.delete()
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from books.models import Author, Book, Publisher, Tag
+
+
+@pytest.fixture
+def book():
+    book = Book.objects.create(
+        title='Seto Bagh', subject='Nepali',
+        publisher=Publisher.objects.create(name='Sajha'))
+    book.authors.add(Author.objects.create(
+        first_name='Daimond', last_name='Samsher'))
+    book.keywords.add(Tag.objects.create(name='novel'))
+    Book.objects.create(title='Muna Madan', subject='Nepali')
+    return book
+
+
+def list_url():
+    return reverse('books-api:book-list')
+
+
+def detail_url(book):
+    return reverse('books-api:book-detail', kwargs={'pk': book.pk})
+
+
+def revalidate(client, url, response, **params):
+    return client.get(url, params, HTTP_IF_NONE_MATCH=response['ETag'])
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('url', [list_url, lambda: detail_url(
+    Book.objects.get(title='Seto Bagh'))])
+def test_unchanged_books_are_not_modified(admin_client, book, url):
+    url = url()
+    response = admin_client.get(url)
+    assert response.status_code == 200
+    assert response.has_header('Last-Modified')
+
+    with CaptureQueriesContext(connection) as queries:
+        again = revalidate(admin_client, url, response)
+
+    assert again.status_code == 304
+    assert again.content == b''
+    assert not any('"books_author"' in q['sql'] for q in queries)
+
+
+@pytest.mark.django_db
+def test_if_modified_since_is_honoured(admin_client, book):
+    response = admin_client.get(detail_url(book))
+
+    again = admin_client.get(
+        detail_url(book),
+        HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+
+    assert again.status_code == 304
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('change', [
+    lambda book: book.save(),
+    lambda book: book.authors.get().save(),
+    lambda book: book.keywords.clear(),
+    lambda book: book.publisher.save(),
+    lambda book: Book.objects.exclude(pk=book.pk).delete(),
+])
+def test_changes_invalidate_the_list_etag(admin_client, book, change):
+    response = admin_client.get(list_url())
+
+    change(book)
+
+    assert revalidate(admin_client, list_url(), response).status_code == 200
+
+
+@pytest.mark.django_db
+def test_list_etag_depends_on_the_page(admin_client, book):
+    response = admin_client.get(list_url(), {'page_size': 1})
+
+    other = revalidate(admin_client, list_url(), response, page_size=2)
+
+    assert other.status_code == 200
+    assert other['ETag'] != response['ETag']
+
+
+@pytest.mark.django_db
+def test_renamed_author_invalidates_the_detail_etag(admin_client, book):
+    response = admin_client.get(detail_url(book))
+
+    author = book.authors.get()
+    author.last_name = 'Rana'
+    author.save()
+
+    again = revalidate(admin_client, detail_url(book), response)
+    assert again.status_code == 200
+    assert again.json()['authors'][0]['last_name'] == 'Rana'
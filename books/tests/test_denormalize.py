@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+from io import StringIO
+
+import pytest
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from books.models import Author, Book, Publisher
+
+
+@pytest.fixture
+def publisher():
+    return Publisher.objects.create(name='Sajha', publication_year=1973)
+
+
+@pytest.fixture
+def book(publisher):
+    book = Book.objects.create(
+        title='Seto Bagh', subject='Nepali', publisher=publisher)
+    book.authors.add(
+        Author.objects.create(first_name='Daimond', last_name='Samsher'),
+        Author.objects.create(first_name='Laxmi', last_name='Devkota'))
+    return book
+
+
+@pytest.mark.django_db
+def test_properties_are_read_without_queries(book):
+    book = Book.objects.get(pk=book.pk)
+
+    with CaptureQueriesContext(connection) as queries:
+        assert book.author_list == ['Daimond Samsher', 'Laxmi Devkota']
+        assert book.year_published == 1973
+    assert len(queries) == 0
+
+
+@pytest.mark.django_db
+def test_related_changes_are_copied_onto_books(book, publisher):
+    author = Author.objects.get(last_name='Devkota')
+    author.first_name = 'Laxmi Prasad'
+    author.save()
+    publisher.publication_year = 1980
+    publisher.save()
+    Author.objects.get(last_name='Samsher').delete()
+
+    book = Book.objects.get(pk=book.pk)
+    assert book.author_list == ['Laxmi Prasad Devkota']
+    assert book.year_published == 1980
+
+    publisher.delete()
+    assert Book.objects.get(pk=book.pk).year_published is None
+
+
+@pytest.mark.django_db
+def test_saving_a_stale_book_keeps_its_author_names():
+    book = Book.objects.create(title='Muna Madan', subject='Nepali')
+    author = Author.objects.create(first_name='Laxmi', last_name='Devkota')
+    author.book_author.add(book)
+    Book.objects.get(pk=book.pk).authors.add(
+        Author.objects.create(first_name='Bhanu', last_name='Bhakta'))
+
+    book.title = 'Muna-Madan'
+    book.save()
+
+    book = Book.objects.get(pk=book.pk)
+    assert book.title == 'Muna-Madan'
+    assert sorted(book.author_list) == ['Bhanu Bhakta', 'Laxmi Devkota']
+
+
+@pytest.mark.django_db
+def test_command_backfills_stale_rows(book):
+    Book.objects.update(author_names='', published_year=None)
+
+    call_command('denormalize_books', stdout=StringIO())
+
+    book = Book.objects.get(pk=book.pk)
+    assert book.author_list == ['Daimond Samsher', 'Laxmi Devkota']
+    assert book.year_published == 1973
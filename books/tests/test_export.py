@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+import json
+
+import pytest
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework import serializers
+
+from books import export
+from books.models import Author, Book
+
+
+class BookExportTestSerializer(serializers.ModelSerializer):
+    authors = serializers.ListField(source='author_list', read_only=True)
+
+    class Meta:
+        model = Book
+        fields = ('id', 'title', 'authors')
+
+
+@pytest.fixture
+def books():
+    author = Author.objects.create(first_name='Daimond', last_name='Samsher')
+    books = []
+    for i in range(5):
+        book = Book.objects.create(title='Book %d' % i, subject='Nepali')
+        book.authors.add(author)
+        books.append(book)
+    return books
+
+
+def render(export_format, chunk_size=2):
+    return ''.join(export.stream(
+        export_format, BookExportTestSerializer, chunk_size=chunk_size))
+
+
+@pytest.mark.django_db
+def test_json_export_is_one_array(books):
+    payload = json.loads(render('json'))
+
+    assert [item['id'] for item in payload] == [book.pk for book in books]
+    assert payload[0]['authors'] == ['Daimond Samsher']
+
+
+@pytest.mark.django_db
+def test_ndjson_export_has_one_book_per_line(books):
+    lines = render('ndjson').splitlines()
+
+    assert [json.loads(line)['title'] for line in lines] == [
+        book.title for book in books]
+
+
+@pytest.mark.django_db
+def test_empty_catalog_exports_an_empty_array():
+    assert json.loads(render('json')) == []
+
+
+@pytest.mark.django_db
+def test_rows_are_read_one_chunk_per_query(books):
+    with CaptureQueriesContext(connection) as queries:
+        render('ndjson', chunk_size=2)
+
+    # Three chunks of at most two books, and the empty read that ends it.
+    assert len(queries) == 4
+
+
+@pytest.mark.django_db
+def test_opening_bracket_is_sent_before_any_query(books):
+    stream = export.stream('json', BookExportTestSerializer)
+
+    with CaptureQueriesContext(connection) as queries:
+        assert next(stream) == '['
+    assert len(queries) == 0
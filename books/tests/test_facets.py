@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+
+import io
+
+import pytest
+
+from django.urls import reverse
+
+from books import facets
+from books.importer import BookImporter
+from books.models import Book, BookType, FacetCount, Publisher, Tag
+from school_library.utils import read_records
+
+pytestmark = pytest.mark.django_db
+
+
+def counts(facet):
+    return {row['label']: row['count']
+            for row in facets.facet_counts(facet)}
+
+
+@pytest.fixture
+def catalog():
+    sajha = Publisher.objects.create(name='Sajha')
+    lending = BookType.objects.create(name='Lending')
+    novel, poem = Tag.objects.create(name='novel'), Tag.objects.create(
+        name='poem')
+    books = [
+        Book.objects.create(title=title, subject='Nepali', language=language,
+                            publisher=sajha, book_type=lending)
+        for title, language in (('Seto Bagh', 'Nepali'),
+                                ('Muna Madan', 'Nepali'),
+                                ('Palpasa Cafe', 'English'))]
+    books[0].keywords.add(novel)
+    books[1].keywords.add(poem)
+    novel.book_tag.add(books[2])
+    return books
+
+
+def test_counts_follow_books(catalog):
+    assert counts(FacetCount.TAG) == {'novel': 2, 'poem': 1}
+    assert counts(FacetCount.LANGUAGE) == {'Nepali': 2, 'English': 1}
+    assert counts(FacetCount.PUBLISHER) == {'Sajha': 3}
+
+    catalog[0].language = 'English'
+    catalog[0].publisher = None
+    catalog[0].save()
+    catalog[1].delete()
+
+    assert counts(FacetCount.LANGUAGE) == {'English': 2}
+    assert counts(FacetCount.PUBLISHER) == {'Sajha': 1}
+    assert counts(FacetCount.TAG) == {'novel': 2}
+
+
+def test_counts_follow_keywords(catalog):
+    novel, poem = Tag.objects.order_by('name')
+    catalog[0].keywords.remove(poem)
+    catalog[0].keywords.add(poem)
+    novel.book_tag.remove(catalog[2], catalog[1])
+
+    assert counts(FacetCount.TAG) == {'novel': 1, 'poem': 2}
+
+    poem.book_tag.clear()
+    catalog[0].keywords.clear()
+
+    assert counts(FacetCount.TAG) == {}
+    assert set(FacetCount.objects.filter(
+        facet=FacetCount.TAG).values_list('count', flat=True)) == {0}
+
+
+def test_labels_follow_renames_and_deletions(catalog):
+    novel = Tag.objects.get(name='novel')
+    novel.name = 'fiction'
+    novel.save()
+    Publisher.objects.get().delete()
+
+    assert counts(FacetCount.TAG) == {'fiction': 2, 'poem': 1}
+    assert counts(FacetCount.PUBLISHER) == {}
+
+
+def test_imported_books_are_counted():
+    BookImporter().run(read_records(io.StringIO(
+        'title,keywords,book_type\n'
+        'Seto Bagh,novel;history,Lending\n'
+        'Muna Madan,poem,Lending\n'), 'csv'))
+
+    assert counts(FacetCount.TAG) == {'novel': 1, 'history': 1, 'poem': 1}
+    assert counts(FacetCount.BOOK_TYPE) == {'Lending': 2}
+
+
+def test_rebuild_matches_the_maintained_counts(catalog):
+    maintained = {facet: counts(facet) for facet in facets.FACETS}
+
+    facets.rebuild()
+
+    assert {facet: counts(facet) for facet in facets.FACETS} == maintained
+
+
+def test_facet_list(admin_client, catalog):
+    response = admin_client.get(
+        reverse('books-api:facet-list'), {'facets': 'tag,language',
+                                          'limit': 1})
+
+    assert response.json() == {
+        'tag': [{'value': str(Tag.objects.get(name='novel').pk),
+                 'label': 'novel', 'count': 2}],
+        'language': [{'value': 'Nepali', 'label': 'Nepali', 'count': 2}],
+    }
+
+
+@pytest.mark.parametrize('compact', ['', '1'])
+def test_book_list_combines_facet_filters(admin_client, catalog, compact):
+    tags = ','.join(str(tag.pk) for tag in Tag.objects.all())
+
+    response = admin_client.get(reverse('books-api:book-list'), {
+        'tag': tags, 'language': 'Nepali', 'compact': compact})
+
+    assert sorted(book['title'] for book in response.json()['results']) == [
+        'Muna Madan', 'Seto Bagh']
+
+
+def test_book_list_rejects_invalid_facet_ids(admin_client):
+    response = admin_client.get(
+        reverse('books-api:book-list'), {'publisher': 'sajha'})
+
+    assert response.status_code == 400
+    assert 'publisher' in response.json()
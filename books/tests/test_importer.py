@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+
+import io
+import json
+
+import pytest
+from django.core.management import call_command
+
+from books import search
+from books.importer import BookImporter
+from books.models import Author, Book, Publisher, Tag
+from school_library.utils import read_records
+
+CSV = """title,subject,authors,keywords,publisher,publication_year,barcode
+Seto Bagh,Nepali,Daimond Samsher,novel;history,Sajha,1973,B-1
+Muna Madan,Nepali,Laxmi Prasad Devkota,poem,Sajha,1973,B-2
+Shirishko Phool,Nepali,Parijat,novel,Sajha,1973,B-1
+,Nepali,Parijat,novel,,,B-3
+"""
+
+
+def import_csv(text=CSV, **kwargs):
+    importer = BookImporter(**kwargs)
+    importer.run(read_records(io.StringIO(text), 'csv'))
+    return importer
+
+
+@pytest.mark.django_db
+def test_import_creates_books_with_shared_lookups():
+    importer = import_csv(batch_size=2)
+
+    assert importer.imported == 2
+    assert Author.objects.count() == 2
+    assert Publisher.objects.count() == 1
+    assert sorted(Tag.objects.values_list('name', flat=True)) == \
+        ['history', 'novel', 'poem']
+
+    book = Book.objects.get(title='Seto Bagh')
+    assert book.author_list == ['Daimond Samsher']
+    assert book.year_published == 1973
+    assert sorted(t.name for t in book.keywords.all()) == ['history', 'novel']
+
+
+@pytest.mark.django_db
+def test_import_reports_invalid_records():
+    importer = import_csv()
+
+    assert sorted(importer.errors) == [
+        (3, 'Barcode B-1 is already used.'),
+        (4, 'A title is required.'),
+    ]
+
+
+@pytest.mark.django_db
+def test_import_reuses_existing_rows():
+    Author.objects.create(first_name='Daimond', last_name='Samsher')
+    import_csv()
+    second = import_csv(CSV.replace('B-1', 'B-4').replace('B-2', 'B-5'))
+
+    assert second.imported == 2
+    assert Author.objects.count() == 2
+    assert Publisher.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_imported_books_are_searchable(monkeypatch):
+    monkeypatch.setattr(search, '_backend', search.MemoryBackend())
+    import_csv()
+
+    assert [b.title for b in search.search_books('muna')] == ['Muna Madan']
+
+
+@pytest.mark.django_db
+def test_import_books_command_reads_ndjson(tmpdir):
+    path = tmpdir.join('books.ndjson')
+    path.write('\n'.join(json.dumps(record) for record in [
+        {'title': 'Seto Bagh',
+         'authors': [{'first_name': 'Daimond', 'last_name': 'Samsher'}],
+         'keywords': ['novel']},
+        {'subject': 'No title'},
+    ]))
+    out, err = io.StringIO(), io.StringIO()
+
+    call_command('import_books', str(path), stdout=out, stderr=err)
+
+    assert 'Imported 1 books' in out.getvalue()
+    assert 'Record 2 skipped: A title is required.' in err.getvalue()
+    assert Book.objects.get().author_list == ['Daimond Samsher']
+
+
+@pytest.mark.django_db
+def test_imported_copies_are_on_the_shelf():
+    import_csv('title,number_of_copies\nSeto Bagh,3\nMuna Madan,\n')
+
+    assert dict(Book.objects.values_list('title', 'available_copies')) == {
+        'Seto Bagh': 3, 'Muna Madan': 0}
+
+
+@pytest.mark.django_db
+def test_new_tags_slugifying_alike_get_distinct_slugs():
+    importer = import_csv(
+        'title,keywords\n'
+        'Seto Bagh,Computer Science;computer-science\n'
+        'Muna Madan,COMPUTER SCIENCE\n')
+
+    assert importer.imported == 2
+    assert sorted(Tag.objects.values_list('slug', flat=True)) == [
+        'computer-science', 'computer-science-2', 'computer-science-3']
+
+
+@pytest.mark.django_db
+def test_unreadable_ndjson_lines_are_reported_per_line():
+    importer = BookImporter()
+    importer.run(read_records(io.StringIO(
+        '{"title": "Seto Bagh"}\n{"title": \n["Muna Madan"]\n'), 'ndjson'))
+
+    assert importer.imported == 1
+    assert [number for number, _ in importer.errors] == [2, 3]
+    assert importer.errors[0][1].startswith('Line 2 is not valid JSON')
+    assert importer.errors[1][1] == 'Expected an object, got list.'
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from django.utils import timezone
+
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from books.models import Book
+from books.pagination import BookCursorPagination
+
+
+@pytest.fixture
+def books():
+    books = [Book.objects.create(title='Book %02d' % i, subject='Nepali')
+             for i in range(7)]
+    # Ties on `created` must still page deterministically by id.
+    Book.objects.filter(pk__in=[b.pk for b in books[2:5]]).update(
+        created=timezone.now())
+    return list(Book.objects.order_by('created', 'id'))
+
+
+def paginate(url, page_size=3):
+    request = Request(APIRequestFactory().get(url))
+    paginator = BookCursorPagination()
+    paginator.page_size = page_size
+    page = paginator.paginate_queryset(Book.objects.all(), request)
+    return page, paginator
+
+
+@pytest.mark.django_db
+def test_pages_cover_the_catalog_once_in_order(books):
+    seen = []
+    url = '/api/books/'
+    while url:
+        page, paginator = paginate(url)
+        seen.extend(page)
+        url = paginator.get_next_link()
+
+    assert seen == books
+
+
+@pytest.mark.django_db
+def test_previous_link_returns_the_preceding_page(books):
+    page, paginator = paginate('/api/books/')
+    page, paginator = paginate(paginator.get_next_link())
+    second_page = page
+    page, paginator = paginate(paginator.get_next_link())
+
+    page, paginator = paginate(paginator.get_previous_link())
+
+    assert page == second_page
+
+
+@pytest.mark.django_db
+def test_page_size_query_param_is_capped(books):
+    page, paginator = paginate('/api/books/?page_size=100000')
+
+    assert paginator.page_size == BookCursorPagination.max_page_size
+    assert page == books
+
+
+@pytest.mark.django_db
+def test_invalid_cursor_is_not_found(books):
+    with pytest.raises(NotFound):
+        paginate('/api/books/?cursor=bm90LWEtY3Vyc29y')
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+from io import StringIO
+
+import pytest
+
+from django.core.management import call_command
+
+from books import search
+from books.models import Author, Book, Tag
+
+
+@pytest.fixture
+def catalog():
+    samsher = Author.objects.create(first_name='Daimond', last_name='Samsher')
+    smith = Author.objects.create(first_name='Adam', last_name='Smith')
+    economics = Tag.objects.create(name='economics')
+
+    seto_bagh = Book.objects.create(
+        title='Seto Bagh', subject='Nepali', summary='A historical novel.')
+    seto_bagh.authors.add(samsher)
+
+    markets = Book.objects.create(
+        title='Markets of Kathmandu', subject='Trade',
+        summary='Prices and money in the valley.')
+    markets.authors.add(samsher)
+    markets.keywords.add(economics)
+
+    wealth = Book.objects.create(
+        title='The Wealth of Nations', subject='Economics',
+        summary='On the nature and causes of wealth.')
+    wealth.authors.add(smith)
+    return {'seto_bagh': seto_bagh, 'markets': markets, 'wealth': wealth}
+
+
+@pytest.fixture(params=['fts5', 'memory'])
+def backend(request, catalog):
+    if request.param == 'fts5':
+        if not search.fts5_available():
+            pytest.skip('SQLite FTS5 is not available')
+        return search.FTS5Backend()
+    backend = search.MemoryBackend()
+    backend.rebuild()
+    return backend
+
+
+def test_parse_query_drops_stop_words_and_accents():
+    assert search.parse_query('Books about Économics by Samsher') == [
+        'economics', 'samsher']
+
+
+@pytest.mark.django_db
+def test_all_terms_must_match(backend, catalog):
+    results = backend.search('books about economics by Samsher')
+
+    assert [pk for pk, _ in results] == [catalog['markets'].pk]
+
+
+@pytest.mark.django_db
+def test_falls_back_to_any_term_ranked(backend, catalog):
+    results = backend.search('wealth nepali')
+
+    assert set(pk for pk, _ in results) == {
+        catalog['wealth'].pk, catalog['seto_bagh'].pk}
+
+
+@pytest.mark.django_db
+def test_index_follows_renames_and_deletes(catalog):
+    backend = search.get_backend()
+    tag = Tag.objects.get(name='economics')
+    tag.name = 'finance'
+    tag.save()
+    catalog['wealth'].delete()
+
+    assert [pk for pk, _ in backend.search('finance')] == [
+        catalog['markets'].pk]
+    assert backend.search('wealth') == []
+
+
+@pytest.mark.django_db
+def test_search_books_returns_scored_books(catalog):
+    books = search.search_books('samsher')
+
+    assert set(books) == {catalog['seto_bagh'], catalog['markets']}
+    assert all(book.search_score > 0 for book in books)
+
+
+@pytest.mark.django_db
+def test_memory_backend_matches_the_database_until_built(catalog):
+    backend = search.MemoryBackend()
+    backend._reload = lambda: None
+
+    assert backend.search('economics samsher') == [
+        (catalog['markets'].pk, 0.0)]
+    assert set(pk for pk, _ in backend.search('wealth nepali')) == {
+        catalog['wealth'].pk, catalog['seto_bagh'].pk}
+
+
+@pytest.mark.django_db
+def test_memory_backend_replays_writes_made_during_a_rebuild(
+        catalog, settings):
+    settings.BOOKS_SEARCH_REFRESH_SECONDS = 60
+    backend = search.MemoryBackend()
+    backend.rebuild()
+    building, release = threading.Event(), threading.Event()
+
+    def slow_build():
+        building.set()
+        release.wait(5)
+        # Read before the writes below.
+        return search._MemoryIndex()
+    backend._build = slow_build
+    backend._loaded_at = time.time() - 120
+    old = backend._index
+
+    # The stale index answers while the new one is built.
+    assert [pk for pk, _ in backend.search('wealth')] == [
+        catalog['wealth'].pk]
+    assert building.wait(5)
+    backend.remove([catalog['wealth'].pk])
+    backend.index([catalog['seto_bagh'].pk])
+    release.set()
+    for _ in range(100):
+        if backend._index is not old:
+            break
+        time.sleep(0.05)
+
+    assert backend._index is not old
+    assert [pk for pk, _ in backend.search('seto')] == [
+        catalog['seto_bagh'].pk]
+    assert backend.search('wealth') == []
+
+
+def test_rebuild_command_leaves_the_memory_backend_alone(monkeypatch):
+    backend = search.MemoryBackend()
+    monkeypatch.setattr(search, '_backend', backend)
+    stdout = StringIO()
+
+    call_command('rebuild_search_index', stdout=stdout)
+
+    assert backend._index is None
+    assert 'no effect' in stdout.getvalue()
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from books.models import Book, Tag
+from books.tags import tag_ids
+
+pytestmark = pytest.mark.django_db
+
+
+def test_saving_an_unrenamed_tag_keeps_its_slug_without_a_query():
+    Tag.objects.create(name='Computer Science')
+    tag = Tag.objects.get()
+
+    with CaptureQueriesContext(connection) as queries:
+        tag.save()
+
+    assert tag.slug == 'computer-science'
+    assert not [query for query in queries
+                if query['sql'].startswith('SELECT') and '"slug"' in
+                query['sql']]
+
+
+def test_renamed_tags_get_a_new_unique_slug():
+    Tag.objects.create(name='science')
+    tag = Tag.objects.create(name='Computer Science')
+
+    tag.name = 'Science'
+    tag.save()
+
+    assert Tag.objects.get(pk=tag.pk).slug == 'science-2'
+
+
+def test_slugs_resolve_once_until_the_tag_changes():
+    tag = Tag.objects.create(name='novel')
+
+    assert tag_ids.resolve('novel') == tag.pk
+    with CaptureQueriesContext(connection) as queries:
+        assert tag_ids.resolve('novel') == tag.pk
+    assert len(queries) == 0
+
+    tag.name = 'fiction'
+    tag.save()
+
+    assert tag_ids.resolve('novel') is None
+    assert tag_ids.resolve('fiction') == tag.pk
+
+
+def test_books_of_a_tag(admin_client):
+    novel = Tag.objects.create(name='novel')
+    for title in ('Seto Bagh', 'Muna Madan'):
+        Book.objects.create(title=title, subject='Nepali')
+    Book.objects.get(title='Seto Bagh').keywords.add(novel)
+
+    response = admin_client.get(
+        reverse('books-api:tag-book-list', kwargs={'slug': 'novel'}),
+        {'compact': '1'})
+
+    assert [book['title'] for book in response.json()['results']] == [
+        'Seto Bagh']
+
+
+def test_unknown_tag(admin_client):
+    response = admin_client.get(
+        reverse('books-api:tag-book-list', kwargs={'slug': 'missing'}))
+
+    assert response.status_code == 404
@@ -3,3 +3,51 @@
 # @Date:   2017-08-12 16:57:16
 # @Last Modified by:   sijanonly
 # @Last Modified time: 2017-08-12 16:57:16
+
+
+from django.conf.urls import url
+
+from .views import (
+    BarcodeCheck, BookDetail, BookExport, BookList, BookSearch, FacetList,
+    TagBookList)
+
+"""
+Configure the URL patterns for the Books API.
+"""
+urlpatterns = [
+    # List all Books
+    url(
+        r'^$',
+        BookList.as_view(), name='book-list'
+    ),
+    # Return a specific Book by id
+    url(
+        r'^(?P<pk>[0-9]+)/$',
+        BookDetail.as_view(), name='book-detail'
+    ),
+    # List the Books with a tag
+    url(
+        r'^tags/(?P<slug>[-\w]+)/books/$',
+        TagBookList.as_view(), name='tag-book-list'
+    ),
+    # Book counts per tag, book type, publisher and language
+    url(
+        r'^facets/$',
+        FacetList.as_view(), name='facet-list'
+    ),
+    # Full-text search over the catalog
+    url(
+        r'^search/$',
+        BookSearch.as_view(), name='book-search'
+    ),
+    # Check a batch of scanned barcodes
+    url(
+        r'^barcodes/check/$',
+        BarcodeCheck.as_view(), name='barcode-check'
+    ),
+    # Stream the whole catalog
+    url(
+        r'^export\.(?P<export_format>ndjson|json)$',
+        BookExport.as_view(), name='book-export'
+    ),
+]
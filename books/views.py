@@ -1,23 +1,184 @@
-from rest_framework import generics
+from django.http import Http404, StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 
-from library.serializers import (
-    BookDetailSerializer
+from rest_framework import generics, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from users.authentication import AuthenticationFamilyMixin
+
+from .serializers import (
+    BarcodeBatchSerializer, BookCompactSerializer, BookDetailSerializer,
+    BookExportSerializer, BookSearchResultSerializer
 )
 
-from library.models import Book
+from .models import Book
+
+from . import conditional, export, facets, tags
+from .pagination import BookCursorPagination
+from .search import search_books
+
+
+class BookList(AuthenticationFamilyMixin, generics.ListAPIView):
+    """
+    get:
+        Return a page of books, oldest first.
 
+        `fields` limits each book to the given comma separated fields;
+        `compact=1` returns flat books without nested relations.
 
-class BookList(generics.ListAPIView):
+        `tag`, `book_type` and `publisher` (comma separated ids) and
+        `language` (comma separated names) keep the books with one of the
+        given values of each facet.
+    """
+    authentication_family = 'books'
     model = Book
     serializer_class = BookDetailSerializer
-    queryset = Book.objects.all().order_by('-created')
+    pagination_class = BookCursorPagination
+
+    @property
+    def compact(self):
+        return self.request.query_params.get('compact') in ('1', 'true')
+
+    def get_serializer_class(self):
+        if self.compact:
+            return BookCompactSerializer
+        return self.serializer_class
 
     def get_queryset(self):
         """
         This view should return a list of books.
         """
-        return Book.objects.all().select_related(
+        ordering = self.pagination_class.ordering
+        books = facets.filter_books(
+            Book.objects.all(), self.request.query_params)
+        if self.compact:
+            return books.values(*BookCompactSerializer.columns + ordering)
+
+        # `authors` and `keywords` are prefetched by the serializer, and
+        # only for the books missing from the payload cache.
+        queryset = books.select_related(
             'book_type',
-            'publisher',).prefetch_related(
-            'authors',
-            'keywords')
+            'publisher',)
+        return self.get_serializer().narrow_queryset(queryset, ordering)
+
+    @method_decorator(condition(
+        etag_func=conditional.list_etag,
+        last_modified_func=conditional.list_last_modified))
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+
+class TagBookList(BookList):
+    """
+    get:
+        Return a page of the books with the tag of `slug`, oldest first.
+        Takes the parameters of the book list.
+    """
+
+    def get_queryset(self):
+        pk = tags.tag_ids.resolve(self.kwargs['slug'])
+        if pk is None:
+            raise Http404
+        return super().get_queryset().filter(
+            pk__in=Book.keywords.through.objects.filter(
+                tag_id=pk).values('book_id'))
+
+
+class BookDetail(AuthenticationFamilyMixin, generics.RetrieveAPIView):
+    """
+    get:
+        Return a Book instance.
+    """
+    authentication_family = 'books'
+    serializer_class = BookDetailSerializer
+
+    def get_queryset(self):
+        queryset = Book.objects.select_related('book_type', 'publisher')
+        return self.get_serializer().narrow_queryset(queryset)
+
+    @method_decorator(condition(
+        etag_func=conditional.detail_etag,
+        last_modified_func=conditional.detail_last_modified))
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+
+class FacetList(AuthenticationFamilyMixin, APIView):
+    """
+    get:
+        Return the values of each facet with the most books, and their
+        number of books: at most `limit` (default 20) per facet, for the
+        comma separated `facets` (default: all).
+    """
+    authentication_family = 'books'
+    max_limit = 100
+
+    def get(self, request, format=None):
+        try:
+            limit = int(request.query_params.get('limit', 20))
+        except ValueError:
+            limit = 20
+        limit = max(1, min(limit, self.max_limit))
+        wanted = request.query_params.get('facets')
+        names = [facet for facet in facets.FACETS
+                 if not wanted or facet in wanted.split(',')]
+        return Response({
+            facet: facets.facet_counts(facet, limit) for facet in names})
+
+
+class BookSearch(AuthenticationFamilyMixin, generics.ListAPIView):
+    """
+    get:
+        Return the books best matching the `q` query, best first.
+    """
+    authentication_family = 'books'
+    serializer_class = BookSearchResultSerializer
+    pagination_class = None
+    max_limit = 100
+
+    def get_queryset(self):
+        query = self.request.query_params.get('q', '')
+        try:
+            limit = int(self.request.query_params.get('limit', 20))
+        except ValueError:
+            limit = 20
+        return search_books(query, limit=max(1, min(limit, self.max_limit)))
+
+
+class BarcodeCheck(AuthenticationFamilyMixin, APIView):
+    """
+    post:
+        Check a batch of scanned barcodes. Returns whether each one is
+        already used by a book.
+    """
+    authentication_family = 'books'
+
+    def post(self, request, format=None):
+        serializer = BarcodeBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(
+                serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        results = Book.check_barcodes(serializer.validated_data['barcodes'])
+        return Response({'results': results})
+
+
+class BookExport(AuthenticationFamilyMixin, APIView):
+    """
+    get:
+        Stream the whole catalog, as NDJSON (`export.ndjson`) or as a
+        single JSON array (`export.json`).
+    """
+    authentication_family = 'books'
+    chunk_size = 500
+
+    def get(self, request, export_format, format=None):
+        response = StreamingHttpResponse(
+            export.stream(export_format, BookExportSerializer,
+                          chunk_size=self.chunk_size),
+            content_type=export.CONTENT_TYPES[export_format])
+        response['Content-Disposition'] = (
+            'attachment; filename="books.%s"' % export_format)
+        return response
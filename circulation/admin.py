@@ -0,0 +1,17 @@
+from django.contrib import admin
+
+from circulation.models import Hold, Loan
+
+
+@admin.register(Loan)
+class LoanAdmin(admin.ModelAdmin):
+    list_display = ('book', 'borrower', 'borrowed', 'due', 'returned')
+    list_select_related = ('book', 'borrower')
+    raw_id_fields = ('book', 'borrower')
+
+
+@admin.register(Hold)
+class HoldAdmin(admin.ModelAdmin):
+    list_display = ('book', 'patron', 'placed', 'ready', 'closed')
+    list_select_related = ('book', 'patron')
+    raw_id_fields = ('book', 'patron')
@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+
+"""Loans of book copies, and holds on books with no copy on the shelf.
+
+`Book.available_copies` counts the copies on the shelf. It only changes
+through `take_copy` and `release_copy`, single conditional ``UPDATE``
+statements: the database checks and changes the count together, so
+concurrent checkouts of the last copy cannot both succeed, and checkout
+neither reads nor locks the book row first.
+
+A returned copy goes to the oldest waiting hold, if any, instead of the
+shelf; the hold is then *ready* and its patron checks the copy out.
+"""
+
+import datetime
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import BooleanField, Case, F, Value, When
+from django.utils import timezone
+from django.utils.translation import ugettext_lazy as _
+
+from books import cache
+from books.models import Book
+
+
+class CirculationError(Exception):
+    """
+    A circulation request that the state of the book does not allow.
+    """
+
+
+class NotAvailable(CirculationError):
+    """
+    No copy of the book is on the shelf or held for the borrower.
+    """
+
+
+def take_copy(book_pk, now):
+    """
+    Take a copy of a book off the shelf. Return False if none was left.
+    """
+    taken = Book.objects.filter(pk=book_pk, available_copies__gt=0).update(
+        available_copies=F('available_copies') - 1,
+        # Evaluated against the count before the update.
+        availability=Case(
+            When(available_copies__gt=1, then=Value(True)),
+            default=Value(False), output_field=BooleanField()),
+        modified=now)
+    if taken:
+        cache.invalidate([book_pk])
+    return bool(taken)
+
+
+def release_copy(book_pk, now):
+    """
+    Give a copy of a book back to the oldest waiting hold, or to the shelf.
+    Return the hold it went to, if any.
+    """
+    waiting = Hold.objects.filter(
+        book_id=book_pk, ready=None, closed=None).order_by('placed', 'pk')
+    for hold in waiting:
+        # Lost to a concurrent return or cancellation: try the next one.
+        if Hold.objects.filter(
+                pk=hold.pk, ready=None, closed=None).update(ready=now):
+            hold.ready = now
+            return hold
+
+    Book.objects.filter(pk=book_pk).update(
+        available_copies=F('available_copies') + 1,
+        availability=True, modified=now)
+    cache.invalidate([book_pk])
+    return None
+
+
+def loan_period(book):
+    """
+    The lending period of `book`'s type, or ``CIRCULATION_LOAN_DAYS``.
+    """
+    days = book.book_type.days_amount if book.book_type_id else None
+    if days is None:
+        days = settings.CIRCULATION_LOAN_DAYS
+    return datetime.timedelta(days=days)
+
+
+class LoanManager(models.Manager):
+
+    def checkout(self, book, borrower):
+        """
+        Lend a copy of `book` to `borrower`, due after the lending period
+        of its book type.
+
+        A copy held for the borrower is lent before one from the shelf.
+        Raises `NotAvailable` when neither is left.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            # A copy set aside for the borrower's ready hold is already off
+            # the shelf: lend that one, leaving the shelf to others.
+            fulfilled = Hold.objects.filter(
+                book=book, patron=borrower, closed=None).exclude(
+                ready=None).update(closed=now)
+            if not fulfilled and not take_copy(book.pk, now):
+                raise NotAvailable(
+                    'No copy of "%s" is available.' % book.title)
+            return self.create(
+                book=book, borrower=borrower, borrowed=now,
+                due=now + loan_period(book))
+
+
+class Loan(models.Model):
+    """
+    A copy of a book lent to a user.
+    """
+
+    # Relations:
+    book = models.ForeignKey(
+        Book, on_delete=models.PROTECT, related_name='loans')
+    borrower = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.PROTECT,
+        related_name='loans')
+
+    # Attributes:
+    borrowed = models.DateTimeField(default=timezone.now)
+    due = models.DateTimeField()
+    returned = models.DateTimeField(blank=True, null=True)
+    # When the overdue reminder was queued; see circulation.tasks.
+    reminded = models.DateTimeField(blank=True, null=True, editable=False)
+
+    objects = LoanManager()
+
+    # Meta and Strings:
+    class Meta:
+        ordering = ['-borrowed', '-id']
+        indexes = [
+            # A borrower's loans, newest first; see
+            # circulation.pagination.LoanPagination.
+            models.Index(
+                fields=['borrower', 'borrowed', 'id'],
+                name='circulation_loan_borrower_idx'),
+            # Loans still out, by due date.
+            models.Index(
+                fields=['returned', 'due'],
+                name='circulation_loan_due_idx'),
+        ]
+        verbose_name = _('Loan')
+        verbose_name_plural = _('Loans')
+
+    def __str__(self):
+        return '%s, due %s' % (self.book_id, self.due.date())
+
+    def return_copy(self):
+        """
+        Take the copy back. Return False if it was already returned.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            if not Loan.objects.filter(
+                    pk=self.pk, returned=None).update(returned=now):
+                return False
+            release_copy(self.book_id, now)
+        self.returned = now
+        return True
+
+
+class HoldManager(models.Manager):
+
+    def place(self, book, patron):
+        """
+        Queue `patron` for the next returned copy of `book`.
+        """
+        if book.available_copies > 0:
+            raise CirculationError(
+                'A copy of "%s" is on the shelf.' % book.title)
+        if self.filter(book=book, patron=patron, closed=None).exists():
+            raise CirculationError(
+                'A hold on "%s" is already placed.' % book.title)
+        return self.create(book=book, patron=patron)
+
+
+class Hold(models.Model):
+    """
+    A user waiting for a copy of a book.
+
+    `ready` is set when a returned copy is set aside for the patron, and
+    `closed` when they check it out or the hold is cancelled.
+    """
+
+    # Relations:
+    book = models.ForeignKey(
+        Book, on_delete=models.CASCADE, related_name='holds')
+    patron = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+        related_name='holds')
+
+    # Attributes:
+    placed = models.DateTimeField(default=timezone.now)
+    ready = models.DateTimeField(blank=True, null=True)
+    closed = models.DateTimeField(blank=True, null=True)
+
+    objects = HoldManager()
+
+    # Meta and Strings:
+    class Meta:
+        ordering = ['placed', 'id']
+        indexes = [
+            # The hold queue of a book.
+            models.Index(
+                fields=['book', 'placed'], name='circulation_hold_queue_idx'),
+        ]
+        verbose_name = _('Hold')
+        verbose_name_plural = _('Holds')
+
+    def __str__(self):
+        return '%s on %s' % (self.patron_id, self.book_id)
+
+    def cancel(self):
+        """
+        Close the hold, passing a copy set aside for it on. Return False if
+        it was already closed.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            # Locked so a concurrent return cannot make it ready meanwhile.
+            hold = Hold.objects.select_for_update().filter(
+                pk=self.pk, closed=None).first()
+            if hold is None:
+                return False
+            Hold.objects.filter(pk=self.pk).update(closed=now)
+            if hold.ready is not None:
+                release_copy(self.book_id, now)
+        self.closed = now
+        return True
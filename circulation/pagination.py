@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+
+"""Pagination styles for the circulation API.
+"""
+
+from school_library.pagination import KeysetPagination
+
+
+class LoanPagination(KeysetPagination):
+    """
+    Newest loans first, backed by ``circulation_loan_borrower_idx`` for the
+    loans of one borrower.
+    """
+
+    ordering = ('-borrowed', '-id')
+
+
+class HoldPagination(KeysetPagination):
+    """
+    Holds in queue order.
+    """
+
+    ordering = ('placed', 'id')
@@ -0,0 +1,42 @@
+from rest_framework import serializers
+
+from books.models import Book
+from circulation.models import Hold, Loan
+from users.models import User
+
+
+class LoanSerializer(serializers.ModelSerializer):
+    """
+    A loan. `borrower` defaults to the requesting user.
+    """
+    # The book type gives the lending period.
+    book = serializers.PrimaryKeyRelatedField(
+        queryset=Book.objects.select_related('book_type'))
+    borrower = serializers.PrimaryKeyRelatedField(
+        queryset=User.objects.all(), required=False)
+
+    class Meta:
+        model = Loan
+        fields = ('id', 'book', 'borrower', 'borrowed', 'due', 'returned')
+        read_only_fields = ('borrowed', 'due', 'returned')
+
+    def create(self, validated_data):
+        return Loan.objects.checkout(
+            validated_data['book'], validated_data['borrower'])
+
+
+class HoldSerializer(serializers.ModelSerializer):
+    """
+    A hold of the requesting user.
+    """
+    book = serializers.PrimaryKeyRelatedField(
+        queryset=Book.objects.only('id', 'title', 'available_copies'))
+
+    class Meta:
+        model = Hold
+        fields = ('id', 'book', 'patron', 'placed', 'ready', 'closed')
+        read_only_fields = ('patron', 'placed', 'ready', 'closed')
+
+    def create(self, validated_data):
+        return Hold.objects.place(
+            validated_data['book'], validated_data['patron'])
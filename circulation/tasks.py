@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+"""Periodic circulation jobs, run by `jobs.worker`.
+"""
+
+import datetime
+
+from django.conf import settings
+from django.core.mail import send_mass_mail
+from django.db import transaction
+from django.utils import timezone
+
+from circulation.models import Hold, Loan
+from jobs.registry import task
+
+# Loans per reminder job.
+CHUNK_SIZE = 500
+
+
+@task(every=datetime.timedelta(hours=1))
+def sweep_overdue():
+    """
+    Queue reminders for the loans that went past due since the last sweep,
+    `CHUNK_SIZE` loans per job.
+    """
+    now = timezone.now()
+    last_pk = 0
+    while True:
+        pks = list(Loan.objects.filter(
+            returned=None, reminded=None, due__lt=now, pk__gt=last_pk,
+        ).order_by('pk').values_list('pk', flat=True)[:CHUNK_SIZE])
+        if not pks:
+            return
+        with transaction.atomic():
+            Loan.objects.filter(pk__in=pks).update(reminded=now)
+            send_overdue_reminders.enqueue(loans=pks)
+        last_pk = pks[-1]
+
+
+@task
+def send_overdue_reminders(loans):
+    """
+    Mail the borrowers of the given loans that are still out.
+    """
+    overdue = Loan.objects.filter(pk__in=loans, returned=None).exclude(
+        borrower__email='').select_related('book', 'borrower')
+    send_mass_mail([
+        ('Overdue: %s' % loan.book.title,
+         'Please return "%s", due on %s.' % (
+             loan.book.title, loan.due.date().isoformat()),
+         settings.DEFAULT_FROM_EMAIL, [loan.borrower.email])
+        for loan in overdue])
+
+
+@task(every=datetime.timedelta(hours=1))
+def expire_holds():
+    """
+    Cancel the holds not picked up within ``CIRCULATION_HOLD_DAYS``,
+    passing their copies on.
+    """
+    expired = timezone.now() - datetime.timedelta(
+        days=settings.CIRCULATION_HOLD_DAYS)
+    for hold in Hold.objects.filter(
+            closed=None, ready__lt=expired).iterator():
+        hold.cancel()
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from django.urls import reverse
+
+from books.models import Book
+from circulation.models import Hold, Loan
+from users.models import User
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def book():
+    return Book.objects.create(
+        title='Muna Madan', subject='Nepali', number_of_copies=1)
+
+
+@pytest.fixture
+def reader():
+    return User.objects.create(username='reader', city='Kathmandu')
+
+
+@pytest.fixture
+def reader_client(client, reader):
+    client.force_login(reader)
+    return client
+
+
+def test_checkout_and_return_at_the_desk(admin_client, book, reader):
+    response = admin_client.post(reverse('circulation-api:loan-list'), {
+        'book': book.pk, 'borrower': reader.pk})
+
+    assert response.status_code == 201
+    assert response.json()['borrower'] == str(reader.pk)
+
+    response = admin_client.post(reverse('circulation-api:loan-list'), {
+        'book': book.pk, 'borrower': reader.pk})
+
+    assert response.status_code == 409
+
+    url = reverse('circulation-api:loan-return',
+                  kwargs={'pk': Loan.objects.get().pk})
+    assert admin_client.post(url).json()['returned'] is not None
+    assert admin_client.post(url).status_code == 409
+
+
+def test_users_borrow_for_themselves(reader_client, book, admin_user):
+    url = reverse('circulation-api:loan-list')
+
+    assert reader_client.post(url, {
+        'book': book.pk, 'borrower': admin_user.pk}).status_code == 403
+    assert reader_client.post(url, {'book': book.pk}).status_code == 201
+    assert len(reader_client.get(url).json()['results']) == 1
+
+
+def test_users_see_their_own_loans(reader_client, book, admin_user):
+    Loan.objects.checkout(book, admin_user)
+
+    response = reader_client.get(reverse('circulation-api:loan-list'))
+
+    assert response.json()['results'] == []
+
+
+def test_staff_see_the_loans_of_a_borrower(admin_client, book, reader):
+    Loan.objects.checkout(book, reader)
+    url = reverse('circulation-api:loan-list')
+
+    response = admin_client.get(url, {'borrower': reader.pk})
+
+    assert [loan['borrower'] for loan in response.json()['results']] == [
+        str(reader.pk)]
+    response = admin_client.get(url, {'borrower': 'abc'})
+    assert response.status_code == 400
+    assert 'borrower' in response.json()
+
+
+def test_staff_see_the_holds_on_a_book(
+        admin_client, book, reader, admin_user):
+    Loan.objects.checkout(book, admin_user)
+    Hold.objects.place(Book.objects.get(pk=book.pk), reader)
+    url = reverse('circulation-api:hold-list')
+
+    response = admin_client.get(url, {'book': book.pk})
+
+    assert [hold['book'] for hold in response.json()['results']] == [book.pk]
+    response = admin_client.get(url, {'book': 'abc'})
+    assert response.status_code == 400
+    assert 'book' in response.json()
+
+
+def test_hold_and_cancel(reader_client, book, admin_user):
+    Loan.objects.checkout(book, admin_user)
+
+    response = reader_client.post(
+        reverse('circulation-api:hold-list'), {'book': book.pk})
+
+    assert response.status_code == 201
+    url = reverse('circulation-api:hold-detail',
+                  kwargs={'pk': response.json()['id']})
+    assert reader_client.delete(url).status_code == 204
+    assert reader_client.delete(url).status_code == 409
+    assert Hold.objects.get().closed is not None
+
+
+def test_no_hold_on_a_book_on_the_shelf(reader_client, book):
+    response = reader_client.post(
+        reverse('circulation-api:hold-list'), {'book': book.pk})
+
+    assert response.status_code == 409
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+
+import datetime
+
+import pytest
+
+from books import cache
+from books.models import Book, BookType
+from circulation.models import CirculationError, Hold, Loan, NotAvailable
+from users.models import User
+
+pytestmark = pytest.mark.django_db
+
+
+def make_user(username):
+    return User.objects.create(username=username, city='Kathmandu')
+
+
+@pytest.fixture
+def book():
+    return Book.objects.create(
+        title='Muna Madan', subject='Nepali', number_of_copies=2,
+        book_type=BookType.objects.create(name='Lending', days_amount=7))
+
+
+@pytest.fixture
+def reader():
+    return make_user('reader')
+
+
+def refresh(book):
+    return Book.objects.get(pk=book.pk)
+
+
+def test_new_books_are_on_the_shelf(book):
+    book = refresh(book)
+    assert book.available_copies == 2
+    assert book.availability is True
+
+
+def test_changed_number_of_copies_moves_the_shelf_count(book, reader):
+    Loan.objects.checkout(book, reader)
+    # A stale instance: its shelf count is not written back.
+    book.number_of_copies = 4
+    book.save()
+
+    assert (book.available_copies, book.availability) == (3, True)
+    assert refresh(book).available_copies == 3
+
+    book.number_of_copies = 1
+    book.save()
+
+    assert (book.available_copies, book.availability) == (0, False)
+
+
+def test_checkout_takes_a_copy_due_after_the_lending_period(book, reader):
+    loan = Loan.objects.checkout(book, reader)
+
+    assert loan.due - loan.borrowed == datetime.timedelta(days=7)
+    book = refresh(book)
+    assert book.available_copies == 1
+    assert book.availability is True
+
+
+def test_checkout_without_book_type_uses_the_default_period(
+        reader, settings):
+    settings.CIRCULATION_LOAN_DAYS = 21
+    book = Book.objects.create(
+        title='Seto Dharti', subject='Nepali', number_of_copies=1)
+
+    loan = Loan.objects.checkout(book, reader)
+
+    assert loan.due - loan.borrowed == datetime.timedelta(days=21)
+
+
+def test_the_last_copy_is_lent_once(book, reader):
+    # Both desks loaded the book while two copies were on the shelf.
+    stale = [refresh(book) for _ in range(3)]
+    Loan.objects.checkout(stale[0], reader)
+    Loan.objects.checkout(stale[1], make_user('other'))
+
+    with pytest.raises(NotAvailable):
+        Loan.objects.checkout(stale[2], make_user('third'))
+
+    book = refresh(book)
+    assert book.available_copies == 0
+    assert book.availability is False
+    assert Loan.objects.count() == 2
+
+
+def test_checkout_drops_the_cached_payload(book, reader):
+    cache.set_payloads({book.pk: {'title': 'stale'}})
+
+    Loan.objects.checkout(book, reader)
+
+    assert cache.get_payloads([book.pk]) == {}
+    assert refresh(book).modified > book.modified
+
+
+def test_return_puts_the_copy_back_once(book, reader):
+    loan = Loan.objects.checkout(book, reader)
+
+    assert loan.return_copy() is True
+    assert Loan.objects.get(pk=loan.pk).return_copy() is False
+    assert refresh(book).available_copies == 2
+
+
+def test_holds_need_an_empty_shelf(book, reader):
+    with pytest.raises(CirculationError):
+        Hold.objects.place(book, reader)
+
+
+def test_returned_copy_goes_to_the_oldest_hold(book, reader):
+    loans = [Loan.objects.checkout(book, make_user(name))
+             for name in ('first', 'second')]
+    book = refresh(book)
+    hold = Hold.objects.place(book, reader)
+    later = Hold.objects.place(book, make_user('later'))
+
+    loans[0].return_copy()
+
+    assert Hold.objects.get(pk=hold.pk).ready is not None
+    assert Hold.objects.get(pk=later.pk).ready is None
+    assert refresh(book).available_copies == 0
+    with pytest.raises(NotAvailable):
+        Loan.objects.checkout(book, make_user('walk-in'))
+
+    Loan.objects.checkout(book, reader)
+
+    assert Hold.objects.get(pk=hold.pk).closed is not None
+
+
+def test_ready_hold_is_lent_before_the_shelf(book, reader):
+    loans = [Loan.objects.checkout(book, make_user(name))
+             for name in ('first', 'second')]
+    hold = Hold.objects.place(refresh(book), reader)
+    loans[0].return_copy()
+    # A second copy comes back to the shelf.
+    loans[1].return_copy()
+    book = refresh(book)
+    assert book.available_copies == 1
+
+    Loan.objects.checkout(book, reader)
+
+    assert Hold.objects.get(pk=hold.pk).closed is not None
+    assert refresh(book).available_copies == 1
+    Loan.objects.checkout(book, make_user('walk-in'))
+    with pytest.raises(NotAvailable):
+        Loan.objects.checkout(book, reader)
+
+
+def test_cancelled_ready_hold_passes_the_copy_on(book, reader):
+    loan = Loan.objects.checkout(book, make_user('first'))
+    Loan.objects.checkout(book, make_user('second'))
+    hold = Hold.objects.place(refresh(book), reader)
+    loan.return_copy()
+    hold.refresh_from_db()
+
+    assert hold.cancel() is True
+    assert hold.cancel() is False
+    book = refresh(book)
+    assert book.available_copies == 1
+    assert book.availability is True
+
+
+def test_placed_twice(book, reader):
+    for name in ('first', 'second'):
+        Loan.objects.checkout(book, make_user(name))
+    Hold.objects.place(refresh(book), reader)
+
+    with pytest.raises(CirculationError):
+        Hold.objects.place(refresh(book), reader)
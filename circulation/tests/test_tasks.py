@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+import datetime
+
+import pytest
+
+from django.core import mail
+from django.utils import timezone
+
+from books.models import Book
+from circulation import tasks
+from circulation.models import Hold, Loan
+from jobs.models import Job
+from jobs.worker import Worker
+from users.models import User
+
+pytestmark = pytest.mark.django_db
+
+
+def make_user(username):
+    return User.objects.create(
+        username=username, email='%s@example.com' % username,
+        city='Kathmandu')
+
+
+@pytest.fixture
+def book():
+    return Book.objects.create(
+        title='Muna Madan', subject='Nepali', number_of_copies=3)
+
+
+def test_overdue_loans_get_one_reminder(book, monkeypatch):
+    monkeypatch.setattr(tasks, 'CHUNK_SIZE', 2)
+    for name in ('ram', 'sita', 'hari'):
+        Loan.objects.checkout(book, make_user(name))
+    Loan.objects.update(due=timezone.now() - datetime.timedelta(days=1))
+
+    tasks.sweep_overdue()
+    tasks.sweep_overdue()
+
+    jobs = Job.objects.filter(name='circulation.send_overdue_reminders')
+    assert sorted(len(job.arguments['loans']) for job in jobs) == [1, 2]
+
+    Worker().run_once()
+
+    assert sorted(message.to[0] for message in mail.outbox) == [
+        'hari@example.com', 'ram@example.com', 'sita@example.com']
+    assert mail.outbox[0].subject == 'Overdue: Muna Madan'
+
+
+def test_loans_not_yet_due_are_left_alone(book):
+    Loan.objects.checkout(book, make_user('ram'))
+
+    tasks.sweep_overdue()
+
+    assert not Job.objects.filter(
+        name='circulation.send_overdue_reminders').exists()
+
+
+def test_uncollected_holds_expire(settings):
+    settings.CIRCULATION_HOLD_DAYS = 2
+    book = Book.objects.create(
+        title='Seto Bagh', subject='Nepali', number_of_copies=1)
+    loan = Loan.objects.checkout(book, make_user('ram'))
+    hold = Hold.objects.place(Book.objects.get(pk=book.pk), make_user('sita'))
+    loan.return_copy()
+    Hold.objects.update(ready=timezone.now() - datetime.timedelta(days=3))
+
+    tasks.expire_holds()
+
+    assert Hold.objects.get(pk=hold.pk).closed is not None
+    assert Book.objects.get(pk=book.pk).available_copies == 1
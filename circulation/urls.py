@@ -0,0 +1,29 @@
+from django.conf.urls import url
+
+from .views import HoldDetail, HoldList, LoanList, LoanReturn
+
+"""
+Configure the URL patterns for the Circulation API.
+"""
+urlpatterns = [
+    # List the loans of a user, or check out a book
+    url(
+        r'^loans/$',
+        LoanList.as_view(), name='loan-list'
+    ),
+    # Return the copy of a loan
+    url(
+        r'^loans/(?P<pk>[0-9]+)/return/$',
+        LoanReturn.as_view(), name='loan-return'
+    ),
+    # List the holds of a user, or place one
+    url(
+        r'^holds/$',
+        HoldList.as_view(), name='hold-list'
+    ),
+    # Return or cancel a hold
+    url(
+        r'^holds/(?P<pk>[0-9]+)/$',
+        HoldDetail.as_view(), name='hold-detail'
+    ),
+]
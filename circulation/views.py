@@ -0,0 +1,133 @@
+import uuid
+
+from django.utils.translation import ugettext_lazy as _
+
+from rest_framework import generics, permissions, status
+from rest_framework.exceptions import (
+    APIException, PermissionDenied, ValidationError)
+from rest_framework.response import Response
+
+from users.authentication import AuthenticationFamilyMixin
+
+from .models import CirculationError, Hold, Loan
+from .pagination import HoldPagination, LoanPagination
+from .serializers import HoldSerializer, LoanSerializer
+
+
+class Conflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = _('The request conflicts with the state of the book.')
+    default_code = 'conflict'
+
+
+class LoanList(AuthenticationFamilyMixin, generics.ListCreateAPIView):
+    """
+    get:
+        Return the loans of the user, newest first. Staff see every loan,
+        or those of `borrower`. `open=1` leaves out returned loans.
+
+    post:
+        Check out a copy of `book`. Staff may lend to another `borrower`.
+    """
+    authentication_family = 'circulation'
+    serializer_class = LoanSerializer
+    pagination_class = LoanPagination
+
+    def get_queryset(self):
+        user = self.request.user
+        params = self.request.query_params
+        queryset = Loan.objects.all()
+        if not user.is_staff:
+            queryset = queryset.filter(borrower=user)
+        elif params.get('borrower'):
+            try:
+                borrower = uuid.UUID(params['borrower'])
+            except ValueError:
+                raise ValidationError(
+                    {'borrower': [_('Expected the id of a user.')]})
+            queryset = queryset.filter(borrower=borrower)
+        if params.get('open') in ('1', 'true'):
+            queryset = queryset.filter(returned=None)
+        return queryset
+
+    def perform_create(self, serializer):
+        user = self.request.user
+        borrower = serializer.validated_data.get('borrower', user)
+        if borrower != user and not user.is_staff:
+            raise PermissionDenied(_('Only staff may lend to other users.'))
+        try:
+            serializer.save(borrower=borrower)
+        except CirculationError as error:
+            raise Conflict(str(error))
+
+
+class LoanReturn(AuthenticationFamilyMixin, generics.GenericAPIView):
+    """
+    post:
+        Take back the copy of a loan.
+    """
+    authentication_family = 'circulation'
+    permission_classes = (permissions.IsAdminUser,)
+    serializer_class = LoanSerializer
+    queryset = Loan.objects.all()
+
+    def post(self, request, *args, **kwargs):
+        loan = self.get_object()
+        if not loan.return_copy():
+            raise Conflict(_('The loan is already returned.'))
+        return Response(self.get_serializer(loan).data)
+
+
+class HoldList(AuthenticationFamilyMixin, generics.ListCreateAPIView):
+    """
+    get:
+        Return the holds of the user in queue order. Staff see every hold,
+        or those on `book`.
+
+    post:
+        Wait for the next returned copy of `book`.
+    """
+    authentication_family = 'circulation'
+    serializer_class = HoldSerializer
+    pagination_class = HoldPagination
+
+    def get_queryset(self):
+        user = self.request.user
+        queryset = Hold.objects.all()
+        if not user.is_staff:
+            queryset = queryset.filter(patron=user)
+        elif self.request.query_params.get('book'):
+            try:
+                book = int(self.request.query_params['book'])
+            except ValueError:
+                raise ValidationError(
+                    {'book': [_('Expected the id of a book.')]})
+            queryset = queryset.filter(book=book)
+        return queryset
+
+    def perform_create(self, serializer):
+        try:
+            serializer.save(patron=self.request.user)
+        except CirculationError as error:
+            raise Conflict(str(error))
+
+
+class HoldDetail(AuthenticationFamilyMixin, generics.RetrieveDestroyAPIView):
+    """
+    get:
+        Return a hold.
+
+    delete:
+        Cancel a hold, passing a copy set aside for it on.
+    """
+    authentication_family = 'circulation'
+    serializer_class = HoldSerializer
+
+    def get_queryset(self):
+        if self.request.user.is_staff:
+            return Hold.objects.all()
+        return Hold.objects.filter(patron=self.request.user)
+
+    def perform_destroy(self, instance):
+        if not instance.cancel():
+            raise Conflict(_('The hold is already closed.'))
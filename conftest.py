@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+from contextlib import contextmanager
+
+import pytest
+
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from books.tags import tag_ids
+from users.authentication import basic_users, jwt_users
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """
+    Rolled-back test rows reuse primary keys, so cached data from one test
+    must not leak into the next.
+    """
+    yield
+    for cache in caches.all():
+        cache.clear()
+    jwt_users.clear()
+    basic_users.clear()
+    tag_ids.clear()
+
+
+@pytest.fixture(autouse=True)
+def detect_n_plus_one(settings):
+    """
+    Fail any request of a test that runs the same query repeatedly from
+    one place (see school_library.nplusone).
+    """
+    settings.NPLUSONE = dict(settings.NPLUSONE, ACTION='raise')
+
+
+@pytest.fixture(autouse=True)
+def disable_audit_log(settings):
+    """
+    Keep tests from writing the audit log; see users/tests/test_audit.py
+    for the tests that do.
+    """
+    settings.USERS_AUDIT = dict(settings.USERS_AUDIT, ENABLED=False)
+
+
+@pytest.fixture
+def query_budget():
+    """
+    Assert that a block runs at most a given number of queries::
+
+        def test_book_list(admin_client, query_budget):
+            with query_budget(6):
+                admin_client.get(url)
+    """
+    @contextmanager
+    def budget(limit):
+        with CaptureQueriesContext(connection) as captured:
+            yield captured
+        if len(captured) > limit:
+            pytest.fail('%d queries run, over the budget of %d:\n%s' % (
+                len(captured), limit, '\n'.join(
+                    '  %s' % query['sql'] for query in captured)))
+    return budget
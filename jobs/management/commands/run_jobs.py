@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+
+import signal
+
+from django.core.management.base import BaseCommand
+
+from jobs.worker import Worker
+
+
+class Command(BaseCommand):
+    help = ('Run queued and periodic jobs until interrupted, or only the '
+            'jobs due now with --once.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads', type=int,
+            help='Jobs run at once (default: JOBS_WORKER["THREADS"]).')
+        parser.add_argument(
+            '--poll', type=float,
+            help='Seconds between looks at an idle queue '
+                 '(default: JOBS_WORKER["POLL_SECONDS"]).')
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Run the due jobs in one thread and exit, e.g. from cron.')
+
+    def handle(self, *args, **options):
+        worker = Worker(threads=options['threads'],
+                        poll_seconds=options['poll'])
+        if options['once']:
+            ran = worker.run_once()
+            self.stdout.write(self.style.SUCCESS('Ran %d jobs.' % ran))
+            return
+
+        def stop(signum, frame):
+            self.stdout.write('Stopping once the running jobs finish.')
+            worker.stop()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        self.stdout.write('Worker %s running %d threads.' % (
+            worker.name, worker.threads))
+        worker.run()
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+"""Jobs queued in the database for `jobs.worker`.
+"""
+
+import json
+
+from django.db import models
+from django.utils import timezone
+from django.utils.translation import ugettext_lazy as _
+
+
+class Job(models.Model):
+    """
+    A run of a registered task (see `jobs.registry`) with a JSON payload.
+
+    A job is claimed by moving it from ``queued`` to ``running`` with a
+    conditional update, so each runs in one worker thread at a time. A
+    failed run is queued again, later, until `max_attempts` runs failed.
+    """
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, _('Queued')),
+        (RUNNING, _('Running')),
+        (DONE, _('Done')),
+        (FAILED, _('Failed')),
+    )
+
+    # Attributes:
+    name = models.CharField(max_length=100)
+    payload = models.TextField(default='{}')
+    status = models.CharField(
+        max_length=10, choices=STATUSES, default=QUEUED)
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    # Deduplicates jobs, e.g. one run of a periodic task per interval.
+    key = models.CharField(max_length=200, unique=True, blank=True, null=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(default=timezone.now)
+    finished = models.DateTimeField(blank=True, null=True)
+
+    # Meta and Strings:
+    class Meta:
+        ordering = ['run_at', 'id']
+        indexes = [
+            # Due jobs, in the order workers claim them.
+            models.Index(
+                fields=['status', 'run_at'], name='jobs_job_due_idx'),
+        ]
+        verbose_name = _('Job')
+        verbose_name_plural = _('Jobs')
+
+    def __str__(self):
+        return '%s (%s)' % (self.name, self.status)
+
+    @property
+    def arguments(self):
+        return json.loads(self.payload)
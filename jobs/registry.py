@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+"""Tasks that jobs run, and queueing them.
+
+Apps declare tasks in their ``tasks`` module, which is imported when the
+project starts::
+
+    from jobs.registry import task
+
+    @task(every=datetime.timedelta(hours=1))
+    def sweep_overdue(**payload):
+        ...
+
+A task takes the keyword arguments of its payload, and is named
+``<app label>.<function name>`` unless given a `name`. `every` makes a task
+periodic: workers queue one job for it per interval.
+"""
+
+import datetime
+import json
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from jobs.models import Job
+
+_tasks = {}
+
+
+class Task(object):
+
+    def __init__(self, function, name, max_attempts, every):
+        self.function = function
+        self.name = name
+        self.max_attempts = max_attempts
+        self.every = every
+
+    def __call__(self, **payload):
+        return self.function(**payload)
+
+    def __repr__(self):
+        return '<Task %s>' % self.name
+
+    def enqueue(self, run_at=None, key=None, **payload):
+        """
+        Queue a job running the task with `payload`, at `run_at` or now.
+
+        With a `key` already used by another job nothing is queued, and
+        None is returned.
+        """
+        job = Job(
+            name=self.name, payload=json.dumps(payload),
+            run_at=run_at or timezone.now(), key=key,
+            max_attempts=self.max_attempts)
+        try:
+            with transaction.atomic():
+                job.save()
+        except IntegrityError:
+            if key is None:
+                raise
+            return None
+        return job
+
+    def period_start(self, now):
+        """
+        Start of the interval of a periodic task that `now` falls in.
+        """
+        seconds = self.every.total_seconds()
+        epoch = datetime.datetime(1970, 1, 1, tzinfo=timezone.utc)
+        elapsed = (now - epoch).total_seconds()
+        return epoch + datetime.timedelta(
+            seconds=elapsed - elapsed % seconds)
+
+    def enqueue_period(self, now):
+        """
+        Queue the run of a periodic task for the interval of `now`, unless
+        it is queued already.
+        """
+        start = self.period_start(now)
+        return self.enqueue(
+            run_at=start, key='%s@%s' % (self.name, start.isoformat()))
+
+
+def task(function=None, name=None, max_attempts=3, every=None):
+    """
+    Register a function as a task; see the module documentation.
+    """
+    def register(function):
+        label = function.__module__.split('.')[0]
+        registered = Task(
+            function, name or '%s.%s' % (label, function.__name__),
+            max_attempts, every)
+        _tasks[registered.name] = registered
+        return registered
+
+    if function is not None:
+        return register(function)
+    return register
+
+
+def get_task(name):
+    """
+    Return the task registered as `name`; raise KeyError if there is none.
+    """
+    return _tasks[name]
+
+
+def periodic_tasks():
+    return [registered for registered in _tasks.values() if registered.every]
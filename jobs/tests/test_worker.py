@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+
+import datetime
+import threading
+import time
+
+import pytest
+
+from django.core.management import call_command
+from django.db import OperationalError
+from django.utils import timezone
+
+from jobs.models import Job
+from jobs.registry import get_task, task
+from jobs.worker import Worker
+
+calls = []
+
+
+@task
+def record(value):
+    calls.append(value)
+
+
+@task(max_attempts=2)
+def explode():
+    raise ValueError('boom')
+
+
+@task(name='jobs.tests.hourly', every=datetime.timedelta(hours=1))
+def hourly():
+    pass
+
+
+@pytest.fixture(autouse=True)
+def clear_calls():
+    del calls[:]
+
+
+def test_tasks_are_registered_by_app_and_name():
+    assert get_task('jobs.record') is record
+    assert get_task('circulation.sweep_overdue').every
+
+
+@pytest.mark.django_db
+def test_due_jobs_run_once():
+    record.enqueue(value=1)
+    record.enqueue(value=2)
+    record.enqueue(value=3, run_at=timezone.now() + datetime.timedelta(1))
+
+    Worker().run_once()
+
+    assert sorted(calls) == [1, 2]
+    assert Job.objects.filter(name='jobs.record', status=Job.DONE).count() == 2
+    assert Worker().run_once() == 0
+
+
+@pytest.mark.django_db
+def test_failed_jobs_are_retried_later_then_given_up(settings):
+    settings.JOBS_WORKER = dict(settings.JOBS_WORKER, RETRY_SECONDS=60)
+    job = explode.enqueue()
+    worker = Worker()
+
+    worker.run_once()
+    job.refresh_from_db()
+
+    assert job.status == Job.QUEUED
+    assert 'ValueError: boom' in job.last_error
+    assert job.run_at > timezone.now() + datetime.timedelta(seconds=50)
+
+    Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+    worker.run_once()
+    job.refresh_from_db()
+
+    assert job.status == Job.FAILED
+    assert job.attempts == 2
+
+
+@pytest.mark.django_db
+def test_jobs_are_claimed_once():
+    record.enqueue(value=1)
+    now = timezone.now()
+
+    assert len(Worker(name='a').claim(10, now)) == 1
+    assert Worker(name='b').claim(10, now) == []
+
+
+@pytest.mark.django_db
+def test_abandoned_jobs_are_requeued():
+    job = record.enqueue(value=1)
+    Worker(name='dead').claim(1, timezone.now())
+
+    later = timezone.now() + datetime.timedelta(hours=1)
+    assert Worker().requeue_abandoned(later) == 1
+    assert Job.objects.get(pk=job.pk).status == Job.QUEUED
+
+
+@pytest.mark.django_db
+def test_periodic_tasks_run_once_per_interval():
+    worker = Worker()
+    now = timezone.now()
+    worker.schedule(now)
+    Worker().schedule(now)
+
+    assert Job.objects.filter(name='jobs.tests.hourly').count() == 1
+
+    worker.schedule(now + datetime.timedelta(hours=1))
+
+    assert Job.objects.filter(name='jobs.tests.hourly').count() == 2
+
+
+def locked(*args, **kwargs):
+    raise OperationalError('database table is locked')
+
+
+@pytest.mark.django_db
+def test_job_that_cannot_be_loaded_is_requeued(monkeypatch):
+    worker = Worker()
+    job = record.enqueue(value=1)
+    pk, = worker.claim(1, timezone.now())
+
+    monkeypatch.setattr(Job.objects, 'get', locked)
+    worker._run_pooled_job(pk)
+    monkeypatch.undo()
+
+    job.refresh_from_db()
+    assert (job.status, job.attempts, job.locked_by) == (Job.QUEUED, 0, '')
+    worker.run_once()
+    assert calls == [1]
+
+
+@pytest.mark.django_db
+def test_job_whose_outcome_is_lost_is_not_run_again(monkeypatch):
+    worker = Worker()
+    job = record.enqueue(value=1)
+    pk, = worker.claim(1, timezone.now())
+
+    # The task runs, then recording it as done fails.
+    monkeypatch.setattr(Job.objects, 'filter', locked)
+    worker._run_pooled_job(pk)
+    monkeypatch.undo()
+    worker.run_once()
+
+    job.refresh_from_db()
+    assert (job.status, job.attempts) == (Job.RUNNING, 1)
+    assert calls == [1]
+
+
+def test_worker_threads_run_jobs_until_stopped(transactional_db):
+    worker = Worker(threads=2, poll_seconds=0.05)
+    for value in range(6):
+        record.enqueue(value=value)
+    thread = threading.Thread(target=worker.run)
+    thread.start()
+    try:
+        deadline = time.time() + 10
+        while len(calls) < 6 and time.time() < deadline:
+            time.sleep(0.05)
+    finally:
+        worker.stop()
+        thread.join()
+
+    assert sorted(calls) == list(range(6))
+
+
+@pytest.mark.django_db
+def test_run_jobs_once_command(capsys):
+    record.enqueue(value=1)
+
+    call_command('run_jobs', once=True)
+
+    assert 'Ran' in capsys.readouterr()[0]
+    assert calls == [1]
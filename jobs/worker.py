@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+
+"""The worker running queued jobs, started by ``manage.py run_jobs``.
+
+A worker polls the ``jobs_job`` table, so no broker is needed: several
+workers, in one or more processes, share the queue through conditional
+updates. Configured by ``settings.JOBS_WORKER``::
+
+    JOBS_WORKER = {
+        'THREADS': 4,          # jobs run at once
+        'POLL_SECONDS': 1,     # idle wait between looks at the queue
+        'RETRY_SECONDS': 30,   # first retry delay, doubled every attempt
+        'LOCK_TIMEOUT': 600,   # running jobs of a dead worker are requeued
+    }
+"""
+
+import datetime
+import logging
+import os
+import socket
+import threading
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections
+from django.db.models import F
+from django.utils import timezone
+
+from jobs.models import Job
+from jobs.registry import get_task, periodic_tasks
+from school_library import replicas
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OPTIONS = {
+    'THREADS': 4,
+    'POLL_SECONDS': 1,
+    'RETRY_SECONDS': 30,
+    'LOCK_TIMEOUT': 600,
+}
+
+
+def get_options():
+    options = dict(DEFAULT_OPTIONS)
+    options.update(getattr(settings, 'JOBS_WORKER', None) or {})
+    return options
+
+
+class Worker(object):
+    """
+    Claims due jobs and runs them on a thread pool; see the module
+    documentation.
+    """
+
+    def __init__(self, threads=None, poll_seconds=None, name=None):
+        options = get_options()
+        self.threads = threads or options['THREADS']
+        self.poll_seconds = poll_seconds or options['POLL_SECONDS']
+        self.retry_seconds = options['RETRY_SECONDS']
+        self.lock_timeout = datetime.timedelta(
+            seconds=options['LOCK_TIMEOUT'])
+        self.name = name or '%s:%d' % (socket.gethostname(), os.getpid())
+        self._scheduled = {}
+        self._stopping = threading.Event()
+
+    def schedule(self, now):
+        """
+        Queue the periodic tasks whose current interval has no job yet.
+        """
+        for periodic in periodic_tasks():
+            start = periodic.period_start(now)
+            if self._scheduled.get(periodic.name) != start:
+                periodic.enqueue_period(now)
+                self._scheduled[periodic.name] = start
+
+    def requeue_abandoned(self, now):
+        """
+        Queue again the jobs left running longer than ``LOCK_TIMEOUT``.
+        """
+        return Job.objects.filter(
+            status=Job.RUNNING, locked_at__lt=now - self.lock_timeout,
+        ).update(status=Job.QUEUED, locked_by='', locked_at=None)
+
+    def claim(self, limit, now):
+        """
+        Mark up to `limit` due jobs as running in this worker, and return
+        their ids.
+        """
+        claimed = []
+        due = Job.objects.filter(
+            status=Job.QUEUED, run_at__lte=now).values_list('pk', flat=True)
+        for pk in due[:limit * 2]:
+            # Another worker may claim the same job first.
+            if Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+                    status=Job.RUNNING, locked_by=self.name, locked_at=now,
+                    attempts=F('attempts') + 1):
+                claimed.append(pk)
+                if len(claimed) == limit:
+                    break
+        return claimed
+
+    def run_job(self, pk):
+        """
+        Run a claimed job and record the outcome.
+        """
+        replicas.reset()
+        try:
+            job = Job.objects.get(pk=pk)
+        except DatabaseError:
+            # The task has not run: the next poll may take the job again.
+            self.release(pk)
+            raise
+        try:
+            get_task(job.name)(**job.arguments)
+        except Exception:
+            self.failed(job, traceback.format_exc())
+        else:
+            Job.objects.filter(pk=pk).update(
+                status=Job.DONE, finished=timezone.now(), last_error='')
+
+    def _run_pooled_job(self, pk):
+        try:
+            self.run_job(pk)
+        except DatabaseError:
+            # E.g. a lock timeout, which nothing would see in the pool. A
+            # job whose outcome was not recorded may have run: it is left
+            # for `requeue_abandoned`, its attempt counted.
+            logger.exception('Worker %s lost job %s.', self.name, pk)
+        finally:
+            # Pool threads keep their connection between jobs, within
+            # CONN_MAX_AGE.
+            close_old_connections()
+
+    def release(self, pk):
+        """
+        Give a claimed job back to the queue, without counting the attempt.
+        """
+        try:
+            Job.objects.filter(
+                pk=pk, status=Job.RUNNING, locked_by=self.name).update(
+                status=Job.QUEUED, locked_by='', locked_at=None,
+                attempts=F('attempts') - 1)
+        except DatabaseError:
+            logger.exception('Worker %s cannot release job %s.',
+                             self.name, pk)
+
+    def failed(self, job, error):
+        logger.error('Job %s (%s) failed:\n%s', job.pk, job.name, error)
+        now = timezone.now()
+        if job.attempts < job.max_attempts:
+            delay = self.retry_seconds * 2 ** (job.attempts - 1)
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.QUEUED, locked_by='', locked_at=None,
+                run_at=now + datetime.timedelta(seconds=delay),
+                last_error=error)
+        else:
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.FAILED, finished=now, last_error=error)
+
+    def run_once(self):
+        """
+        Run every due job in this thread, e.g. from cron. Return how many
+        ran.
+        """
+        ran = 0
+        while True:
+            claimed = self.poll(self.threads)
+            if not claimed:
+                return ran
+            for pk in claimed:
+                self.run_job(pk)
+            ran += len(claimed)
+
+    def run(self):
+        """
+        Run jobs as they come due, until `stop` is called.
+        """
+        running = set()
+        with ThreadPoolExecutor(max_workers=self.threads) as pool:
+            while not self._stopping.is_set():
+                free = self.threads - len(running)
+                try:
+                    claimed = self.poll(free)
+                except DatabaseError:
+                    # E.g. a lock timeout or a restarting database: the
+                    # next poll tries again.
+                    logger.exception('Worker %s cannot read the queue.',
+                                     self.name)
+                    claimed = []
+                running.update(
+                    pool.submit(self._run_pooled_job, pk) for pk in claimed)
+                if running and (claimed or not free):
+                    # Take more work as soon as a thread frees up.
+                    running = wait(
+                        running, timeout=self.poll_seconds,
+                        return_when=FIRST_COMPLETED).not_done
+                else:
+                    running = wait(running, timeout=0).not_done
+                    self._stopping.wait(self.poll_seconds)
+                close_old_connections()
+
+    def poll(self, limit):
+        """
+        Queue due periodic tasks, requeue abandoned jobs, and claim up to
+        `limit` due jobs.
+        """
+        now = timezone.now()
+        self.schedule(now)
+        self.requeue_abandoned(now)
+        return self.claim(limit, now) if limit else []
+
+    def stop(self):
+        """
+        Make `run` return once the running jobs finish.
+        """
+        self._stopping.set()
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+"""PostgreSQL backend drawing connections from an in-process pool.
+
+Closing a connection, e.g. at the end of a request with ``CONN_MAX_AGE``
+0, hands it back to the pool instead of disconnecting, so requests skip
+the connection handshake. The pool of each database is shared by the
+threads of the process and holds at most ``POOL_SIZE`` connections; once
+they are all in use, opening another fails with a database error rather
+than waiting, so size the pool to the number of worker threads.
+"""
+
+import threading
+
+from django.db.backends.postgresql import base
+from psycopg2 import pool as psycopg2_pool
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(conn_params, size):
+    """
+    Return the process-wide pool of connections made with `conn_params`.
+    """
+    key = tuple(sorted((name, str(value))
+                       for name, value in conn_params.items()))
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = _pools[key] = psycopg2_pool.ThreadedConnectionPool(
+                    1, size, **conn_params)
+    return pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    @property
+    def pool(self):
+        return get_pool(
+            self.get_connection_params(),
+            self.settings_dict.get('POOL_SIZE') or 10)
+
+    def get_new_connection(self, conn_params):
+        connection = self.pool.getconn()
+
+        # As in the stock backend: the isolation level must be known before
+        # autocommit is set.
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                # The pool rolls back a connection left in a transaction
+                # and discards a broken one.
+                self.pool.putconn(
+                    self.connection, close=bool(self.connection.closed))
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+
+"""SQLite backend applying ``PRAGMA`` settings to every new connection.
+
+Configured with a ``PRAGMAS`` mapping next to the usual database settings,
+e.g. ``{'journal_mode': 'WAL', 'synchronous': 'NORMAL'}``; see
+`school_library.database`.
+"""
+
+import re
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+_pragma_re = re.compile(r'^\w+$')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        pragmas = self.settings_dict.get('PRAGMAS') or {}
+        for name, value in pragmas.items():
+            if not (_pragma_re.match(name) and _pragma_re.match(str(value))):
+                raise ImproperlyConfigured(
+                    'Invalid SQLite pragma %s = %r.' % (name, value))
+            connection.execute('PRAGMA %s = %s' % (name, value))
+        return connection
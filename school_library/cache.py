@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+"""Local-memory cache backend with least-recently-used eviction.
+
+Django's `LocMemCache` culls an arbitrary share of its entries once
+``MAX_ENTRIES`` is reached. `LRULocMemCache` evicts only the entries that
+were read or written least recently, so hot entries survive a full cache.
+Entries still expire after ``TIMEOUT`` seconds.
+"""
+
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.locmem import LocMemCache, dummy
+
+try:
+    from django.utils.six.moves import cPickle as pickle
+except ImportError:
+    import pickle
+
+
+# Global in-memory stores, keyed by cache LOCATION.
+_caches = {}
+_expire_info = {}
+_locks = {}
+
+
+class _Lock(object):
+    """
+    A plain mutex offering `RWLock`'s interface: LRU reads reorder the
+    store, so readers need exclusive access too.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def reader(self):
+        with self._lock:
+            yield
+
+    writer = reader
+
+
+class LRULocMemCache(LocMemCache):
+
+    def __init__(self, name, params):
+        BaseCache.__init__(self, params)
+        self._cache = _caches.setdefault(name, OrderedDict())
+        self._expire_info = _expire_info.setdefault(name, {})
+        self._lock = _locks.setdefault(name, _Lock())
+
+    def get(self, key, default=None, version=None, acquire_lock=True):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        with (self._lock.reader() if acquire_lock else dummy()):
+            if self._has_expired(key):
+                self._delete(key)
+                return default
+            pickled = self._cache[key]
+            self._cache.move_to_end(key)
+        try:
+            return pickle.loads(pickled)
+        except pickle.PickleError:
+            return default
+
+    def _set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        if key in self._cache:
+            self._cache.move_to_end(key)
+        else:
+            self._cull()
+        self._cache[key] = value
+        self._expire_info[key] = self.get_backend_timeout(timeout)
+
+    def _cull(self):
+        # Expired entries go lazily on access; make room by dropping the
+        # least recently used ones.
+        while len(self._cache) >= self._max_entries:
+            self._delete(next(iter(self._cache)))
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+
+"""Model fields shared by the apps.
+"""
+
+from autoslug import AutoSlugField
+from django.db.models.signals import post_init
+
+
+class StableAutoSlugField(AutoSlugField):
+    """
+    An `AutoSlugField` that can keep the slug of an unchanged instance.
+
+    A plain ``AutoSlugField(unique=True)`` slugifies and runs a uniqueness
+    query on every save. With ``skip_unchanged=True``, saving an instance
+    whose `populate_from` attribute is the same as when it was loaded or
+    last saved keeps its slug without a query, so saving many otherwise
+    edited rows costs no query per row for the slug.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.skip_unchanged = kwargs.pop('skip_unchanged', False)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.skip_unchanged:
+            kwargs['skip_unchanged'] = True
+        return name, path, args, kwargs
+
+    def contribute_to_class(self, cls, name, **kwargs):
+        super().contribute_to_class(cls, name, **kwargs)
+        if self.skip_unchanged and isinstance(self.populate_from, str) \
+                and not cls._meta.abstract:
+            post_init.connect(self._remember_source, sender=cls)
+
+    def _source(self, instance):
+        # None when deferred: the slug is then always recomputed.
+        return instance.__dict__.get(self.populate_from)
+
+    def _remember_source(self, instance, **kwargs):
+        instance.__dict__.setdefault('_slug_sources', {})[self.name] = \
+            self._source(instance)
+
+    def pre_save(self, instance, add):
+        if self.skip_unchanged and not add:
+            slug = self.value_from_object(instance)
+            source = self._source(instance)
+            remembered = instance.__dict__.get('_slug_sources', {})
+            if slug and source is not None and \
+                    remembered.get(self.name) == source:
+                return slug
+        slug = super().pre_save(instance, add)
+        if self.skip_unchanged:
+            self._remember_source(instance)
+        return slug
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+
+"""In-process request metrics in the Prometheus text format.
+
+`MetricsMiddleware` observes the latency and the number of SQL queries of
+every request into fixed-bucket histograms, one per URL name, at a
+constant cost per request. `metrics_view` renders them for Prometheus.
+
+Queries are counted with a `school_library.queries` observer, per
+thread, so concurrent requests do not mix. Metrics are per process, so
+scrape every worker (or run a single one per scrape target).
+"""
+
+import threading
+import time
+from bisect import bisect_left
+
+from django.http import HttpResponse
+
+from school_library import queries
+
+# Upper bounds of the histogram buckets; an implicit +Inf bucket follows.
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144)
+
+UNMATCHED_VIEW = '<unmatched>'
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Histogram(object):
+    """
+    Per-bucket counts plus the sum and count of the observed values;
+    `Registry.render` makes the bucket counts cumulative.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry(object):
+    """
+    Latency and query-count histograms keyed by URL name.
+    """
+
+    def __init__(self):
+        self._views = {}
+        self._lock = threading.Lock()
+
+    def observe(self, view, seconds, queries):
+        with self._lock:
+            histograms = self._views.get(view)
+            if histograms is None:
+                histograms = self._views[view] = (
+                    Histogram(LATENCY_BUCKETS), Histogram(QUERY_BUCKETS))
+            histograms[0].observe(seconds)
+            histograms[1].observe(queries)
+
+    def clear(self):
+        with self._lock:
+            self._views.clear()
+
+    def totals(self, view):
+        """
+        Return ``(requests, queries)`` observed so far for `view`.
+        """
+        with self._lock:
+            histograms = self._views.get(view)
+            if histograms is None:
+                return (0, 0)
+            return (histograms[1].count, histograms[1].sum)
+
+    def render(self):
+        """
+        Return the histograms in the Prometheus text exposition format.
+        """
+        with self._lock:
+            snapshot = sorted(
+                (view, [(h.buckets, list(h.counts), h.sum, h.count)
+                        for h in histograms])
+                for view, histograms in self._views.items())
+
+        lines = []
+        families = (
+            ('school_library_request_duration_seconds',
+             'Time spent serving requests, by URL name.'),
+            ('school_library_request_queries',
+             'SQL queries run per request, by URL name.'),
+        )
+        for index, (name, help_text) in enumerate(families):
+            lines.append('# HELP %s %s' % (name, help_text))
+            lines.append('# TYPE %s histogram' % name)
+            for view, histograms in snapshot:
+                buckets, counts, total, count = histograms[index]
+                label = 'view="%s"' % _escape(view)
+                cumulative = 0
+                for bound, bucket_count in zip(
+                        buckets + ('+Inf',), counts):
+                    cumulative += bucket_count
+                    lines.append('%s_bucket{%s,le="%s"} %d' % (
+                        name, label, bound, cumulative))
+                lines.append('%s_sum{%s} %s' % (name, label, repr(total)))
+                lines.append('%s_count{%s} %d' % (name, label, count))
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace(
+        '\n', '\\n')
+
+
+registry = Registry()
+
+
+class MetricsMiddleware(object):
+    """
+    Records the latency and query count of every request in `registry`.
+
+    Install it first in ``MIDDLEWARE`` so the other middleware's time and
+    queries (sessions, authentication) are included.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        queries.install()
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        with queries.observe(queries.QueryCounter()) as counter:
+            response = self.get_response(request)
+        seconds = time.perf_counter() - start
+
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else UNMATCHED_VIEW
+        registry.observe(view, seconds, counter.count)
+        return response
+
+
+def metrics_view(request):
+    """
+    Expose `registry` for Prometheus to scrape.
+    """
+    return HttpResponse(registry.render(), content_type=CONTENT_TYPE)
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+
+"""Detection of N+1 query patterns, for development and tests.
+
+A lazily loaded relation inside a loop, e.g. ``book.publisher`` or
+``book.authors.all()`` for every book of a page, runs the same SQL once
+per row, from the same line of code. `QueryTracker` fingerprints every
+query (its SQL with literals and ``IN`` lists collapsed) together with the
+innermost project frame that ran it, and reports a pair once it repeats
+``THRESHOLD`` times.
+
+`NPlusOneMiddleware` tracks every request, configured by
+``settings.NPLUSONE``::
+
+    NPLUSONE = {
+        'ACTION': 'raise',   # 'raise', 'log' or 'off'
+        'THRESHOLD': 3,      # repetitions that count as N+1
+    }
+
+``'raise'`` fails the request with `NPlusOneError`, which the test client
+re-raises in the test; ``'log'`` warns on the ``school_library.nplusone``
+logger with the call site. With ``'off'`` the middleware unloads itself.
+"""
+
+import logging
+import os
+import re
+import sys
+from collections import Counter
+from contextlib import contextmanager
+
+import django
+import rest_framework
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from school_library import queries
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OPTIONS = {
+    'ACTION': 'off',
+    'THRESHOLD': 3,
+}
+
+_literal_re = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+_in_list_re = re.compile(r'\bIN \((?:[^()]*)\)', re.IGNORECASE)
+_space_re = re.compile(r'\s+')
+
+# Frames in these directories are never reported as the call site.
+_LIBRARY_DIRS = tuple(os.path.dirname(path) + os.sep for path in (
+    django.__file__, rest_framework.__file__, os.__file__))
+_THIS_FILES = tuple(
+    os.path.splitext(path)[0] for path in (__file__, queries.__file__))
+
+
+class NPlusOneError(Exception):
+    """
+    The same query was run repeatedly from the same place.
+    """
+
+
+def get_options():
+    options = dict(DEFAULT_OPTIONS)
+    options.update(getattr(settings, 'NPLUSONE', None) or {})
+    return options
+
+
+def fingerprint(sql):
+    """
+    Return `sql` with literals and ``IN`` lists collapsed, so queries
+    differing only in their values compare equal.
+    """
+    sql = _in_list_re.sub('IN (...)', sql)
+    sql = _literal_re.sub('?', sql)
+    return _space_re.sub(' ', sql).strip()
+
+
+def call_site():
+    """
+    Describe the innermost frame outside Django, the REST framework, the
+    standard library and installed packages.
+    """
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if not (filename.startswith(_LIBRARY_DIRS) or
+                'site-packages' in filename or
+                os.path.splitext(filename)[0] in _THIS_FILES):
+            return '%s:%d in %s' % (
+                os.path.relpath(filename, settings.BASE_DIR),
+                frame.f_lineno, frame.f_code.co_name)
+        frame = frame.f_back
+    return '<unknown>'
+
+
+class QueryTracker(object):
+    """
+    A `school_library.queries` observer counting queries by fingerprint
+    and call site.
+    """
+
+    def __init__(self, threshold=3, action='raise'):
+        self.threshold = threshold
+        self.action = action
+        self.counts = Counter()
+
+    def __call__(self, sql):
+        key = (fingerprint(sql), call_site())
+        self.counts[key] += 1
+        if self.counts[key] == self.threshold:
+            self.report(*key)
+
+    def report(self, sql, site):
+        message = 'Query run %d times from %s: %s' % (
+            self.threshold, site, sql)
+        if self.action == 'raise':
+            raise NPlusOneError(message)
+        logger.warning(message)
+
+
+@contextmanager
+def detect(threshold=None, action='raise'):
+    """
+    Track the queries run in the block, e.g. to check code run outside a
+    request::
+
+        with detect():
+            BookDetailSerializer(books, many=True).data
+    """
+    if threshold is None:
+        threshold = get_options()['THRESHOLD']
+    with queries.observe(QueryTracker(threshold, action)) as tracker:
+        yield tracker
+
+
+class NPlusOneMiddleware(object):
+    """
+    Tracks the queries of every request; see the module documentation.
+    """
+
+    def __init__(self, get_response):
+        options = get_options()
+        if options['ACTION'] not in ('raise', 'log'):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold = options['THRESHOLD']
+        self.action = options['ACTION']
+
+    def __call__(self, request):
+        with detect(self.threshold, self.action):
+            return self.get_response(request)
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+
+"""Keyset (seek) pagination shared by the API apps.
+"""
+
+from base64 import b64decode, b64encode
+from collections import namedtuple
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils import six
+from django.utils.six.moves.urllib import parse as urlparse
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+Cursor = namedtuple('Cursor', ['reverse', 'position'])
+
+
+def _reverse_ordering(ordering):
+    return tuple(
+        field[1:] if field.startswith('-') else '-' + field
+        for field in ordering)
+
+
+def _position_value(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return six.text_type(value)
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination keyed on the full ordering tuple.
+
+    DRF's `CursorPagination` only seeks on the first ordering field and
+    falls back to an OFFSET for rows sharing that value. Here the cursor
+    carries every ordering value of the last row seen, so each page is a
+    single index range scan on the ordering columns, whatever its depth.
+
+    The ordering must be unique and non-null (end it with the primary key)
+    and should be backed by a composite index.
+    """
+
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+
+        reverse = self.cursor is not None and self.cursor.reverse
+        position = self.cursor.position if self.cursor else None
+
+        ordering = _reverse_ordering(self.ordering) if reverse \
+            else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(
+                self.get_keyset_filter(queryset.model, ordering, position))
+
+        # Fetch one extra row to find out if there is a following page.
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_following = len(results) > self.page_size
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_following
+        else:
+            self.has_next = has_following
+            self.has_previous = position is not None
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                page_size = int(
+                    request.query_params[self.page_size_query_param])
+                if page_size > 0:
+                    return min(page_size, self.max_page_size)
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def get_keyset_filter(self, model, ordering, position):
+        """
+        Build the predicate selecting rows strictly after `position`.
+
+        For an ordering ``(a, b)`` this is
+        ``a >= pa AND (a > pa OR (a = pa AND b > pb))``; the leading bound
+        lets the database turn the lookup into an index range scan.
+        """
+        if len(position) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        values = []
+        for field_name, raw in zip(ordering, position):
+            name = field_name.lstrip('-')
+            field = model._meta.pk if name == 'pk' \
+                else model._meta.get_field(name)
+            try:
+                values.append((name, field_name.startswith('-'),
+                               field.to_python(raw)))
+            except ValidationError:
+                raise NotFound(self.invalid_cursor_message)
+
+        after = Q()
+        for index, (name, descending, value) in enumerate(values):
+            lookup = '__lt' if descending else '__gt'
+            step = Q(**{name + lookup: value})
+            for prev_name, _, prev_value in values[:index]:
+                step &= Q(**{prev_name: prev_value})
+            after |= step
+
+        name, descending, value = values[0]
+        bound = Q(**{name + ('__lte' if descending else '__gte'): value})
+        return bound & after
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if not self.page:
+            # Paged backwards past the first row: start over.
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(Cursor(
+            reverse=False,
+            position=self._get_position_from_instance(
+                self.page[-1], self.ordering)))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(Cursor(
+            reverse=True,
+            position=self._get_position_from_instance(
+                self.page[0], self.ordering)))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            querystring = b64decode(encoded.encode('ascii')).decode('ascii')
+            tokens = urlparse.parse_qs(querystring, keep_blank_values=True)
+            reverse = bool(int(tokens.get('r', ['0'])[0]))
+            position = tokens.get('p')
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if position is None:
+            raise NotFound(self.invalid_cursor_message)
+        return Cursor(reverse=reverse, position=position)
+
+    def encode_cursor(self, cursor):
+        tokens = {'p': cursor.position}
+        if cursor.reverse:
+            tokens['r'] = '1'
+
+        querystring = urlparse.urlencode(tokens, doseq=True)
+        encoded = b64encode(querystring.encode('ascii')).decode('ascii')
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, encoded)
+
+    def _get_position_from_instance(self, instance, ordering):
+        position = []
+        for field_name in ordering:
+            name = field_name.lstrip('-')
+            if isinstance(instance, dict):
+                value = instance[name]
+            else:
+                value = getattr(instance, name)
+            position.append(_position_value(value))
+        return position
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+
+"""Sampling request profiler for production use.
+
+`SamplingProfilerMiddleware` times every request and runs cProfile on one
+request in ``SAMPLE_RATE``. A request is recorded when it was profiled or
+took at least ``SLOW_MS`` milliseconds; any other request only costs two
+clock reads. Records go to an in-memory ring buffer, or to a SQLite file
+of their own so profiling never writes to the application database.
+
+Enabled with ``SCHOOL_LIBRARY_PROFILER=sampling`` (see settings) and
+configured by ``settings.PROFILING``::
+
+    PROFILING = {
+        'SAMPLE_RATE': 100,     # profile 1 request in N; 0 profiles none
+        'SLOW_MS': 500,         # also record requests at least this slow
+        'DATABASE': None,       # SQLite file; None keeps records in memory
+        'BUFFER_SIZE': 1000,    # records kept in memory
+        'TOP_FUNCTIONS': 25,    # profile lines kept per record
+    }
+
+Admin users can read the latest records from the `RecentProfiles` view.
+"""
+
+import cProfile
+import io
+import itertools
+import json
+import pstats
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+DEFAULT_OPTIONS = {
+    'SAMPLE_RATE': 100,
+    'SLOW_MS': 500,
+    'DATABASE': None,
+    'BUFFER_SIZE': 1000,
+    'TOP_FUNCTIONS': 25,
+}
+
+
+def get_options():
+    options = dict(DEFAULT_OPTIONS)
+    options.update(getattr(settings, 'PROFILING', None) or {})
+    return options
+
+
+class MemoryStore(object):
+    """
+    Keeps the latest `size` records in a ring buffer.
+    """
+
+    def __init__(self, size):
+        self._records = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, record):
+        with self._lock:
+            self._records.append(record)
+
+    def recent(self, limit):
+        with self._lock:
+            records = list(self._records)
+        return records[::-1][:limit]
+
+
+class SQLiteStore(object):
+    """
+    Appends records to a SQLite file, with one connection per thread.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    @property
+    def connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, isolation_level=None)
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS request_profile ('
+                'id INTEGER PRIMARY KEY, record TEXT NOT NULL)')
+            self._local.connection = connection
+        return connection
+
+    def add(self, record):
+        self.connection.execute(
+            'INSERT INTO request_profile (record) VALUES (?)',
+            (json.dumps(record),))
+
+    def recent(self, limit):
+        rows = self.connection.execute(
+            'SELECT record FROM request_profile ORDER BY id DESC LIMIT ?',
+            (limit,))
+        return [json.loads(record) for record, in rows]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """
+    Return the process-wide record store.
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                options = get_options()
+                if options['DATABASE']:
+                    _store = SQLiteStore(options['DATABASE'])
+                else:
+                    _store = MemoryStore(options['BUFFER_SIZE'])
+    return _store
+
+
+def reset():
+    """
+    Forget the store, e.g. after the options changed.
+    """
+    global _store
+    with _store_lock:
+        _store = None
+
+
+def _profile_text(profiler, top):
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.sort_stats('cumulative').print_stats(top)
+    return stream.getvalue()
+
+
+class SamplingProfilerMiddleware(object):
+    """
+    Profiles a sample of requests and records slow ones.
+
+    Install it first in ``MIDDLEWARE`` so the timings cover the other
+    middleware too.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        options = get_options()
+        self.sample_rate = options['SAMPLE_RATE']
+        self.slow_ms = options['SLOW_MS']
+        self.top_functions = options['TOP_FUNCTIONS']
+        self._requests = itertools.count(1)
+
+    def __call__(self, request):
+        profiler = None
+        if self.sample_rate and next(self._requests) % self.sample_rate == 0:
+            profiler = cProfile.Profile()
+
+        started = time.time()
+        start = time.perf_counter()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+        duration_ms = (time.perf_counter() - start) * 1000
+
+        if profiler is not None or duration_ms >= self.slow_ms:
+            match = getattr(request, 'resolver_match', None)
+            get_store().add({
+                'time': started,
+                'method': request.method,
+                'path': request.path,
+                'view': match.view_name if match else None,
+                'status': response.status_code,
+                'duration_ms': round(duration_ms, 3),
+                'profile': _profile_text(profiler, self.top_functions)
+                if profiler is not None else None,
+            })
+        return response
+
+
+class RecentProfiles(APIView):
+    """
+    get:
+        Return the latest recorded requests, newest first. `limit` caps
+        the number of records (default 50).
+    """
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request, format=None):
+        try:
+            limit = int(request.query_params.get('limit', 50))
+        except ValueError:
+            limit = 50
+        return Response({
+            'results': get_store().recent(max(1, min(limit, 1000)))})
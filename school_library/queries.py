@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+
+"""Per-thread observation of the SQL queries Django runs.
+
+Django 1.11 has no hook around query execution, so `install` wraps
+`CursorWrapper.execute` and `executemany` once per process. Callbacks
+registered with `observe` are then called with the SQL of every query run
+by the registering thread, until the block exits.
+"""
+
+import functools
+import threading
+from contextlib import contextmanager
+
+from django.db.backends.utils import CursorWrapper
+
+_local = threading.local()
+
+
+def _observed(method):
+    @functools.wraps(method)
+    def wrapper(self, sql, *args, **kwargs):
+        observers = getattr(_local, 'observers', None)
+        if observers:
+            for observer in observers:
+                observer(sql)
+        return method(self, sql, *args, **kwargs)
+    wrapper.observed = True
+    return wrapper
+
+
+def install():
+    """
+    Wrap `CursorWrapper` so queries reach the observers. Safe to call more
+    than once.
+    """
+    for name in ('execute', 'executemany'):
+        method = getattr(CursorWrapper, name)
+        if not getattr(method, 'observed', False):
+            setattr(CursorWrapper, name, _observed(method))
+
+
+@contextmanager
+def observe(callback):
+    """
+    Call ``callback(sql)`` for every query this thread runs in the block.
+    """
+    install()
+    observers = getattr(_local, 'observers', None)
+    if observers is None:
+        observers = _local.observers = []
+    observers.append(callback)
+    try:
+        yield callback
+    finally:
+        observers.remove(callback)
+
+
+class QueryCounter(object):
+    """
+    An observer counting queries.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, sql):
+        self.count += 1
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+
+"""Routing of catalog reads to read replicas.
+
+`ReplicaRouter` sends reads of the models of ``APPS`` to one of the
+replica aliases and everything else, writes and authentication included,
+to the primary. The replica is picked at random once per thread until
+`reset` (by `ReplicaPinningMiddleware`, once per request), so the reads
+of a request all see the same replication lag: an ETag and the page it
+describes, or successive pages, come from the same copy. Configured by
+``settings.REPLICAS``::
+
+    REPLICAS = {
+        'ALIASES': ['replica1'],   # read replicas, none by default
+        'APPS': ['books'],         # apps whose reads they serve
+        'PIN_SECONDS': 5,          # primary reads after a write
+        'COOKIE': 'primary_reads',
+    }
+
+A replica lags behind the primary, so a client reading right after its own
+write could miss it. Once the current thread writes, the rest of its reads
+go to the primary; `ReplicaPinningMiddleware` then sets ``COOKIE`` on the
+response, and requests carrying it read from the primary for
+``PIN_SECONDS``. Reads inside a transaction on the primary stay there too.
+
+To try it locally, copy the migrated ``db.sqlite3`` to ``replica.sqlite3``
+and set ``SCHOOL_LIBRARY_DATABASE_REPLICA_URLS`` to
+``sqlite:///replica.sqlite3`` (see `school_library.database`): catalog
+pages then come from the copy, until a write pins the client.
+"""
+
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+
+DEFAULT_OPTIONS = {
+    'ALIASES': [],
+    'APPS': ['books'],
+    'PIN_SECONDS': 5,
+    'COOKIE': 'primary_reads',
+}
+
+_local = threading.local()
+
+
+def get_options():
+    options = dict(DEFAULT_OPTIONS)
+    options.update(getattr(settings, 'REPLICAS', None) or {})
+    return options
+
+
+def is_pinned():
+    return getattr(_local, 'pinned', False)
+
+
+def reset():
+    """
+    Forget the writes and the replica of the current thread, e.g. between
+    the units of work of a long running process.
+    """
+    _local.pinned = _local.wrote = False
+    _local.replica = None
+
+
+def _replica(aliases):
+    replica = getattr(_local, 'replica', None)
+    if replica not in aliases:
+        replica = _local.replica = random.choice(aliases)
+    return replica
+
+
+@contextmanager
+def use_primary():
+    """
+    Read everything from the primary in the block.
+    """
+    pinned = is_pinned()
+    _local.pinned = True
+    try:
+        yield
+    finally:
+        _local.pinned = pinned
+
+
+class ReplicaRouter(object):
+    """
+    A database router; see the module documentation.
+    """
+
+    def db_for_read(self, model, **hints):
+        options = get_options()
+        if (not options['ALIASES'] or is_pinned() or
+                model._meta.app_label not in options['APPS'] or
+                connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+        return _replica(options['ALIASES'])
+
+    def db_for_write(self, model, **hints):
+        _local.pinned = _local.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS}
+        databases.update(get_options()['ALIASES'])
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+class ReplicaPinningMiddleware(object):
+    """
+    Reads the primary for requests carrying the pinning cookie, and sets
+    it on responses to requests that wrote.
+    """
+
+    def __init__(self, get_response):
+        options = get_options()
+        if not options['ALIASES']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.cookie = options['COOKIE']
+        self.pin_seconds = options['PIN_SECONDS']
+
+    def __call__(self, request):
+        reset()
+        _local.pinned = self.cookie in request.COOKIES
+        try:
+            response = self.get_response(request)
+            if _local.wrote:
+                response.set_cookie(
+                    self.cookie, '1', max_age=self.pin_seconds,
+                    httponly=True)
+        finally:
+            reset()
+        return response
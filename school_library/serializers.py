@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+"""Serializer helpers shared by the project's APIs.
+"""
+
+from django.core.exceptions import FieldDoesNotExist
+
+from rest_framework import serializers
+
+
+class SparseFieldsMixin(object):
+    """
+    Lets clients pick the fields of a model serializer's output with a
+    comma separated ``?fields=`` query parameter, or the view pass them
+    with the `fields` keyword argument.
+
+    `narrow_queryset` then trims the query to what the chosen fields read:
+    deferred columns are left out with `only()` and unused foreign keys are
+    not joined.
+    """
+    fields_query_param = 'fields'
+
+    def __init__(self, *args, **kwargs):
+        requested = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+
+        if requested is None:
+            requested = self.get_requested_fields(self.context.get('request'))
+        self.sparse = requested is not None
+        if not self.sparse:
+            return
+
+        unknown = set(requested) - set(self.fields)
+        if unknown:
+            message = 'Unknown field(s): %s.' % ', '.join(sorted(unknown))
+            raise serializers.ValidationError(
+                {self.fields_query_param: [message]})
+        for name in set(self.fields) - set(requested):
+            self.fields.pop(name)
+
+    @classmethod
+    def get_requested_fields(cls, request):
+        """
+        Return the field names asked for by `request`, or None for all.
+        """
+        if request is None:
+            return None
+        value = request.query_params.get(cls.fields_query_param)
+        if value is None:
+            return None
+        return [name for name in (n.strip() for n in value.split(','))
+                if name]
+
+    def narrow_queryset(self, queryset, extra=()):
+        """
+        Limit `queryset` to the columns and joins the selected fields need.
+
+        `extra` names further columns to load, e.g. the ordering used by
+        pagination. Many-to-many fields are skipped; they are prefetched
+        separately. The queryset is returned untouched when a field does
+        not map onto a model field (a property, a method, ``source='*'``).
+        """
+        if not self.sparse:
+            return queryset
+
+        opts = queryset.model._meta
+        columns, joins = {opts.pk.name}, []
+        for field in self.fields.values():
+            name = field.source.split('.')[0]
+            try:
+                model_field = opts.get_field(name)
+            except FieldDoesNotExist:
+                return queryset
+            if model_field.many_to_many or model_field.one_to_many:
+                continue
+            if model_field.many_to_one or model_field.one_to_one:
+                joins.append(name)
+            columns.add(name)
+
+        columns.update(name.lstrip('-') for name in extra)
+        # Re-add only the joins still needed; `only()` refuses to defer a
+        # relation that is followed by `select_related()`.
+        queryset = queryset.select_related(None)
+        if joins:
+            queryset = queryset.select_related(*joins)
+        return queryset.only(*columns)
@@ -12,6 +12,10 @@ https://docs.djangoproject.com/en/1.11/ref/settings/
 
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
+from school_library.database import database_from_env, replicas_from_env
+
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -44,12 +48,13 @@ THIRD_PARTY_APPS = [
     'rest_framework',
     'rest_framework_jwt',
     'rest_framework_swagger',
-    'silk',
 ]
 
 LOCAL_APPS = [
     'users',
     'books',
+    'circulation',
+    'jobs',
 ]
 
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
@@ -64,9 +69,68 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'silk.middleware.SilkyMiddleware',
 ]
 
+
+# Metrics
+
+# Per-URL-name latency and query-count histograms, scraped by Prometheus
+# at /metrics (see school_library.metrics). /metrics is not authenticated:
+# enable with SCHOOL_LIBRARY_METRICS=on only where it is kept off the
+# public network.
+METRICS_ENABLED = os.environ.get('SCHOOL_LIBRARY_METRICS', 'off') == 'on'
+
+if METRICS_ENABLED:
+    MIDDLEWARE.insert(0, 'school_library.metrics.MetricsMiddleware')
+
+
+# N+1 query detection
+
+# Reports a query repeated from the same line within one request, the
+# mark of a lazily loaded relation in a loop (see school_library.nplusone).
+# SCHOOL_LIBRARY_NPLUSONE=log warns with the call site, =raise fails the
+# request; the tests always raise.
+NPLUSONE = {
+    'ACTION': os.environ.get('SCHOOL_LIBRARY_NPLUSONE', 'off'),
+    'THRESHOLD': 3,
+}
+
+MIDDLEWARE.append('school_library.nplusone.NPlusOneMiddleware')
+
+
+# Profiling
+
+# SCHOOL_LIBRARY_PROFILER selects the request profiler of an environment:
+#   off       no profiling (default);
+#   sampling  school_library.profiling: cProfile 1 request in
+#             SCHOOL_LIBRARY_PROFILER_SAMPLE_RATE, plus timings of requests
+#             slower than SCHOOL_LIBRARY_PROFILER_SLOW_MS, kept in memory or
+#             in the SQLite file SCHOOL_LIBRARY_PROFILER_DATABASE;
+#   silk      django-silk on the same sample of requests. Silk records
+#             every query into the application database: development only.
+PROFILER_MODE = os.environ.get('SCHOOL_LIBRARY_PROFILER', 'off')
+
+PROFILING = {
+    'SAMPLE_RATE': int(
+        os.environ.get('SCHOOL_LIBRARY_PROFILER_SAMPLE_RATE', 100)),
+    'SLOW_MS': int(os.environ.get('SCHOOL_LIBRARY_PROFILER_SLOW_MS', 500)),
+    'DATABASE': os.environ.get('SCHOOL_LIBRARY_PROFILER_DATABASE') or None,
+}
+
+if PROFILER_MODE == 'sampling':
+    MIDDLEWARE.insert(
+        0, 'school_library.profiling.SamplingProfilerMiddleware')
+elif PROFILER_MODE == 'silk':
+    INSTALLED_APPS.append('silk')
+    MIDDLEWARE.append('silk.middleware.SilkyMiddleware')
+    SILKY_PYTHON_PROFILER = True
+    SILKY_INTERCEPT_PERCENT = (
+        100.0 / PROFILING['SAMPLE_RATE'] if PROFILING['SAMPLE_RATE'] else 0)
+elif PROFILER_MODE != 'off':
+    raise ImproperlyConfigured(
+        'SCHOOL_LIBRARY_PROFILER must be off, sampling or silk, not %r.'
+        % PROFILER_MODE)
+
 ROOT_URLCONF = 'school_library.urls'
 
 TEMPLATES = [
@@ -91,11 +155,57 @@ WSGI_APPLICATION = 'school_library.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/1.11/ref/settings/#databases
 
+# Selected with SCHOOL_LIBRARY_DATABASE_URL and friends; see
+# school_library.database. Defaults to a tuned SQLite file in BASE_DIR.
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+    'default': database_from_env(os.environ, BASE_DIR),
+}
+DATABASES.update(replicas_from_env(os.environ, BASE_DIR))
+
+# Catalog reads go to the replicas of SCHOOL_LIBRARY_DATABASE_REPLICA_URLS,
+# if any; clients read the primary for PIN_SECONDS after a write. See
+# school_library.replicas.
+DATABASE_ROUTERS = ['school_library.replicas.ReplicaRouter']
+
+REPLICAS = {
+    'ALIASES': [alias for alias in DATABASES if alias != 'default'],
+    'APPS': ['books'],
+    'PIN_SECONDS': int(
+        os.environ.get('SCHOOL_LIBRARY_REPLICA_PIN_SECONDS', 5)),
+    'COOKIE': 'primary_reads',
+}
+
+MIDDLEWARE.append('school_library.replicas.ReplicaPinningMiddleware')
+
+
+# Cache
+# https://docs.djangoproject.com/en/1.11/topics/cache/
+
+# The serialized book payload cache (see books.cache) lives in process
+# memory with LRU eviction by default. Set SCHOOL_LIBRARY_BOOKS_CACHE=file
+# to share it between the worker processes of a single node instead.
+BOOKS_CACHE_ALIAS = 'books'
+
+if os.environ.get('SCHOOL_LIBRARY_BOOKS_CACHE') == 'file':
+    BOOKS_CACHE = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get(
+            'SCHOOL_LIBRARY_BOOKS_CACHE_DIR',
+            os.path.join(BASE_DIR, '.cache', 'books')),
+    }
+else:
+    BOOKS_CACHE = {
+        'BACKEND': 'school_library.cache.LRULocMemCache',
+        'LOCATION': 'books',
     }
+BOOKS_CACHE['TIMEOUT'] = 60 * 60
+BOOKS_CACHE['OPTIONS'] = {'MAX_ENTRIES': 50000}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    BOOKS_CACHE_ALIAS: BOOKS_CACHE,
 }
 
 
@@ -119,8 +229,8 @@ AUTH_PASSWORD_VALIDATORS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_jwt.authentication.JSONWebTokenAuthentication',
-        'rest_framework.authentication.BasicAuthentication',
+        'users.authentication.CachedJSONWebTokenAuthentication',
+        'users.authentication.CachedBasicAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
@@ -158,4 +268,85 @@ STATIC_URL = '/static/'
 
 AUTH_USER_MODEL = 'users.User'
 
-SILKY_PYTHON_PROFILER = True
+
+# Books
+
+# Optional in-process bloom filter that answers barcode checks for unknown
+# codes without a query; see books.barcodes for the options.
+BOOKS_BARCODE_BLOOM_FILTER = None
+
+# Seconds between rebuilds of the in-process search index, which pick up
+# books saved by other processes; only used where SQLite FTS5 is not
+# available (see books.search). 0 never rebuilds it.
+BOOKS_SEARCH_REFRESH_SECONDS = 300
+
+# Seconds a process remembers the id of a tag slug it resolved; see
+# books.tags.
+BOOKS_TAG_SLUG_TIMEOUT = 300
+
+
+# Circulation
+
+# Lending period of books without a book type or its days_amount.
+CIRCULATION_LOAN_DAYS = 14
+
+# Days a copy stays set aside for a ready hold.
+CIRCULATION_HOLD_DAYS = 3
+
+
+# Jobs
+
+# Worker of the database job queue, `manage.py run_jobs`; see jobs.worker.
+JOBS_WORKER = {
+    'THREADS': 4,
+    'POLL_SECONDS': 1,
+    'RETRY_SECONDS': 30,
+    'LOCK_TIMEOUT': 600,
+}
+
+
+# Users
+
+# In-process cache of the users authenticated credentials belong to; see
+# users.authentication for the options.
+USERS_AUTH_CACHE = {
+    'MAX_ENTRIES': 10000,
+    'TIMEOUT': 300,
+    # Remembering verified Basic credentials skips the password hasher,
+    # but lets a changed password keep working that long in other
+    # processes. Off by default.
+    'BASIC_TIMEOUT': 0,
+}
+
+# Bulk registration, `manage.py import_users` and the users-api:user-bulk
+# endpoint; see users.importer.
+USERS_IMPORT = {
+    'BATCH_SIZE': 500,
+    # Processes hashing passwords in `manage.py import_users`, threads in
+    # the endpoint: None for one per CPU, 0 to hash in the registering
+    # thread.
+    'HASH_WORKERS': None,
+}
+
+# Audit trail of permission decisions and changes of users, written in
+# batches by a background thread; see users.audit.
+USERS_AUDIT = {
+    'ENABLED': os.environ.get('SCHOOL_LIBRARY_AUDIT', 'on') != 'off',
+    # Or 'users.audit.TableSink', for the users_auditevent table.
+    'SINK': 'users.audit.FileSink',
+    'PATH': os.environ.get(
+        'SCHOOL_LIBRARY_AUDIT_LOG', os.path.join(BASE_DIR, 'audit.log')),
+    'BATCH_SIZE': 500,
+    'FLUSH_SECONDS': 1,
+    'MAX_QUEUE': 10000,
+}
+
+# Authentication classes accepted per view family, instead of the
+# REST_FRAMEWORK defaults. The catalog is used with tokens (kiosks) and
+# sessions (admin), never with Basic credentials.
+USERS_AUTHENTICATION_FAMILIES = {
+    'books': (
+        'users.authentication.CachedJSONWebTokenAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+    ),
+}
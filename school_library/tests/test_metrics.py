@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+
+import re
+
+import pytest
+
+from django.conf.urls import url
+from django.urls import reverse
+
+from school_library import metrics
+from school_library.urls import urlpatterns as site_urlpatterns
+
+# Metrics are off by default; the tests serve them with this URLconf.
+urlpatterns = site_urlpatterns + [
+    url(r'^metrics$', metrics.metrics_view, name='metrics')]
+
+
+@pytest.fixture(autouse=True)
+def registry():
+    metrics.registry.clear()
+    yield metrics.registry
+    metrics.registry.clear()
+
+
+def sample(text, name, view, le=None):
+    labels = 'view="%s"' % view
+    if le is not None:
+        labels += ',le="%s"' % le
+    match = re.search(
+        r'^%s\{%s\} (\S+)$' % (re.escape(name), re.escape(labels)),
+        text, re.M)
+    return float(match.group(1)) if match else None
+
+
+@pytest.fixture
+def metrics_on(settings):
+    settings.MIDDLEWARE = (['school_library.metrics.MetricsMiddleware']
+                           + settings.MIDDLEWARE)
+
+
+@pytest.mark.django_db
+@pytest.mark.urls(__name__)
+def test_requests_are_measured_per_url_name(admin_client, metrics_on):
+    for _ in range(3):
+        admin_client.get(reverse('books-api:book-list'))
+    admin_client.get('/no-such-page/')
+
+    response = admin_client.get(reverse('metrics'))
+    text = response.content.decode('utf-8')
+
+    assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+    duration = 'school_library_request_duration_seconds'
+    queries = 'school_library_request_queries'
+    assert sample(text, duration + '_count', 'books-api:book-list') == 3
+    assert sample(
+        text, duration + '_bucket', 'books-api:book-list', '+Inf') == 3
+    assert sample(text, duration + '_count', '<unmatched>') == 1
+    # Session, user, catalog state and the page itself.
+    assert sample(text, queries + '_sum', 'books-api:book-list') >= 3 * 3
+    assert sample(text, queries + '_bucket', 'books-api:book-list', 0) == 0
+
+
+def test_histogram_buckets_are_cumulative(registry):
+    registry.observe('v', 0.003, 0)
+    registry.observe('v', 0.2, 4)
+    registry.observe('v', 20, 200)
+
+    text = registry.render()
+
+    duration = 'school_library_request_duration_seconds_bucket'
+    queries = 'school_library_request_queries_bucket'
+    assert sample(text, duration, 'v', 0.005) == 1
+    assert sample(text, duration, 'v', 0.25) == 2
+    assert sample(text, duration, 'v', 10.0) == 2
+    assert sample(text, duration, 'v', '+Inf') == 3
+    assert sample(text, queries, 'v', 0) == 1
+    assert sample(text, queries, 'v', 5) == 2
+    assert sample(text, 'school_library_request_queries_sum', 'v') == 204
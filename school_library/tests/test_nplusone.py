@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from django.urls import reverse
+
+from books.models import Book, Publisher
+from books.views import BookList
+from school_library import nplusone
+
+
+@pytest.fixture
+def books():
+    for i in range(3):
+        Book.objects.create(
+            title='Book %d' % i, subject='Nepali',
+            publisher=Publisher.objects.create(name='Publisher %d' % i))
+
+
+def test_fingerprint_ignores_values():
+    assert nplusone.fingerprint(
+        "SELECT * FROM t WHERE a = 1 AND b = 'x' AND c IN (%s, %s)"
+    ) == nplusone.fingerprint(
+        "SELECT  * FROM t WHERE a = 22 AND b = 'y''z' AND c IN (%s)")
+
+
+@pytest.mark.django_db
+def test_lazy_relation_in_a_loop_is_reported_with_its_call_site(books):
+    with pytest.raises(nplusone.NPlusOneError) as error:
+        with nplusone.detect():
+            for book in Book.objects.all():
+                book.publisher.name
+
+    message = str(error.value)
+    assert 'Query run 3 times from' in message
+    assert 'test_nplusone.py' in message
+    assert '"books_publisher"' in message
+
+
+@pytest.mark.django_db
+def test_prefetched_loop_is_not_reported(books):
+    with nplusone.detect() as tracker:
+        for book in Book.objects.select_related('publisher'):
+            book.publisher.name
+
+    assert list(tracker.counts.values()) == [1]
+
+
+@pytest.mark.django_db
+def test_requests_with_n_plus_one_queries_fail(
+        admin_client, books, monkeypatch):
+    monkeypatch.setattr(
+        BookList, 'get_queryset', lambda self: Book.objects.all())
+
+    with pytest.raises(nplusone.NPlusOneError):
+        admin_client.get(reverse('books-api:book-list'))
+
+
+@pytest.mark.django_db
+def test_book_list_fits_its_query_budget(admin_client, books, query_budget):
+    # Session, user, catalog state, page, authors and keywords.
+    with query_budget(6):
+        admin_client.get(reverse('books-api:book-list'))
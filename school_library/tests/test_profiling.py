@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+
+import time
+
+import pytest
+
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from school_library import profiling
+
+
+@pytest.fixture
+def store(settings, tmpdir, request):
+    settings.PROFILING = {'SAMPLE_RATE': 3, 'SLOW_MS': 50}
+    if getattr(request, 'param', None) == 'sqlite':
+        settings.PROFILING['DATABASE'] = str(tmpdir.join('profiles.sqlite3'))
+    profiling.reset()
+    yield profiling.get_store()
+    profiling.reset()
+
+
+def view(request):
+    if request.GET.get('slow'):
+        time.sleep(0.06)
+    return HttpResponse('ok')
+
+
+@pytest.mark.parametrize('store', ['memory', 'sqlite'], indirect=True)
+def test_records_sampled_and_slow_requests_only(store):
+    middleware = profiling.SamplingProfilerMiddleware(view)
+    factory = RequestFactory()
+
+    for i in range(6):
+        middleware(factory.get('/books/%d/' % i))
+    middleware(factory.get('/slow/', {'slow': '1'}))
+
+    records = store.recent(10)
+    assert [r['path'] for r in records] == ['/slow/', '/books/5/', '/books/2/']
+    assert records[0]['profile'] is None
+    assert records[0]['duration_ms'] >= 50
+    assert 'cumulative' in records[1]['profile']
+
+
+def test_memory_store_is_a_ring_buffer():
+    store = profiling.MemoryStore(2)
+    for i in range(3):
+        store.add({'path': i})
+
+    assert store.recent(10) == [{'path': 2}, {'path': 1}]
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from django.apps import apps
+from django.db import connections
+from django.urls import reverse
+
+from books.models import Book
+from school_library import replicas
+from school_library.database import sqlite_database
+from users.models import User
+
+
+@pytest.fixture
+def router(settings):
+    settings.REPLICAS = dict(settings.REPLICAS, ALIASES=['replica1'])
+    replicas.reset()
+    yield replicas.ReplicaRouter()
+    replicas.reset()
+
+
+@pytest.fixture
+def replica(router, tmpdir):
+    """
+    An empty SQLite file with the catalog tables, standing in for a
+    replica of the (in memory) primary that has not caught up yet.
+    """
+    connections.databases['replica1'] = sqlite_database(
+        str(tmpdir.join('replica.sqlite3')))
+    connection = connections['replica1']
+    with connection.schema_editor() as editor:
+        for model in apps.get_app_config('books').get_models():
+            editor.create_model(model)
+    yield connection
+    connection.close()
+    del connections['replica1']
+    del connections.databases['replica1']
+
+
+def test_catalog_reads_go_to_a_replica(router):
+    assert router.db_for_read(Book) == 'replica1'
+    assert router.db_for_read(User) == 'default'
+    assert router.db_for_write(Book) == 'default'
+
+
+def test_a_thread_reads_one_replica_until_reset(router, settings):
+    settings.REPLICAS = dict(settings.REPLICAS, ALIASES=[
+        'replica%d' % number for number in range(1, 9)])
+    first = router.db_for_read(Book)
+
+    assert {router.db_for_read(Book) for _ in range(20)} == {first}
+    picked = set()
+    for _ in range(50):
+        replicas.reset()
+        picked.add(router.db_for_read(Book))
+    assert len(picked) > 1
+
+
+def test_reads_after_a_write_go_to_the_primary(router):
+    router.db_for_write(User)
+
+    assert router.db_for_read(Book) == 'default'
+
+
+def test_use_primary(router):
+    with replicas.use_primary():
+        assert router.db_for_read(Book) == 'default'
+
+    assert router.db_for_read(Book) == 'replica1'
+
+
+def test_no_replicas(router, settings):
+    settings.REPLICAS = dict(settings.REPLICAS, ALIASES=[])
+
+    assert router.db_for_read(Book) == 'default'
+
+
+def test_clients_read_their_writes(
+        transactional_db, replica, admin_user, client):
+    Book.objects.create(title='Muna Madan', subject='Nepali')
+    client.force_login(admin_user)
+    url = reverse('books-api:book-list')
+
+    assert client.get(url).json()['results'] == []
+
+    response = client.post(reverse('users-api:user-list'), {
+        'username': 'reader', 'email': 'reader@example.com',
+        'password': 'a-long-password', 'first_name': 'Ram',
+        'last_name': 'Thapa', 'city': 'Pokhara'})
+    assert response.status_code == 201
+    assert response.cookies['primary_reads']['max-age'] == 5
+
+    results = client.get(url).json()['results']
+    assert [book['title'] for book in results] == ['Muna Madan']
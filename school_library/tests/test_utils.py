@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+
+import io
+
+import pytest
+
+from school_library.utils import RecordError, chunks, read_records
+
+
+def test_chunks():
+    assert list(chunks(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(chunks([], 2)) == []
+
+
+def test_read_records_of_every_format():
+    def read(text, fmt):
+        return list(read_records(io.StringIO(text), fmt))
+
+    assert read('title,subject\nSeto Bagh,Nepali\n', 'csv') == [
+        {'title': 'Seto Bagh', 'subject': 'Nepali'}]
+    assert read('[{"title": "Seto Bagh"}]', 'json') == [
+        {'title': 'Seto Bagh'}]
+    first, second = read('{"title": "Seto Bagh"}\n\n{oops\n', 'ndjson')
+    assert first == {'title': 'Seto Bagh'}
+    assert isinstance(second, RecordError)
+    assert str(second).startswith('Line 3 is not valid JSON')
+    with pytest.raises(ValueError):
+        read('{"title": "Seto Bagh"}', 'json')
@@ -13,19 +13,35 @@ Including another URLconf
     1. Import the include() function: from django.conf.urls import url, include
     2. Add a URL to urlpatterns:  url(r'^blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.conf.urls import url, include
 from django.contrib import admin
 
+from school_library.metrics import metrics_view
+from school_library.profiling import RecentProfiles
+
 urlpatterns = [
     url(r'^admin/', admin.site.urls),
 
-    # url(
-    #     r'^api/books/',
-    #     include('books.urls', namespace='books-api')
-    # ),
+    url(
+        r'^api/books/',
+        include('books.urls', namespace='books-api')
+    ),
     url(
         r'^api/users/',
         include('users.urls', namespace='users-api')
     ),
-    url(r'^silk/', include('silk.urls', namespace='silk'))
+    url(
+        r'^api/circulation/',
+        include('circulation.urls', namespace='circulation-api')
+    ),
 ]
+
+if settings.METRICS_ENABLED:
+    urlpatterns.append(url(r'^metrics$', metrics_view, name='metrics'))
+
+if settings.PROFILER_MODE == 'sampling':
+    urlpatterns.append(
+        url(r'^profiling/$', RecentProfiles.as_view(), name='profiling'))
+elif settings.PROFILER_MODE == 'silk':
+    urlpatterns.append(url(r'^silk/', include('silk.urls', namespace='silk')))
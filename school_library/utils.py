@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+
+"""Helpers shared by the apps: batching and reading import files.
+
+`read_records` reads the record files of ``manage.py import_books`` and
+``manage.py import_users`` and of the bulk registration endpoint, in the
+formats each of them accepts.
+"""
+
+import csv
+import io
+import json
+
+
+class RecordError(ValueError):
+    """
+    A record that cannot be imported.
+    """
+
+
+def chunks(iterable, size):
+    """
+    Yield lists of `size` items of `iterable`, the last one shorter.
+    """
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def guess_format(name, default):
+    """
+    The format of a file named `name`: ``'csv'`` or `default`.
+    """
+    return 'csv' if name.lower().endswith('.csv') else default
+
+
+def read_records(stream, fmt):
+    """
+    Yield one dict per record of a CSV (``'csv'``), JSON array (``'json'``)
+    or NDJSON (``'ndjson'``) text stream; an NDJSON line that does not
+    parse yields a `RecordError`.
+    """
+    if fmt == 'csv':
+        for record in csv.DictReader(stream):
+            yield record
+    elif fmt == 'json':
+        records = json.load(stream)
+        if not isinstance(records, list):
+            raise ValueError('Expected a JSON array of records.')
+        for record in records:
+            yield record
+    elif fmt == 'ndjson':
+        for number, line in enumerate(stream, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as error:
+                # Reported by the importer like any other invalid record.
+                yield RecordError('Line %d is not valid JSON: %s' % (
+                    number, error))
+    else:
+        raise ValueError('Unknown import format %r.' % fmt)
+
+
+def open_records(path, fmt):
+    """
+    Open `path` and yield its records in format `fmt`.
+    """
+    with io.open(path, encoding='utf-8', newline='') as stream:
+        for record in read_records(stream, fmt):
+            yield record
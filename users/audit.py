@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+
+"""Audit trail of permission decisions and changes of users.
+
+`audit_log.record` only appends a structured event to an in-memory queue,
+without blocking: when the queue is full the event is dropped and
+counted. A background thread, started with the first event, takes the
+events off the queue and writes them to a sink in batches, so request
+threads never wait for log I/O. Configured by ``settings.USERS_AUDIT``::
+
+    USERS_AUDIT = {
+        'ENABLED': True,
+        'SINK': 'users.audit.FileSink',   # or 'users.audit.TableSink'
+        'PATH': 'audit.log',              # file of the FileSink
+        'BATCH_SIZE': 500,                # events per write at most
+        'FLUSH_SECONDS': 1,               # wait for a batch to fill up
+        'MAX_QUEUE': 10000,               # events waiting at most
+    }
+
+Every event has a ``time``, an ``action`` (``'permission'``,
+``'user.create'``, ...), the primary keys of its ``actor`` and
+``target`` users, if any, ``allowed`` for permission decisions, and a
+``details`` dict.
+"""
+
+import atexit
+import json
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OPTIONS = {
+    'ENABLED': True,
+    'SINK': 'users.audit.FileSink',
+    'PATH': 'audit.log',
+    'BATCH_SIZE': 500,
+    'FLUSH_SECONDS': 1,
+    'MAX_QUEUE': 10000,
+}
+
+
+def get_options():
+    options = dict(DEFAULT_OPTIONS)
+    options.update(getattr(settings, 'USERS_AUDIT', None) or {})
+    return options
+
+
+def _key(value):
+    # Anonymous users have no primary key.
+    value = getattr(value, 'pk', value)
+    return '' if value is None else str(value)
+
+
+class FileSink(object):
+    """
+    Appends events to ``USERS_AUDIT['PATH']``, one JSON object per line.
+    """
+
+    def __init__(self, options):
+        self.path = options['PATH']
+
+    def write(self, events):
+        lines = ''.join(json.dumps(event, cls=DjangoJSONEncoder) + '\n'
+                        for event in events)
+        with open(self.path, 'a', encoding='utf-8') as stream:
+            stream.write(lines)
+
+
+class TableSink(object):
+    """
+    Inserts events into the `AuditEvent` table.
+    """
+
+    def __init__(self, options):
+        pass
+
+    def write(self, events):
+        from users.models import AuditEvent
+
+        # The writer thread keeps its connection between batches.
+        close_old_connections()
+        AuditEvent.objects.bulk_create(
+            AuditEvent(
+                time=event['time'], action=event['action'],
+                actor=event['actor'], target=event['target'],
+                allowed=event['allowed'],
+                details=json.dumps(event['details'], cls=DjangoJSONEncoder))
+            for event in events)
+
+
+class AuditLog(object):
+    """
+    Queue of audit events and the thread writing them out.
+    """
+
+    def __init__(self):
+        self.dropped = 0
+        self._queue = None
+        self._sink = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def record(self, action, actor=None, target=None, allowed=None,
+               **details):
+        """
+        Queue an event; never blocks. Returns False if it was dropped.
+        """
+        options = get_options()
+        if not options['ENABLED']:
+            return False
+        events = self._start(options)
+        event = {
+            'time': timezone.now(),
+            'action': action,
+            'actor': _key(actor),
+            'target': _key(target),
+            'allowed': allowed,
+            'details': details,
+        }
+        try:
+            events.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    def flush(self):
+        """
+        Wait until every queued event is written.
+        """
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            self._queue.join()
+
+    def stop(self):
+        """
+        Write the queued events and stop the thread. The next event starts
+        a new one, with the current options.
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is not None and thread.is_alive():
+                self._queue.put(None)
+                thread.join()
+            self._queue = self._sink = None
+
+    def _start(self, options):
+        """
+        Start the writer thread if it is not running; return the queue.
+        """
+        events, thread = self._queue, self._thread
+        if thread is not None and thread.is_alive():
+            return events
+        with self._lock:
+            # Also restarts the thread in a forked child, which has none.
+            if self._thread is not None and self._thread.is_alive():
+                return self._queue
+            if self._queue is None:
+                self._queue = queue.Queue(options['MAX_QUEUE'])
+                self._sink = import_string(options['SINK'])(options)
+            self._thread = threading.Thread(
+                target=self._run, name='audit-log',
+                args=(self._queue, self._sink, options['BATCH_SIZE'],
+                      options['FLUSH_SECONDS']))
+            self._thread.daemon = True
+            self._thread.start()
+            return self._queue
+
+    def _run(self, events, sink, batch_size, flush_seconds):
+        while True:
+            batch = [events.get()]
+            deadline = time.time() + flush_seconds
+            while batch[-1] is not None and len(batch) < batch_size:
+                try:
+                    batch.append(events.get(
+                        timeout=max(deadline - time.time(), 0)))
+                except queue.Empty:
+                    break
+            stopping = batch[-1] is None
+            if stopping:
+                batch.pop()
+            self._write(sink, batch)
+            for _ in range(len(batch) + stopping):
+                events.task_done()
+            if stopping:
+                return
+
+    def _write(self, sink, batch):
+        dropped, self.dropped = self.dropped, 0
+        if dropped:
+            logger.warning('%d audit events dropped, the queue was full.',
+                           dropped)
+        if not batch:
+            return
+        try:
+            sink.write(batch)
+        except Exception:
+            logger.exception('Could not write %d audit events.', len(batch))
+
+
+audit_log = AuditLog()
+
+# Events still queued at exit are written out.
+atexit.register(audit_log.flush)
@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+
+"""Authentication classes that remember who a credential belongs to.
+
+Resolving a credential to a `User` normally costs a query per request.
+The classes here keep the result in a bounded, in-process LRU cache,
+configured by ``settings.USERS_AUTH_CACHE``::
+
+    USERS_AUTH_CACHE = {
+        'MAX_ENTRIES': 10000,   # cached credentials per process
+        'TIMEOUT': 300,         # seconds an entry may be served
+        'BASIC_TIMEOUT': 0,     # the same for Basic credentials; 0 is off
+    }
+
+Receivers in `users.signals` drop a user's entries when the user is saved
+or deleted, and `User.set_password` drops its Basic credentials. They only
+reach the current process; in other processes a stale entry lives at most
+``TIMEOUT`` (``BASIC_TIMEOUT``) seconds, so an old password keeps working
+that long there.
+
+``settings.USERS_AUTHENTICATION_FAMILIES`` narrows the authentication
+classes of the views in a family (see `AuthenticationFamilyMixin`)::
+
+    USERS_AUTHENTICATION_FAMILIES = {
+        'books': (
+            'users.authentication.CachedJSONWebTokenAuthentication',
+            'rest_framework.authentication.SessionAuthentication',
+        ),
+    }
+"""
+
+import copy
+import hmac
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.crypto import salted_hmac
+from django.utils.module_loading import import_string
+
+from rest_framework.authentication import BasicAuthentication
+from rest_framework_jwt.authentication import JSONWebTokenAuthentication
+
+DEFAULT_OPTIONS = {
+    'MAX_ENTRIES': 10000,
+    'TIMEOUT': 300,
+    'BASIC_TIMEOUT': 0,
+}
+
+
+def _options():
+    options = dict(DEFAULT_OPTIONS)
+    options.update(getattr(settings, 'USERS_AUTH_CACHE', None) or {})
+    return options
+
+
+class UserCache(object):
+    """
+    Thread-safe LRU map of credential keys to users.
+
+    Every entry holds the credential it was stored for, which must match
+    again on lookup, and expires at a given time. Entries are also indexed
+    by user so `discard_user` can drop them all at once.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._keys_by_user = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, credential):
+        """
+        Return a copy of the user cached for `key`, or None.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored, user, expires = entry
+            if expires <= time.time() or not hmac.compare_digest(
+                    stored, credential):
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+        # Callers may change their user (e.g. `last_login`); never hand out
+        # the cached instance itself.
+        return copy.deepcopy(user)
+
+    def set(self, key, credential, user, expires):
+        max_entries = _options()['MAX_ENTRIES']
+        user = copy.deepcopy(user)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (credential, user, expires)
+            self._keys_by_user.setdefault(user.pk, set()).add(key)
+            while len(self._entries) > max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def discard_user(self, pk):
+        """
+        Drop every entry of the user with primary key `pk`.
+        """
+        with self._lock:
+            for key in list(self._keys_by_user.get(pk, ())):
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        pk = entry[1].pk
+        keys = self._keys_by_user.get(pk)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[pk]
+
+
+jwt_users = UserCache()
+basic_users = UserCache()
+
+
+class CachedJSONWebTokenAuthentication(JSONWebTokenAuthentication):
+    """
+    `JSONWebTokenAuthentication` that caches the user of each token.
+
+    Entries are keyed by the token's signature and expire with the token,
+    or after ``USERS_AUTH_CACHE['TIMEOUT']`` seconds if that comes first.
+    A cache hit neither decodes the token nor queries the database.
+    """
+    cache = jwt_users
+
+    def authenticate(self, request):
+        jwt_value = self.get_jwt_value(request)
+        if jwt_value is None:
+            return None
+
+        if not isinstance(jwt_value, bytes):
+            # Tokens read from the JWT_AUTH_COOKIE are text.
+            jwt_value = jwt_value.encode('utf-8')
+        key = jwt_value.rsplit(b'.', 1)[-1]
+        user = self.cache.get(key, jwt_value)
+        if user is not None:
+            return (user, jwt_value)
+
+        self._expires = None
+        user, _ = super().authenticate(request)
+        timeout_at = time.time() + _options()['TIMEOUT']
+        expires = min(self._expires or timeout_at, timeout_at)
+        self.cache.set(key, jwt_value, user, expires)
+        return (user, jwt_value)
+
+    def authenticate_credentials(self, payload):
+        user = super().authenticate_credentials(payload)
+        # Only reached once the signature and expiry have been verified.
+        self._expires = payload.get('exp')
+        return user
+
+
+class CachedBasicAuthentication(BasicAuthentication):
+    """
+    `BasicAuthentication` that remembers verified credentials for
+    ``USERS_AUTH_CACHE['BASIC_TIMEOUT']`` seconds, sparing the password
+    hasher on repeated requests. Off unless that timeout is set.
+
+    Entries are keyed by an HMAC of the username and password under the
+    project's secret key; the password itself is never stored.
+    """
+    cache = basic_users
+
+    def authenticate_credentials(self, userid, password):
+        timeout = _options()['BASIC_TIMEOUT']
+        if not timeout:
+            return super().authenticate_credentials(userid, password)
+
+        key = salted_hmac(
+            'users.authentication.CachedBasicAuthentication',
+            '%s\0%s' % (userid, password)).digest()
+        user = self.cache.get(key, key)
+        if user is not None:
+            return (user, None)
+
+        user, auth = super().authenticate_credentials(userid, password)
+        self.cache.set(key, key, user, time.time() + timeout)
+        return (user, auth)
+
+
+_family_classes = {}
+
+
+def get_family_authentication_classes(family):
+    """
+    Return the authentication classes configured for the views of
+    `family`, or None to use the REST framework defaults.
+    """
+    families = getattr(settings, 'USERS_AUTHENTICATION_FAMILIES', None) or {}
+    paths = families.get(family)
+    if paths is None:
+        return None
+    paths = tuple(paths)
+    if paths not in _family_classes:
+        _family_classes[paths] = [import_string(path) for path in paths]
+    return _family_classes[paths]
+
+
+class AuthenticationFamilyMixin(object):
+    """
+    Restricts an API view to the authentication classes of its
+    `authentication_family` in ``settings.USERS_AUTHENTICATION_FAMILIES``.
+
+    Views of a family limited to token schemes never run the password
+    hasher, whatever credentials a client sends.
+    """
+    authentication_family = None
+
+    def get_authenticators(self):
+        classes = get_family_authentication_classes(
+            self.authentication_family)
+        if classes is None:
+            return super().get_authenticators()
+        return [auth() for auth in classes]
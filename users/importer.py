@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+
+"""Bulk registration of users.
+
+Registering through `UserSerializer` costs a uniqueness query, a full
+PBKDF2 hash and an ``INSERT`` per user, one after the other. `UserImporter`
+registers records (from CSV or a JSON array, see
+`school_library.utils.read_records`) in batches instead:
+
+* records are validated without queries, then the usernames of a whole
+  batch are checked against the database with one query;
+* passwords are hashed in parallel, the hasher being CPU bound: across a
+  pool of processes by ``manage.py import_users``, and across threads by
+  the bulk endpoint, which must not fork a web worker (PBKDF2 releases
+  the GIL);
+* users are inserted with `bulk_create`.
+
+It is configured by ``settings.USERS_IMPORT``::
+
+    USERS_IMPORT = {
+        'BATCH_SIZE': 500,      # users inserted per transaction
+        'HASH_WORKERS': None,   # hashing processes or threads; None is one
+                                # per CPU, 0 hashes in the importing thread
+    }
+
+Records take the fields of `UserRecordSerializer`. Django fixture entries,
+such as those of ``users/fixtures/users.json``, are accepted as well: their
+``fields`` are read and the fields a user is not registered with
+(``numbers``, ``user_type``, permissions, ...) are ignored. A record
+without a username is registered under its email, and one without a
+password gets an unusable password.
+
+Bulk inserts send no ``post_save`` signal; new users have nothing cached
+in `users.authentication` to forget.
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+from rest_framework.exceptions import ValidationError
+
+from school_library.utils import RecordError, chunks
+from users.models import User
+from users.serializers import UserRecordSerializer
+
+DEFAULT_OPTIONS = {
+    'BATCH_SIZE': 500,
+    'HASH_WORKERS': None,
+}
+
+FIELDS = UserRecordSerializer.Meta.fields
+
+
+def get_options():
+    options = dict(DEFAULT_OPTIONS)
+    options.update(getattr(settings, 'USERS_IMPORT', None) or {})
+    return options
+
+
+def _hash(password):
+    # Module level, so the process pool can pickle it.
+    return make_password(password or None)
+
+
+def _message(detail):
+    if isinstance(detail, dict):
+        return '; '.join('%s: %s' % (field, ' '.join(map(str, errors)))
+                         for field, errors in sorted(detail.items()))
+    return ' '.join(map(str, detail))
+
+
+class UserImporter(object):
+    """
+    Registers user records in batches.
+
+    Args:
+        batch_size (int): users inserted per transaction; defaults to
+            ``USERS_IMPORT['BATCH_SIZE']``.
+        hash_workers (int): processes hashing passwords; defaults to
+            ``USERS_IMPORT['HASH_WORKERS']``.
+        hash_in_threads (bool): hash in threads of this process rather
+            than in worker processes.
+        progress (callable): called after every batch with the importer.
+    """
+
+    def __init__(self, batch_size=None, hash_workers=None,
+                 hash_in_threads=False, progress=None):
+        options = get_options()
+        self.batch_size = batch_size or options['BATCH_SIZE']
+        if hash_workers is None:
+            hash_workers = options['HASH_WORKERS']
+        if hash_workers is None:
+            hash_workers = os.cpu_count() or 1
+        self.hash_workers = hash_workers
+        self.hash_in_threads = hash_in_threads
+        self.progress = progress
+        self.imported = 0
+        self.errors = []
+        self.started = None
+        self._serializer = UserRecordSerializer()
+
+    @property
+    def rate(self):
+        """Users registered per second so far."""
+        elapsed = time.time() - self.started if self.started else 0
+        return self.imported / elapsed if elapsed else 0.0
+
+    def run(self, records):
+        """
+        Register every record; returns the number of users registered.
+
+        Invalid records are skipped and reported in `errors` as
+        ``(record number, message)`` pairs.
+        """
+        self.started = time.time()
+        executor = ThreadPoolExecutor if self.hash_in_threads \
+            else ProcessPoolExecutor
+        pool = executor(self.hash_workers) if self.hash_workers else None
+        try:
+            for batch in chunks(enumerate(records, 1), self.batch_size):
+                self._import_batch(batch, pool)
+                if self.progress:
+                    self.progress(self)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+            self.errors.sort()
+        return self.imported
+
+    def _import_batch(self, batch, pool):
+        users = []
+        for number, record in batch:
+            try:
+                users.append((number, User(**self._validate(record))))
+            except RecordError as error:
+                self.errors.append((number, str(error)))
+        users = self._drop_taken_usernames(users)
+        if not users:
+            return
+
+        # Until now `password` holds the raw password.
+        hashes = self._hash_passwords([user.password for _, user in users],
+                                      pool)
+        for (_, user), password in zip(users, hashes):
+            user.password = password
+        while True:
+            try:
+                with transaction.atomic():
+                    User.objects.bulk_create(user for _, user in users)
+                break
+            except IntegrityError:
+                # Usernames registered since they were checked.
+                kept = self._drop_taken_usernames(users)
+                if len(kept) == len(users):
+                    raise
+                users = kept
+                if not users:
+                    return
+        self.imported += len(users)
+
+    def _validate(self, record):
+        if not isinstance(record, dict):
+            raise RecordError('Expected an object of user fields.')
+        # A Django fixture entry: {"model": ..., "fields": {...}}.
+        if isinstance(record.get('fields'), dict):
+            record = record['fields']
+
+        data = {name: '' if record.get(name) is None else record[name]
+                for name in FIELDS}
+        if not data['username']:
+            data['username'] = data['email']
+        if not data['username']:
+            raise RecordError('A username or an email is required.')
+        try:
+            return self._serializer.run_validation(data)
+        except ValidationError as error:
+            raise RecordError(_message(error.detail))
+
+    def _drop_taken_usernames(self, users):
+        """
+        Report and drop the users whose username is already registered, or
+        repeats an earlier user's.
+        """
+        taken = set(User.objects.filter(
+            username__in=[user.username for _, user in users]).values_list(
+            'username', flat=True))
+        kept = []
+        for number, user in users:
+            if user.username in taken:
+                self.errors.append(
+                    (number, 'Username %s is already taken.' % user.username))
+                continue
+            taken.add(user.username)
+            kept.append((number, user))
+        return kept
+
+    def _hash_passwords(self, passwords, pool):
+        if pool is None:
+            return [_hash(password) for password in passwords]
+        chunksize = max(1, len(passwords) // (self.hash_workers * 4))
+        return list(pool.map(_hash, passwords, chunksize=chunksize))
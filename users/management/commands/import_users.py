@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+
+from django.core.management.base import BaseCommand, CommandError
+
+from school_library.utils import guess_format, open_records
+from users.importer import UserImporter
+
+
+class Command(BaseCommand):
+    help = ('Register users from a CSV file or a JSON array, such as a '
+            'users fixture.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import.')
+        parser.add_argument(
+            '--format', choices=('csv', 'json'),
+            help='Input format (default: guessed from the file extension).')
+        parser.add_argument(
+            '--batch-size', type=int,
+            help="Users inserted per transaction (default: "
+                 "USERS_IMPORT['BATCH_SIZE']).")
+        parser.add_argument(
+            '--workers', type=int,
+            help="Processes hashing passwords, 0 to hash in this process "
+                 "(default: USERS_IMPORT['HASH_WORKERS']).")
+
+    def handle(self, *args, **options):
+        importer = UserImporter(
+            batch_size=options['batch_size'],
+            hash_workers=options['workers'], progress=self.report)
+        try:
+            importer.run(open_records(
+                options['path'],
+                options['format'] or guess_format(options['path'], 'json')))
+        except (IOError, ValueError) as error:
+            raise CommandError(str(error))
+
+        for number, message in importer.errors:
+            self.stderr.write('Record %d skipped: %s' % (number, message))
+        self.stdout.write(self.style.SUCCESS(
+            'Registered %d users (%.0f rows/s), skipped %d records.' % (
+                importer.imported, importer.rate, len(importer.errors))))
+
+    def report(self, importer):
+        self.stdout.write('%d users registered (%.0f rows/s)' % (
+            importer.imported, importer.rate))
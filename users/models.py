@@ -20,5 +20,50 @@ class User(AbstractUser):
     city = models.CharField(max_length=100)
 
     class Meta:
+        indexes = [
+            # Users in joining order; see users.pagination.UserPagination.
+            models.Index(
+                fields=['date_joined', 'id'], name='users_user_joined_idx'),
+            # The users of a city, in joining order.
+            models.Index(
+                fields=['city', 'date_joined', 'id'],
+                name='users_user_city_idx'),
+        ]
         verbose_name = _('user')
         verbose_name_plural = _('users')
+
+    def set_password(self, raw_password):
+        from users.authentication import basic_users
+
+        super().set_password(raw_password)
+        # Verified Basic credentials must not outlive the old password.
+        basic_users.discard_user(self.pk)
+
+
+class AuditEvent(models.Model):
+    """
+    A permission decision or change of a user, written by
+    `users.audit.TableSink`.
+
+    `actor` and `target` are kept as plain values, not foreign keys, so the
+    trail outlives deleted users.
+    """
+    time = models.DateTimeField()
+    action = models.CharField(max_length=50)
+    actor = models.CharField(max_length=64, blank=True)
+    target = models.CharField(max_length=64, blank=True)
+    allowed = models.NullBooleanField()
+    details = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['time', 'id']
+        indexes = [
+            models.Index(fields=['time'], name='users_audit_time_idx'),
+            models.Index(
+                fields=['actor', 'time'], name='users_audit_actor_idx'),
+        ]
+        verbose_name = _('audit event')
+        verbose_name_plural = _('audit events')
+
+    def __str__(self):
+        return '%s %s by %s' % (self.action, self.target, self.actor)
@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+
+"""Pagination styles for the users API.
+"""
+
+from school_library.pagination import KeysetPagination
+
+
+class UserPagination(KeysetPagination):
+    """
+    Users in the order they joined, backed by ``users_user_joined_idx``, or
+    ``users_user_city_idx`` for the users of one city.
+    """
+
+    ordering = ('date_joined', 'id')
@@ -1,5 +1,6 @@
 from rest_framework.permissions import BasePermission
-from .models import User
+
+from .audit import audit_log
 
 
 class IsOwner(BasePermission):
@@ -7,8 +8,8 @@ class IsOwner(BasePermission):
 
     def has_object_permission(self, request, view, obj):
         """Return True if permission is granted to the user owner."""
-        print('request user', request.user)
-        print('request obj', obj)
-        if isinstance(obj, User):
-            return obj == request.user
-        return obj == request.user
+        allowed = obj == request.user
+        audit_log.record(
+            'permission', actor=request.user, target=obj, allowed=allowed,
+            permission='IsOwner', method=request.method, path=request.path)
+        return allowed
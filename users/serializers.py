@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from rest_framework.validators import UniqueValidator
 
 from users.models import User
 
@@ -32,10 +33,47 @@ class UserSerializer(serializers.ModelSerializer):
         user = User(
             username=validated_data['username'],
             email=validated_data['email'],
-            first_name=validated_data.get('first_name', None),
-            last_name=validated_data.get('last_name', None),
+            first_name=validated_data.get('first_name', ''),
+            last_name=validated_data.get('last_name', ''),
             city=validated_data['city'],
         )
         user.set_password(validated_data['password'])
         user.save()
         return user
+
+
+class UserCompactSerializer(serializers.Serializer):
+    """
+    A flat user representation for lists, without `full_name`, read from
+    ``User.objects.values(*UserCompactSerializer.columns)`` rows.
+    """
+    id = serializers.UUIDField(read_only=True)
+    username = serializers.CharField(read_only=True)
+    email = serializers.EmailField(read_only=True)
+    city = serializers.CharField(read_only=True)
+
+    columns = ('id', 'username', 'email', 'city')
+
+
+class UserRecordSerializer(serializers.ModelSerializer):
+    """
+    A user of a bulk registration; see `users.importer`.
+
+    Usernames are checked for uniqueness by the importer, one query per
+    batch, rather than by a validator querying once per record.
+    """
+    password = serializers.CharField(
+        required=False, allow_blank=True, trim_whitespace=False)
+
+    class Meta:
+        model = User
+        fields = ('username', 'email', 'password', 'first_name', 'last_name',
+                  'city')
+
+    def get_fields(self):
+        fields = super().get_fields()
+        username = fields['username']
+        username.validators = [
+            validator for validator in username.validators
+            if not isinstance(validator, UniqueValidator)]
+        return fields
@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+
+"""Signal receivers keeping the authentication caches in step with users.
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from users.authentication import basic_users, jwt_users
+from users.models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_user(sender, instance, **kwargs):
+    jwt_users.discard_user(instance.pk)
+    basic_users.discard_user(instance.pk)
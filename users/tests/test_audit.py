@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+import io
+import json
+import threading
+
+import pytest
+
+from django.urls import reverse
+from django.utils import timezone
+
+from users.audit import AuditLog, TableSink, audit_log
+from users.models import AuditEvent
+
+
+@pytest.fixture
+def audit_file(settings, tmpdir):
+    path = str(tmpdir.join('audit.log'))
+    settings.USERS_AUDIT = dict(
+        settings.USERS_AUDIT, ENABLED=True, SINK='users.audit.FileSink',
+        PATH=path, FLUSH_SECONDS=0.05)
+    yield path
+    audit_log.stop()
+
+
+def read_events(path):
+    with io.open(path, encoding='utf-8') as stream:
+        return [json.loads(line) for line in stream]
+
+
+class BlockingSink(object):
+    """
+    Holds the writer thread until released.
+    """
+
+    def __init__(self, options):
+        self.events = []
+        self.release = threading.Event()
+
+    def write(self, events):
+        self.release.wait(5)
+        self.events.extend(events)
+
+
+def test_events_are_written_in_batches_by_a_thread(audit_file):
+    log = AuditLog()
+    for number in range(5):
+        assert log.record('permission', target=number, allowed=True)
+    log.stop()
+
+    events = read_events(audit_file)
+    assert [event['target'] for event in events] == [
+        '0', '1', '2', '3', '4']
+    assert events[0]['action'] == 'permission'
+    assert events[0]['allowed'] is True
+
+
+def test_record_does_not_wait_for_the_sink(settings):
+    settings.USERS_AUDIT = dict(
+        settings.USERS_AUDIT, ENABLED=True,
+        SINK=__name__ + '.BlockingSink', MAX_QUEUE=2,
+        FLUSH_SECONDS=0)
+    log = AuditLog()
+    try:
+        # Two events fill the queue, a third at most is taken by the
+        # blocked writer, and the next ones are dropped.
+        results = [log.record('permission') for _ in range(6)]
+        assert results[:2] == [True, True]
+        assert results[3:] == [False] * 3
+    finally:
+        log._sink.release.set()
+        log.stop()
+
+
+def test_disabled_log_records_nothing(settings):
+    settings.USERS_AUDIT = dict(settings.USERS_AUDIT, ENABLED=False)
+    log = AuditLog()
+
+    assert log.record('permission') is False
+    assert log._thread is None
+
+
+@pytest.mark.django_db
+def test_table_sink_inserts_events(admin_user):
+    TableSink({}).write([{
+        'time': timezone.now(), 'action': 'user.update',
+        'actor': str(admin_user.pk), 'target': str(admin_user.pk),
+        'allowed': None, 'details': {'fields': ['city']}}])
+
+    event = AuditEvent.objects.get()
+    assert event.actor == str(admin_user.pk)
+    assert json.loads(event.details) == {'fields': ['city']}
+
+
+@pytest.mark.django_db
+def test_owner_permission_decisions_are_audited(
+        client, django_user_model, audit_file):
+    owner = django_user_model.objects.create_user(
+        username='ann', password='pass-word', city='Delhi')
+    other = django_user_model.objects.create_user(
+        username='bo', password='pass-word', city='Delhi')
+    client.login(username='ann', password='pass-word')
+
+    for user in (owner, other):
+        client.patch(
+            reverse('users-api:user-detail', kwargs={'id': user.pk}),
+            json.dumps({'city': 'Kathmandu'}),
+            content_type='application/json')
+    audit_log.stop()
+
+    events = read_events(audit_file)
+    decisions = [(event['target'], event['allowed']) for event in events
+                 if event['action'] == 'permission']
+    assert decisions == [(str(owner.pk), True), (str(other.pk), False)]
+    update, = [event for event in events if event['action'] == 'user.update']
+    assert update['actor'] == str(owner.pk)
+    assert update['details'] == {'fields': ['city']}
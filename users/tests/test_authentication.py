@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+
+import base64
+import time
+
+import pytest
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework_jwt.settings import api_settings
+
+from users.authentication import UserCache, basic_users, jwt_users
+
+
+@pytest.fixture
+def user(django_user_model):
+    return django_user_model.objects.create_user(
+        username='john_coloney', email='john@gmail.com',
+        password='password123', city='Cincinnati')
+
+
+def token_for(user):
+    payload = api_settings.JWT_PAYLOAD_HANDLER(user)
+    return api_settings.JWT_ENCODE_HANDLER(payload)
+
+
+def user_queries(client, token):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(
+            reverse('users-api:user-list'),
+            HTTP_AUTHORIZATION='JWT %s' % token)
+    assert response.status_code == 200
+    return [q['sql'] for q in queries
+            if q['sql'].startswith('SELECT') and
+            '"users_user"."username" =' in q['sql']]
+
+
+@pytest.mark.django_db
+def test_repeated_requests_do_not_look_the_user_up(client, user):
+    token = token_for(user)
+
+    assert len(user_queries(client, token)) == 1
+    assert user_queries(client, token) == []
+
+
+@pytest.mark.django_db
+def test_saving_the_user_invalidates_its_tokens(client, user):
+    token = token_for(user)
+    user_queries(client, token)
+
+    user.is_active = False
+    user.save()
+
+    response = client.get(
+        reverse('users-api:user-list'), HTTP_AUTHORIZATION='JWT %s' % token)
+    assert response.status_code == 401
+    assert len(jwt_users) == 0
+
+
+@pytest.mark.django_db
+def test_tampered_token_with_cached_signature_is_rejected(client, user):
+    token = token_for(user)
+    user_queries(client, token)
+    header, payload, signature = token.split('.')
+
+    response = client.get(
+        reverse('users-api:user-list'),
+        HTTP_AUTHORIZATION='JWT %s.%sx.%s' % (header, payload, signature))
+
+    assert response.status_code == 401
+
+
+def test_user_cache_evicts_least_recently_used_and_expired(
+        settings, django_user_model):
+    settings.USERS_AUTH_CACHE = {'MAX_ENTRIES': 2}
+    cache = UserCache()
+    users = [django_user_model(username=str(i)) for i in range(3)]
+    later = time.time() + 60
+
+    cache.set(b'a', b'a', users[0], later)
+    cache.set(b'b', b'b', users[1], later)
+    cache.get(b'a', b'a')
+    cache.set(b'c', b'c', users[2], later)
+
+    assert cache.get(b'a', b'a').username == '0'
+    assert cache.get(b'b', b'b') is None
+    assert cache.get(b'a', b'a') is not cache.get(b'a', b'a')
+
+    cache.set(b'd', b'd', users[2], time.time() - 1)
+    assert cache.get(b'd', b'd') is None
+
+
+def basic(username, password):
+    return 'Basic %s' % base64.b64encode(
+        ('%s:%s' % (username, password)).encode('utf-8')).decode('ascii')
+
+
+@pytest.fixture
+def basic_cache(settings):
+    settings.USERS_AUTH_CACHE = {'BASIC_TIMEOUT': 60}
+
+
+@pytest.mark.django_db
+def test_verified_basic_credentials_skip_the_hasher(
+        client, user, basic_cache, monkeypatch):
+    url = reverse('users-api:user-list')
+    assert client.get(
+        url, HTTP_AUTHORIZATION=basic(user.username, 'password123'),
+    ).status_code == 200
+
+    def fail(*args, **kwargs):
+        raise AssertionError('password hasher called')
+    monkeypatch.setattr('django.contrib.auth.base_user.check_password', fail)
+
+    assert client.get(
+        url, HTTP_AUTHORIZATION=basic(user.username, 'password123'),
+    ).status_code == 200
+
+
+@pytest.mark.django_db
+def test_wrong_basic_password_is_not_served_from_cache(
+        client, user, basic_cache):
+    url = reverse('users-api:user-list')
+    client.get(url, HTTP_AUTHORIZATION=basic(user.username, 'password123'))
+
+    response = client.get(
+        url, HTTP_AUTHORIZATION=basic(user.username, 'password124'))
+
+    assert response.status_code == 401
+
+
+@pytest.mark.django_db
+def test_set_password_forgets_basic_credentials(client, user, basic_cache):
+    url = reverse('users-api:user-list')
+    client.get(url, HTTP_AUTHORIZATION=basic(user.username, 'password123'))
+    assert len(basic_users) == 1
+
+    user.set_password('changed456')
+    assert len(basic_users) == 0
+    user.save()
+
+    assert client.get(
+        url, HTTP_AUTHORIZATION=basic(user.username, 'password123'),
+    ).status_code == 401
+
+
+@pytest.mark.django_db
+def test_books_family_does_not_accept_basic_credentials(client, user):
+    url = reverse('books-api:book-list')
+
+    basic_response = client.get(
+        url, HTTP_AUTHORIZATION=basic(user.username, 'password123'))
+    jwt_response = client.get(
+        url, HTTP_AUTHORIZATION='JWT %s' % token_for(user))
+
+    assert basic_response.status_code == 401
+    assert jwt_response.status_code == 200
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+
+import io
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from school_library.utils import read_records
+from users.importer import UserImporter
+from users.models import User
+
+FIXTURE = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), 'fixtures', 'users.json')
+
+CSV = (
+    'username,email,password,first_name,last_name,city\n'
+    'ann,ann@school.edu,s3cret-pass,Ann,Lee,Kathmandu\n'
+    ',bo@school.edu,,,,Delhi\n'
+    'ann,other@school.edu,pass-word,,,Delhi\n'
+    'cy,not-an-email,pass-word,,,Delhi\n'
+    'dee,dee@school.edu,pass-word,,,\n'
+)
+
+
+@pytest.fixture
+def in_process_hashing(settings):
+    settings.USERS_IMPORT = {'HASH_WORKERS': 0}
+
+
+@pytest.mark.django_db
+def test_import_registers_valid_records_and_reports_the_others(
+        in_process_hashing):
+    importer = UserImporter()
+
+    imported = importer.run(read_records(io.StringIO(CSV), 'csv'))
+
+    assert imported == 2
+    ann = User.objects.get(username='ann')
+    assert ann.check_password('s3cret-pass')
+    assert (ann.first_name, ann.city) == ('Ann', 'Kathmandu')
+    # No username: registered under the email, without a usable password.
+    bo = User.objects.get(username='bo@school.edu')
+    assert bo.first_name == '' and not bo.has_usable_password()
+    assert [number for number, _ in importer.errors] == [3, 4, 5]
+    assert 'already taken' in importer.errors[0][1]
+    assert 'email' in importer.errors[1][1]
+    assert 'city' in importer.errors[2][1]
+
+
+@pytest.mark.django_db
+def test_import_checks_usernames_against_registered_users(
+        django_user_model, in_process_hashing):
+    django_user_model.objects.create_user(username='ann', city='Delhi')
+    importer = UserImporter()
+
+    importer.run([{'username': 'ann', 'city': 'Delhi'},
+                  {'username': 'bo', 'city': 'Delhi'}])
+
+    assert importer.imported == 1
+    assert importer.errors == [(1, 'Username ann is already taken.')]
+
+
+@pytest.mark.django_db
+def test_import_queries_per_batch_not_per_user(in_process_hashing):
+    records = [{'username': 'user%d' % n, 'city': 'Delhi'}
+               for n in range(60)]
+
+    with CaptureQueriesContext(connection) as captured:
+        UserImporter(batch_size=30).run(records)
+
+    assert User.objects.count() == 60
+    # A username check and an INSERT per batch, plus the savepoints.
+    assert len([query for query in captured
+                if 'users_user' in query['sql']]) == 4
+
+
+@pytest.mark.django_db
+def test_import_hashes_passwords_in_worker_processes():
+    records = [{'username': 'user%d' % n, 'password': 'pass-%d' % n,
+                'city': 'Delhi'} for n in range(4)]
+
+    UserImporter(hash_workers=2).run(records)
+
+    for n in range(4):
+        assert User.objects.get(
+            username='user%d' % n).check_password('pass-%d' % n)
+
+
+@pytest.mark.django_db
+def test_import_users_command_reads_the_users_fixture(in_process_hashing):
+    stdout, stderr = io.StringIO(), io.StringIO()
+
+    call_command('import_users', FIXTURE, stdout=stdout, stderr=stderr)
+
+    with io.open(FIXTURE, encoding='utf-8') as stream:
+        emails = {entry['fields']['email'] for entry in json.load(stream)}
+    assert set(User.objects.values_list('username', flat=True)) == emails
+    assert 'Registered %d users' % len(emails) in stdout.getvalue()
+    assert stderr.getvalue() == ''
+
+
+@pytest.mark.django_db
+def test_bulk_endpoint_registers_a_json_array(
+        admin_client, settings, monkeypatch):
+    settings.USERS_IMPORT = {'HASH_WORKERS': 2}
+    pools = []
+
+    def no_pool(*args, **kwargs):
+        raise AssertionError('The endpoint must not fork a process pool.')
+
+    def thread_pool(workers):
+        pools.append(workers)
+        return ThreadPoolExecutor(workers)
+    monkeypatch.setattr('users.importer.ProcessPoolExecutor', no_pool)
+    monkeypatch.setattr('users.importer.ThreadPoolExecutor', thread_pool)
+
+    response = admin_client.post(
+        reverse('users-api:user-bulk'),
+        json.dumps([{'username': 'ann', 'password': 'pass-word',
+                     'city': 'Delhi'},
+                    {'username': 'bo'}]),
+        content_type='application/json')
+
+    assert response.status_code == 201
+    assert response.data['imported'] == 1
+    assert response.data['errors'] == [
+        {'record': 2, 'message': 'city: This field may not be blank.'}]
+    assert pools == [2]
+    assert User.objects.get(username='ann').check_password('pass-word')
+
+
+@pytest.mark.django_db
+def test_bulk_endpoint_registers_an_uploaded_csv(
+        admin_client, in_process_hashing):
+    upload = SimpleUploadedFile('students.csv', CSV.encode('utf-8'))
+
+    response = admin_client.post(
+        reverse('users-api:user-bulk'), {'file': upload})
+
+    assert response.status_code == 201
+    assert response.data['imported'] == 2
+    assert len(response.data['errors']) == 3
+
+
+@pytest.mark.django_db
+def test_bulk_endpoint_is_for_admins_only(client, django_user_model):
+    django_user_model.objects.create_user(
+        username='ann', password='pass-word', city='Delhi')
+    client.login(username='ann', password='pass-word')
+
+    response = client.post(
+        reverse('users-api:user-bulk'), json.dumps([]),
+        content_type='application/json')
+
+    assert response.status_code == 403
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+
+import datetime
+
+import pytest
+
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+
+
+@pytest.fixture
+def users(django_user_model):
+    start = timezone.now() - datetime.timedelta(days=10)
+    return [
+        django_user_model.objects.create(
+            username=username, city=city, first_name='First',
+            date_joined=start + datetime.timedelta(days=day))
+        for day, (username, city) in enumerate([
+            ('ann', 'Delhi'), ('andy', 'Kathmandu'), ('bo', 'Delhi'),
+            ('cy', 'Delhi'), ('dee', 'Kathmandu')])]
+
+
+def usernames(response):
+    assert response.status_code == 200
+    return [user['username'] for user in response.data['results']]
+
+
+@pytest.mark.django_db
+def test_user_list_pages_in_joining_order(admin_client, users):
+    url = reverse('users-api:user-list')
+
+    first = admin_client.get(url, {'page_size': 3})
+    second = admin_client.get(first.data['next'])
+
+    # The admin joined last.
+    assert usernames(first) == ['ann', 'andy', 'bo']
+    assert usernames(second) == ['cy', 'dee', 'admin']
+    assert second.data['next'] is None
+
+
+@pytest.mark.django_db
+def test_user_list_filters(admin_client, users):
+    url = reverse('users-api:user-list')
+    joined = users[1].date_joined
+
+    assert usernames(admin_client.get(url, {'city': 'Delhi'})) == [
+        'ann', 'bo', 'cy']
+    assert usernames(admin_client.get(url, {'username': 'an'})) == [
+        'ann', 'andy']
+    assert usernames(admin_client.get(url, {'username': 'ann'})) == ['ann']
+    assert usernames(admin_client.get(url, {'username': 'AN'})) == []
+    assert usernames(admin_client.get(url, {
+        'joined_after': joined.isoformat(),
+        'joined_before': users[3].date_joined.isoformat()})) == [
+        'andy', 'bo']
+    assert usernames(admin_client.get(url, {
+        'city': 'Kathmandu',
+        'joined_before': str(timezone.localdate(joined)
+                             + datetime.timedelta(days=1))})) == ['andy']
+
+
+@pytest.mark.django_db
+def test_username_prefix_outside_sqlite(admin_client, users, monkeypatch):
+    monkeypatch.setattr(connection, 'vendor', 'postgresql')
+
+    response = admin_client.get(
+        reverse('users-api:user-list'), {'username': 'an'})
+
+    monkeypatch.undo()
+    assert usernames(response) == ['ann', 'andy']
+
+
+@pytest.mark.django_db
+def test_user_list_rejects_bad_dates(admin_client):
+    response = admin_client.get(
+        reverse('users-api:user-list'), {'joined_after': 'last week'})
+
+    assert response.status_code == 400
+    assert 'joined_after' in response.data
+
+
+@pytest.mark.django_db
+def test_compact_user_list_leaves_out_names(
+        admin_client, users, query_budget):
+    # The session, its user and one page.
+    with query_budget(3):
+        response = admin_client.get(
+            reverse('users-api:user-list'), {'compact': 1})
+
+    assert usernames(response)[:2] == ['ann', 'andy']
+    assert set(response.data['results'][0]) == {
+        'id', 'username', 'email', 'city'}
+    full = admin_client.get(reverse('users-api:user-list'))
+    assert full.data['results'][0]['full_name'] == 'First'
@@ -3,12 +3,17 @@ from django.conf.urls import url
 from rest_framework_jwt.views import (
     obtain_jwt_token, verify_jwt_token, refresh_jwt_token)
 
-from .views import (UserDetails, UserList)
+from .views import (UserBulkCreate, UserDetails, UserList)
 
 """
 Configure the URL patterns for the Users API.
 """
 urlpatterns = [
+    # Register many Users at once
+    url(
+        r'^bulk/$',
+        UserBulkCreate.as_view(), name='user-bulk'
+    ),
     # Return a specific User by id
     url(
         r'^(?P<id>[0-9a-f-]+)/$',
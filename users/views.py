@@ -1,25 +1,114 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 
+import datetime
+import io
+
+from django.db import connection
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.timezone import get_current_timezone, is_naive, make_aware
 from rest_framework import permissions, status
 from rest_framework.generics import (
     ListCreateAPIView, RetrieveUpdateDestroyAPIView)
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from school_library.utils import guess_format, read_records
 
+from .audit import audit_log
+from .authentication import AuthenticationFamilyMixin
 from .permissions import IsOwner
 
+from .importer import UserImporter
 from .models import User
-from .serializers import UserSerializer
+from .pagination import UserPagination
+from .serializers import UserCompactSerializer, UserSerializer
 
 
-class UserList(ListCreateAPIView):
+def _joined_bound(params, name):
+    """
+    The date or datetime of query parameter `name`, as an aware datetime.
     """
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        moment = parse_datetime(value)
+        if moment is None:
+            day = parse_date(value)
+            if day is not None:
+                moment = datetime.datetime.combine(day, datetime.time())
+    except ValueError:
+        moment = None
+    if moment is None:
+        raise ValidationError({name: ['Expected a date or a datetime.']})
+    if is_naive(moment):
+        moment = make_aware(moment, get_current_timezone())
+    return moment
+
+
+class UserList(AuthenticationFamilyMixin, ListCreateAPIView):
+    """
+    get:
+        Return a page of users, in the order they joined.
+
+        `city` keeps the users of a city, `username` those whose username
+        starts with the given text (case sensitive), and `joined_after`
+        and `joined_before` (dates or datetimes) those who joined from and
+        before the given moments. `compact=1` returns users without their
+        names.
+
     post:
         Register a new User.
     """
+    authentication_family = 'users'
     serializer_class = UserSerializer
-    queryset = User.objects.all()
+    pagination_class = UserPagination
+
+    @property
+    def compact(self):
+        return self.request.query_params.get('compact') in ('1', 'true')
+
+    def get_serializer_class(self):
+        if self.request.method == 'GET' and self.compact:
+            return UserCompactSerializer
+        return self.serializer_class
+
+    def get_queryset(self):
+        params = self.request.query_params
+        users = User.objects.all()
+        if params.get('city'):
+            users = users.filter(city=params['city'])
+        if params.get('username'):
+            prefix = params['username']
+            if connection.vendor == 'sqlite':
+                # SQLite cannot serve the LIKE of `startswith` from the
+                # username index, but serves this range, a prefix match
+                # under its binary collation.
+                users = users.filter(username__gte=prefix,
+                                     username__lt=prefix + '\U0010ffff')
+            else:
+                # PostgreSQL serves it from the varchar_pattern_ops index
+                # Django adds to the unique username column.
+                users = users.filter(username__startswith=prefix)
+        joined_after = _joined_bound(params, 'joined_after')
+        if joined_after is not None:
+            users = users.filter(date_joined__gte=joined_after)
+        joined_before = _joined_bound(params, 'joined_before')
+        if joined_before is not None:
+            users = users.filter(date_joined__lt=joined_before)
+
+        ordering = self.pagination_class.ordering
+        if self.compact:
+            return users.values(*UserCompactSerializer.columns + ordering)
+        return users.only(
+            'first_name', 'last_name', 'username', 'email', 'city', *ordering)
+
+    def perform_create(self, serializer):
+        user = serializer.save()
+        audit_log.record('user.create', actor=self.request.user, target=user)
 
     def get_permissions(self):
         if self.request.method == 'POST':
@@ -39,7 +128,50 @@ class UserList(ListCreateAPIView):
     #         serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class UserDetails(RetrieveUpdateDestroyAPIView):
+class UserBulkCreate(AuthenticationFamilyMixin, APIView):
+    """
+    post:
+        Register many users at once, from a JSON array of users or an
+        uploaded CSV or JSON `file`. Returns the number of users registered
+        and the records skipped, with the reason.
+    """
+    authentication_family = 'users'
+    permission_classes = (permissions.IsAdminUser,)
+
+    def post(self, request, format=None):
+        if isinstance(request.data, list):
+            records = request.data
+        elif 'file' in request.FILES:
+            upload = request.FILES['file']
+            stream = io.TextIOWrapper(upload.file, encoding='utf-8',
+                                      newline='')
+            try:
+                records = list(read_records(
+                    stream, guess_format(upload.name, 'json')))
+            except ValueError as error:
+                return Response(
+                    {'detail': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            return Response(
+                {'detail': 'Expected a JSON array of users or a file.'},
+                status=status.HTTP_400_BAD_REQUEST)
+
+        # Hashed in threads: forking a pool from a threaded web worker can
+        # deadlock the children.
+        importer = UserImporter(hash_in_threads=True)
+        importer.run(records)
+        audit_log.record(
+            'user.bulk_create', actor=request.user,
+            imported=importer.imported, skipped=len(importer.errors))
+        return Response({
+            'imported': importer.imported,
+            'errors': [{'record': number, 'message': message}
+                       for number, message in importer.errors],
+        }, status=(status.HTTP_201_CREATED if importer.imported
+                   else status.HTTP_400_BAD_REQUEST))
+
+
+class UserDetails(AuthenticationFamilyMixin, RetrieveUpdateDestroyAPIView):
     """
     get:
         Return a User instance.
@@ -50,6 +182,7 @@ class UserDetails(RetrieveUpdateDestroyAPIView):
     delete:
         Delete an existing user.
     """
+    authentication_family = 'users'
     serializer_class = UserSerializer
     # permission_classes = (IsAuthenticated, IsOwner)
     queryset = User.objects.all()
@@ -63,3 +196,15 @@ class UserDetails(RetrieveUpdateDestroyAPIView):
             return (permissions.IsAuthenticated(), permissions.IsAdminUser(),)
 
         return (permissions.IsAuthenticated(),)
+
+    def perform_update(self, serializer):
+        user = serializer.save()
+        # The names of the changed fields only, never their values.
+        audit_log.record(
+            'user.update', actor=self.request.user, target=user,
+            fields=sorted(serializer.validated_data))
+
+    def perform_destroy(self, instance):
+        target = instance.pk
+        instance.delete()
+        audit_log.record('user.delete', actor=self.request.user, target=target)